@@ -1,5 +1,5 @@
 # app.py
-from flask import Flask
+from flask import Flask, jsonify, request
 from flask_jwt_extended import JWTManager, create_access_token, create_refresh_token
 from flask_cors import CORS
 from config import DevelopmentConfig  # ou ProductionConfig dependendo do ENV
@@ -9,9 +9,13 @@ from routes.processamento import processamento_bp
 from routes.comercializacao import comercializacao_bp
 from routes.importacao import importacao_bp
 from routes.exportacao import exportacao_bp
+from routes.monitoramento import monitoramento_bp
+from routes.export import export_bp
+from routes.balanca import balanca_bp
+from routes.saude import saude_bp
 from flask_swagger_ui import get_swaggerui_blueprint
-from scripts.populate_db import popular_banco
-from models.database import init_db
+from models.database import init_app
+from services.inicializacao import POPULAR_NA_INICIALIZACAO, inicializacao
 
 app = Flask(__name__)
 app.config.from_object(DevelopmentConfig)  # ou ProductionConfig
@@ -25,11 +29,15 @@ jwt = JWTManager(app)
 
 # registra blueprints
 app.register_blueprint(auth_bp)
+app.register_blueprint(saude_bp)
 app.register_blueprint(producao_bp,      url_prefix="/api/producao")
 app.register_blueprint(processamento_bp, url_prefix="/api/processamento")
 app.register_blueprint(comercializacao_bp, url_prefix="/api/comercializacao")
 app.register_blueprint(importacao_bp,    url_prefix="/api/importacao")
 app.register_blueprint(exportacao_bp,    url_prefix="/api/exportacao")
+app.register_blueprint(monitoramento_bp, url_prefix="/api/monitoramento")
+app.register_blueprint(export_bp,        url_prefix="/api/export")
+app.register_blueprint(balanca_bp,       url_prefix="/api/balanca")
 
 # swagger
 SWAGGER_URL = app.config["SWAGGER_URL"]
@@ -38,7 +46,45 @@ swaggerui_blueprint = get_swaggerui_blueprint(
     SWAGGER_URL, API_URL, config={"app_name": "Embrapa API"})
 app.register_blueprint(swaggerui_blueprint, url_prefix=SWAGGER_URL)
 
+# sessão por requisição, fechada no teardown do app context
+init_app(app)
+
+
+@app.before_request
+def esperar_esquema():
+    # as rotas /api/* leem do banco: enquanto a inicialização em segundo
+    # plano cria o esquema (coisa de milissegundos), elas esperam; /health
+    # e /ready respondem na hora
+    if request.path.startswith("/api/") \
+            and not inicializacao.aguardar_esquema():
+        return jsonify({"erro": "Serviço inicializando",
+                        "inicializacao": inicializacao.estatisticas()}), 503
+
+
+def iniciar_agendador():
+    """
+    Atualização periódica em segundo plano (ATUALIZACAO_INTERVALO > 0),
+    ligada depois da inicialização para não concorrer com a carga inicial.
+    """
+    # importado só aqui: puxa o populate_db e o scraper
+    from services.agendador import Agendador
+    agendador = Agendador(app)
+    app.extensions["agendador"] = agendador
+    agendador.iniciar()
+
+
+def iniciar_servicos(popular: bool = POPULAR_NA_INICIALIZACAO):
+    """
+    Numa thread, cria o esquema do banco, faz a carga inicial (com
+    `popular`) e depois liga o agendador. O servidor atende desde já; o
+    progresso fica em /ready.
+    """
+    inicializacao.iniciar(popular, ao_concluir=iniciar_agendador)
+
+
+# Importar este módulo não inicia nada (nem toca no banco): os serviços
+# são iniciados pelo ponto de entrada, aqui, no post_fork do gunicorn
+# (gunicorn.conf.py, um por worker) e no asgi.py
 if __name__ == "__main__":
-    init_db()      # cria tabelas (usando SQLALCHEMY_DATABASE_URI, que agora aponta para Postgres)
-    popular_banco()  # popula dados
+    iniciar_servicos(popular=True)  # popula dados, sem bloquear o servidor
     app.run(host="0.0.0.0", port=5000, debug=app.config["DEBUG"])
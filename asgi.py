@@ -0,0 +1,24 @@
+# asgi.py
+"""
+Ponto de entrada ASGI, ao lado do WSGI (app:app):
+
+    uvicorn asgi:app --host 0.0.0.0 --port 5000
+
+O app Flask roda num pool de ASGI_THREADS threads sob o event loop do
+uvicorn, então um único worker atende muitas requisições ao mesmo tempo,
+inclusive enquanto algumas esperam pelo site da Embrapa. Combine com
+SCRAPER_MOTOR=async para que cada scraping também busque as páginas
+concorrentemente.
+"""
+import os
+
+from a2wsgi import WSGIMiddleware
+
+from app import app as flask_app, iniciar_servicos
+
+ASGI_THREADS = int(os.getenv("ASGI_THREADS", "100"))
+
+app = WSGIMiddleware(flask_app, workers=ASGI_THREADS)
+
+# cada worker do uvicorn importa este módulo no seu próprio processo
+iniciar_servicos()
@@ -1,10 +1,38 @@
 # config.py
+import hashlib
 import os
+import tempfile
 from datetime import timedelta
 
 basedir = os.path.abspath(os.path.dirname(__file__))
 
 
+def caminho_banco_do_snapshot(snapshot: str) -> str:
+    """
+    SQLite temporário em que o snapshot é carregado quando não há
+    DATABASE_URL. O nome vem do arquivo (caminho, tamanho e data), então
+    os workers do host usam a mesma cópia; o último processo a sair a
+    remove (services.snapshot.reservar_banco_temporario).
+    """
+    try:
+        info = os.stat(snapshot)
+        assinatura = (f"{os.path.abspath(snapshot)}:{info.st_size}:"
+                      f"{info.st_mtime_ns}")
+    except OSError:
+        assinatura = os.path.abspath(snapshot)
+    digest = hashlib.sha1(assinatura.encode()).hexdigest()[:12]
+    return os.path.join(tempfile.gettempdir(),
+                        f"embrapa-snapshot-{digest}.db")
+
+
+def _banco_padrao(snapshot: str) -> str:
+    # subindo de um snapshot sem DATABASE_URL, um SQLite temporário
+    # (instâncias efêmeras, sem servidor de banco); senão, SQLite local
+    if snapshot:
+        return "sqlite:///" + caminho_banco_do_snapshot(snapshot)
+    return f"sqlite:///{os.path.join(basedir, 'embrapa.db')}"
+
+
 class BaseConfig:
     # JWT
     JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY", "super-secret-dev")
@@ -19,13 +47,31 @@ class BaseConfig:
     CORS_ORIGINS = os.getenv(
         "CORS_ORIGINS", "http://localhost:3000").split(",")
 
+    # Snapshot compacto dos dados (populate_db --snapshot), carregado na
+    # inicialização quando o banco está vazio
+    SNAPSHOT_PATH = os.getenv("SNAPSHOT_PATH", "")
+
     # Banco de dados
     SQLALCHEMY_DATABASE_URI = os.getenv(
-        "DATABASE_URL",
-        f"sqlite:///{os.path.join(basedir, 'embrapa.db')}"
-    )
+        "DATABASE_URL", _banco_padrao(SNAPSHOT_PATH))
+
+    # Cópia temporária do snapshot usada como banco ("" quando o banco é
+    # o de DATABASE_URL ou o embrapa.db local)
+    BANCO_DO_SNAPSHOT = (caminho_banco_do_snapshot(SNAPSHOT_PATH)
+                         if SNAPSHOT_PATH and not os.getenv("DATABASE_URL")
+                         else "")
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
+    # Pool de conexões (por processo): conexões mantidas abertas, extras
+    # permitidas em picos, espera máxima (s) por uma conexão livre,
+    # reciclagem (s) antes de o servidor derrubar conexões ociosas e
+    # teste da conexão (pre-ping) a cada checkout
+    DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+    DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+    DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+    DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+    DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "1") != "0"
+
     # Swagger
     SWAGGER_URL = os.getenv("SWAGGER_URL", "/docs")
     API_YAML_PATH = os.getenv("API_YAML_PATH", "/static/swagger.yaml")
@@ -0,0 +1,32 @@
+# gunicorn.conf.py
+"""
+Configuração do gunicorn para vários workers por container:
+
+    gunicorn -c gunicorn.conf.py app:app
+
+O app é carregado uma vez no processo mestre (--preload) e compartilhado
+com os workers por copy-on-write. Os workers de um mesmo host dividem o
+cache de páginas e o de dados raspados (CACHE_COMPARTILHADO_PATH), então
+N workers não multiplicam por N o tráfego para a Embrapa nem a memória.
+"""
+import multiprocessing
+import os
+
+bind = os.getenv("BIND", "0.0.0.0:5000")
+workers = int(os.getenv("WEB_CONCURRENCY",
+                        min(multiprocessing.cpu_count() * 2 + 1, 8)))
+threads = int(os.getenv("GUNICORN_THREADS", "4"))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "180"))
+preload_app = True
+
+
+def post_fork(server, worker):
+    # conexões abertas pelo mestre não podem ser usadas por dois
+    # processos: cada worker abre as suas
+    from models.database import engine
+    engine.dispose(close=False)
+
+    # a inicialização e o agendador (threads) nascem em cada worker, não
+    # no mestre, onde não sobreviveriam ao fork
+    from app import iniciar_servicos
+    iniciar_servicos()
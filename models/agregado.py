@@ -0,0 +1,35 @@
+from datetime import datetime, timezone
+
+from sqlalchemy import (
+    BigInteger, Column, DateTime, Integer, String, UniqueConstraint
+)
+from models.database import Base
+
+
+class Agregado(Base):
+    """
+    Totais pré-calculados de `cultivares`, refeitos ao fim de cada carga
+    do populate_db. Uma linha por (etapa, dimensão, chave, ano):
+      - dimensao "ano": total do ano (chave vazia)
+      - dimensao "categoria": total da categoria no ano
+      - dimensao "pais": total do país no ano
+    """
+    __tablename__ = "agregados"
+
+    id = Column(Integer, primary_key=True, index=True)
+    etapa = Column(String(50), nullable=False)
+    dimensao = Column(String(20), nullable=False)
+    chave = Column(String(100), nullable=False, default="")
+    ano = Column(Integer, nullable=False)
+    registros = Column(Integer, nullable=False, default=0)
+    quantidade_kg = Column(BigInteger, nullable=True)
+    valor_usd = Column(BigInteger, nullable=True)
+    quantidade_l = Column(BigInteger, nullable=True)
+    atualizado_em = Column(
+        DateTime, nullable=False,
+        default=lambda: datetime.now(timezone.utc).replace(tzinfo=None))
+
+    __table_args__ = (
+        UniqueConstraint("etapa", "dimensao", "chave", "ano",
+                         name="uix_agregado"),
+    )
@@ -0,0 +1,50 @@
+from datetime import datetime, timezone
+
+from sqlalchemy import (
+    BigInteger, Column, DateTime, Index, Integer, String, UniqueConstraint
+)
+from models.database import Base
+
+
+class BalancaComercial(Base):
+    """
+    Exportação menos importação por (país, categoria de produto, ano),
+    pré-calculada a partir de `cultivares` ao fim de cada carga do
+    populate_db. `chave_pais` é o nome normalizado usado para casar os
+    países das duas abas; `pais` é o nome exibido.
+    """
+    __tablename__ = "balanca_comercial"
+
+    id = Column(Integer, primary_key=True, index=True)
+    chave_pais = Column(String(100), nullable=False)
+    pais = Column(String(100), nullable=False)
+    categoria_produto = Column(String(100), nullable=False)
+    ano = Column(Integer, nullable=False)
+    exportacao_kg = Column(BigInteger, nullable=False, default=0)
+    exportacao_usd = Column(BigInteger, nullable=False, default=0)
+    importacao_kg = Column(BigInteger, nullable=False, default=0)
+    importacao_usd = Column(BigInteger, nullable=False, default=0)
+    saldo_kg = Column(BigInteger, nullable=False, default=0)
+    saldo_usd = Column(BigInteger, nullable=False, default=0)
+    atualizado_em = Column(
+        DateTime, nullable=False,
+        default=lambda: datetime.now(timezone.utc).replace(tzinfo=None))
+
+    __table_args__ = (
+        UniqueConstraint("chave_pais", "categoria_produto", "ano",
+                         name="uix_balanca_comercial"),
+        Index("ix_balanca_ano", "ano"),
+    )
+
+    def to_dict(self):
+        return {
+            "pais": self.pais,
+            "categoria_produto": self.categoria_produto,
+            "ano": self.ano,
+            "exportacao_kg": self.exportacao_kg,
+            "exportacao_usd": self.exportacao_usd,
+            "importacao_kg": self.importacao_kg,
+            "importacao_usd": self.importacao_usd,
+            "saldo_kg": self.saldo_kg,
+            "saldo_usd": self.saldo_usd,
+        }
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, UniqueConstraint
+from sqlalchemy import Column, Index, Integer, String, UniqueConstraint
 from models.database import Base
 
 
@@ -35,6 +35,8 @@ class Cultivar(Base):
             "pais",
             name="uix_cultivar_unico"
         ),
+        # paginação por cursor: WHERE etapa = ? AND (ano, id) > (?, ?)
+        Index("ix_cultivares_etapa_ano_id", "etapa", "ano", "id"),
     )
 
     def to_dict(self):
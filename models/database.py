@@ -1,6 +1,10 @@
-import os
-from sqlalchemy import create_engine
+import threading
+import time
+
+from flask import g
+from sqlalchemy import create_engine, exc
 from sqlalchemy.orm import declarative_base, sessionmaker
+from sqlalchemy.pool import QueuePool
 from config import BaseConfig
 
 # ----------------------------------------------------------------
@@ -9,14 +13,78 @@ from config import BaseConfig
 # ----------------------------------------------------------------
 DATABASE_URL = BaseConfig.SQLALCHEMY_DATABASE_URI
 
+
+class PoolCronometrado(QueuePool):
+    """
+    QueuePool que mede quanto cada checkout esperou por uma conexão
+    (inclui abrir uma conexão nova quando o pool ainda não está cheio)
+    e quantos desistiram por DB_POOL_TIMEOUT.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._lock_estatisticas = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.espera_total = 0.0
+        self.espera_max = 0.0
+
+    def _registrar(self, espera: float, timeout: bool = False):
+        with self._lock_estatisticas:
+            if timeout:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.espera_total += espera
+            self.espera_max = max(self.espera_max, espera)
+
+    def _do_get(self):
+        inicio = time.perf_counter()
+        try:
+            conexao = super()._do_get()
+        except exc.TimeoutError:
+            self._registrar(time.perf_counter() - inicio, timeout=True)
+            raise
+        self._registrar(time.perf_counter() - inicio)
+        return conexao
+
+    def estatisticas(self) -> dict:
+        with self._lock_estatisticas:
+            tentativas = self.checkouts + self.timeouts
+            return {
+                "tamanho": self.size(),
+                "em_uso": self.checkedout(),
+                "livres": self.checkedin(),
+                "overflow": self.overflow(),
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "espera_media_ms": round(
+                    1000 * self.espera_total / tentativas, 3)
+                if tentativas else 0.0,
+                "espera_max_ms": round(1000 * self.espera_max, 3),
+            }
+
+
+def _opcoes_pool(config=BaseConfig) -> dict:
+    return {
+        "poolclass": PoolCronometrado,
+        "pool_size": config.DB_POOL_SIZE,
+        "max_overflow": config.DB_MAX_OVERFLOW,
+        "pool_timeout": config.DB_POOL_TIMEOUT,
+        "pool_recycle": config.DB_POOL_RECYCLE,
+        "pool_pre_ping": config.DB_POOL_PRE_PING,
+    }
+
+
 # Se for SQLite (prefixo "sqlite:///"), habilitamos connect_args; senão, omitimos.
 if DATABASE_URL.startswith("sqlite"):
     engine = create_engine(
         DATABASE_URL,
-        connect_args={"check_same_thread": False}
+        connect_args={"check_same_thread": False},
+        **_opcoes_pool()
     )
 else:
-    engine = create_engine(DATABASE_URL)
+    engine = create_engine(DATABASE_URL, **_opcoes_pool())
 
 # Cria sessão padrão (bind = engine). Desabilitamos autoflush/​autocommit manual
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
@@ -28,8 +96,20 @@ def init_db():
     Cria todas as tabelas definidas pelas subclasses de Base (se ainda não existirem).
     Deve ser chamado uma única vez (por exemplo, na inicialização da aplicação).
     """
+    # registra os modelos em Base.metadata antes de criar as tabelas
+    import models.cultivar  # noqa: F401
+    import models.sincronizacao  # noqa: F401
+    import models.agregado  # noqa: F401
+    import models.balanca  # noqa: F401
+    import models.versao  # noqa: F401
     Base.metadata.create_all(bind=engine)
 
+    # create_all não mexe em tabelas que já existem: índices adicionados
+    # depois da criação do banco são criados aqui
+    for tabela in Base.metadata.sorted_tables:
+        for indice in tabela.indexes:
+            indice.create(bind=engine, checkfirst=True)
+
 
 def get_engine():
     """
@@ -44,3 +124,37 @@ def get_session():
     Use sempre dentro de um contexto try/finally ou com `with` para fechar adequadamente.
     """
     return SessionLocal()
+
+
+# ----------------------------------------------------------------
+# 2) Sessão por requisição: as rotas pegam a sessão do app context e o
+#    Flask a fecha (devolvendo a conexão ao pool) no teardown, mesmo
+#    quando a rota levanta uma exceção.
+# ----------------------------------------------------------------
+
+def sessao_da_requisicao():
+    """Sessão da requisição atual, criada no primeiro uso."""
+    if "db_session" not in g:
+        g.db_session = SessionLocal()
+    return g.db_session
+
+
+def fechar_sessao_da_requisicao(erro=None):
+    session = g.pop("db_session", None)
+    if session is not None:
+        if erro is not None:
+            session.rollback()
+        session.close()
+
+
+def init_app(app):
+    """Registra o fechamento da sessão no teardown do app context."""
+    app.teardown_appcontext(fechar_sessao_da_requisicao)
+
+
+def estatisticas_pool() -> dict:
+    """Estado do pool e tempos de espera por conexão, para monitoramento."""
+    pool = engine.pool
+    if isinstance(pool, PoolCronometrado):
+        return pool.estatisticas()
+    return {"status": pool.status()}
@@ -0,0 +1,41 @@
+from datetime import datetime, timezone
+
+from sqlalchemy import Column, DateTime, Integer, String, UniqueConstraint
+from models.database import Base
+
+
+class EstadoSincronizacao(Base):
+    """
+    Última sincronização de cada página do vitibrasil, identificada por
+    (etapa, subopção, ano). `hash_conteudo` é o hash dos registros extraídos
+    da página e permite saber se ela mudou desde a sincronização anterior.
+    """
+    __tablename__ = "estado_sincronizacao"
+
+    id = Column(Integer, primary_key=True, index=True)
+    etapa = Column(String(50), nullable=False)
+    # "" para as abas com uma única página por ano (Produção, Comercialização)
+    subopcao = Column(String(20), nullable=False, default="")
+    categoria = Column(String(100), nullable=True)
+    ano = Column(Integer, nullable=False)
+    hash_conteudo = Column(String(64), nullable=False)
+    registros = Column(Integer, nullable=False, default=0)
+    sincronizado_em = Column(
+        DateTime, nullable=False,
+        default=lambda: datetime.now(timezone.utc).replace(tzinfo=None))
+
+    __table_args__ = (
+        UniqueConstraint("etapa", "subopcao", "ano",
+                         name="uix_estado_sincronizacao"),
+    )
+
+    def to_dict(self):
+        return {
+            "etapa": self.etapa,
+            "subopcao": self.subopcao,
+            "categoria": self.categoria,
+            "ano": self.ano,
+            "hash_conteudo": self.hash_conteudo,
+            "registros": self.registros,
+            "sincronizado_em": self.sincronizado_em.isoformat(),
+        }
@@ -0,0 +1,19 @@
+from datetime import datetime, timezone
+
+from sqlalchemy import Column, DateTime, Integer
+from models.database import Base
+
+
+class VersaoDataset(Base):
+    """
+    Versão dos dados servidos pela API: uma única linha, incrementada a
+    cada carga do populate_db que altera o banco. Alimenta os headers
+    ETag/Last-Modified das rotas /api/*.
+    """
+    __tablename__ = "versao_dataset"
+
+    id = Column(Integer, primary_key=True)
+    numero = Column(Integer, nullable=False, default=0)
+    atualizado_em = Column(
+        DateTime, nullable=False,
+        default=lambda: datetime.now(timezone.utc).replace(tzinfo=None))
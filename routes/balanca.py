@@ -0,0 +1,52 @@
+# routes/balanca.py
+
+from flask import Blueprint, jsonify, request
+from flask_jwt_extended import jwt_required
+from models.database import sessao_da_requisicao
+from routes.comum import ano_ou_none, versionado
+from logging_config import logger
+
+balanca_bp = Blueprint("balanca", __name__, url_prefix="/api/balanca")
+
+
+@balanca_bp.route("", methods=["GET"])
+@jwt_required()
+@versionado
+def listar_balanca():
+    """
+    Saldo comercial (exportação - importação) em kg e US$ por
+    (pais, categoria_produto, ano).
+    Parâmetros opcionais (query string):
+      - pais (string): comparado sem acentos, maiúsculas ou pontuação
+      - categoria_produto (string)
+      - ano (int)
+      - ano_inicio (int, default=1970)
+      - ano_fim (int, default=2024)
+      - limit (int, default=100)
+      - offset (int, default=0)
+    """
+    # importado aqui: services.balanca puxa o scraper
+    from services.balanca import consultar_balanca
+
+    try:
+        ano_inicio = int(request.args.get("ano_inicio", 1970))
+        ano_fim = int(request.args.get("ano_fim", 2024))
+        limit = int(request.args.get("limit", 100))
+        offset = int(request.args.get("offset", 0))
+    except ValueError:
+        return jsonify({"erro": "Parâmetros numéricos inválidos"}), 400
+    if limit < 1 or offset < 0:
+        return jsonify({"erro": "limit deve ser >= 1 e offset >= 0"}), 400
+
+    try:
+        dados = consultar_balanca(
+            sessao_da_requisicao(), pais=request.args.get("pais"),
+            categoria_produto=request.args.get("categoria_produto"),
+            ano=ano_ou_none(request.args.get("ano")),
+            ano_inicio=ano_inicio, ano_fim=ano_fim,
+            limit=limit, offset=offset)
+    except Exception as e:
+        logger.error(f"Erro ao consultar a balança comercial: {e}")
+        return jsonify({"erro": "Erro interno ao processar os dados"}), 500
+
+    return jsonify(dados)
@@ -0,0 +1,422 @@
+# routes/comum.py
+
+import hashlib
+import json
+from datetime import timezone
+from functools import wraps
+
+from flask import Response, jsonify, make_response, request
+from models.database import SessionLocal, sessao_da_requisicao
+from services.consulta import (
+    codificar_cursor,
+    consultar_cultivares,
+    consultar_pagina,
+    decodificar_cursor,
+    iterar_cultivares
+)
+from services.cache_dados import carregar_dados
+from services.materializacao import (
+    codificacoes_disponiveis,
+    respostas_materializadas
+)
+from services.versao import versao_atual
+from logging_config import logger
+
+# Formatos de resposta transmitidos aos poucos (format=...) -> mimetype
+FORMATOS_STREAM = {
+    "ndjson": "application/x-ndjson",
+    "json-stream": "application/json",
+}
+
+# Registros serializados por bloco enviado ao cliente
+_REGISTROS_POR_BLOCO = 500
+
+
+def _etag(versao):
+    # forte e distinta por recurso: versão dos dados + caminho com a query
+    # (+ "-gzip"/"-br" nas respostas comprimidas, ver `materializado`)
+    recurso = hashlib.sha1(request.full_path.encode()).hexdigest()[:12]
+    return f"{versao.numero}-{recurso}"
+
+
+def _sufixos_etag():
+    return ("", *(f"-{c}" for c in codificacoes_disponiveis()))
+
+
+def versionado(view):
+    """
+    Respostas condicionais pela versão dos dados (services.versao): toda
+    resposta 200 leva ETag e Last-Modified, e um If-None-Match (ou
+    If-Modified-Since) ainda válido recebe 304 sem executar a rota — a
+    versão vem do cache do processo, então nem o banco nem o scraper são
+    consultados. Fica de fora o fonte=scraper, que não depende do banco.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if request.args.get("fonte") == "scraper":
+            return view(*args, **kwargs)
+        versao = versao_atual()
+        if versao is None:
+            return view(*args, **kwargs)
+
+        etag = _etag(versao)
+        modificado = versao.atualizado_em.replace(tzinfo=timezone.utc)
+        if request.if_none_match:
+            valido = any(request.if_none_match.contains(etag + sufixo)
+                         for sufixo in _sufixos_etag())
+        else:
+            desde = request.if_modified_since
+            valido = desde is not None and desde >= modificado
+        if valido:
+            resposta = Response(status=304)
+        else:
+            resposta = make_response(view(*args, **kwargs))
+            if resposta.status_code != 200:
+                return resposta
+            codificacao = resposta.headers.get("Content-Encoding")
+            if codificacao:
+                etag = f"{etag}-{codificacao}"
+        resposta.set_etag(etag)
+        resposta.last_modified = modificado
+        return resposta
+    return wrapper
+
+
+def _codificacao_aceita():
+    """A melhor codificação pré-calculada que o cliente aceita."""
+    for codificacao in codificacoes_disponiveis():
+        if request.accept_encodings.quality(codificacao) > 0:
+            return codificacao
+    return "identity"
+
+
+def _servir_materializada(materializada):
+    codificacao = _codificacao_aceita()
+    resposta = Response(materializada.corpos[codificacao],
+                        mimetype=materializada.mimetype)
+    resposta.headers.extend(materializada.headers)
+    if codificacao != "identity":
+        resposta.headers["Content-Encoding"] = codificacao
+    resposta.vary.add("Accept-Encoding")
+    return resposta
+
+
+def materializado(view):
+    """
+    Serve as consultas mais pedidas (services.materializacao) a partir do
+    corpo já serializado e comprimido da versão atual dos dados, byte a
+    byte, com o Content-Encoding aceito pelo cliente (br, gzip ou nenhum).
+    Respostas transmitidas (format=...) e o fonte=scraper não entram.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        versao = versao_atual()
+        if versao is None or request.args.get("fonte") == "scraper":
+            return view(*args, **kwargs)
+
+        versao = versao.numero
+        assinatura = (request.path,
+                      tuple(sorted(request.args.items(multi=True))))
+        materializada = respostas_materializadas.obter(versao, assinatura)
+        if materializada is not None:
+            return _servir_materializada(materializada)
+
+        resposta = make_response(view(*args, **kwargs))
+        if resposta.status_code != 200 or resposta.is_streamed:
+            return resposta
+        headers = [(nome, valor) for nome, valor in resposta.headers
+                   if nome.startswith("X-")]
+        materializada = respostas_materializadas.guardar(
+            versao, assinatura, resposta.get_data(), resposta.mimetype,
+            headers)
+        if materializada is not None:
+            return _servir_materializada(materializada)
+        return resposta
+    # `wraps` copia o atributo para os decoradores de fora (jwt_required,
+    # versionado): é por ele que `aquecer_consulta` chega aqui direto
+    wrapper.materializado = wrapper
+    return wrapper
+
+
+def aquecer_consulta(app, caminho, argumentos=()) -> bool:
+    """
+    Materializa, para a versão atual, a resposta de `caminho` com os
+    `argumentos` da query string, chamando a rota por dentro (sem HTTP e
+    sem autenticação: quem chama é o próprio servidor). Retorna se a rota
+    existe, é materializada e respondeu 200.
+    """
+    with app.test_request_context(caminho, query_string=list(argumentos)):
+        if request.routing_exception is not None:
+            return False
+        view = app.view_functions[request.url_rule.endpoint]
+        materializar = getattr(view, "materializado", None)
+        if materializar is None:
+            return False
+        resposta = make_response(materializar(**request.view_args))
+        return resposta.status_code == 200
+
+
+def paginar(dados, limit, offset):
+    return dados[offset: offset + limit]
+
+
+def _resposta_cursor(dados, proximo):
+    """Envelope da paginação por cursor; o próximo cursor vai também no header."""
+    resposta = jsonify({"dados": dados, "next_cursor": proximo})
+    if proximo:
+        resposta.headers["X-Next-Cursor"] = proximo
+    return resposta
+
+
+def _blocos(registros, formato):
+    """
+    Serializa os registros conforme são produzidos, em blocos de
+    _REGISTROS_POR_BLOCO: uma linha JSON por registro (ndjson) ou um
+    array JSON aberto no primeiro byte e fechado no último (json-stream).
+    Um erro no meio da transmissão encerra a resposta (o array fica
+    incompleto, o que o cliente percebe ao interpretar o JSON).
+    """
+    separador = "\n" if formato == "ndjson" else ","
+    if formato == "json-stream":
+        yield "["
+    bloco, primeiro = [], True
+    try:
+        for registro in registros:
+            bloco.append(json.dumps(registro, ensure_ascii=False))
+            if len(bloco) >= _REGISTROS_POR_BLOCO:
+                yield _juntar(bloco, separador, formato, primeiro)
+                bloco, primeiro = [], False
+    except Exception as e:
+        logger.error(f"Erro durante a transmissão ({formato}): {e}")
+        return
+    if bloco:
+        yield _juntar(bloco, separador, formato, primeiro)
+    if formato == "json-stream":
+        yield "]"
+
+
+def _juntar(bloco, separador, formato, primeiro):
+    texto = separador.join(bloco)
+    if formato == "ndjson":
+        return texto + "\n"
+    return texto if primeiro else "," + texto
+
+
+def _transmitir(registros, formato):
+    return Response(_blocos(registros, formato),
+                    mimetype=FORMATOS_STREAM[formato])
+
+
+def _registros_do_banco(**consulta):
+    """
+    Gerador que mantém a sessão aberta só enquanto a resposta é enviada.
+    Usa uma sessão própria: a da requisição é fechada no teardown, antes
+    de a transmissão terminar.
+    """
+    session = SessionLocal()
+    try:
+        yield from iterar_cultivares(session, **consulta)
+    finally:
+        session.close()
+
+
+def ano_ou_none(valor):
+    if not valor:
+        return None
+    try:
+        return int(valor)
+    except ValueError:
+        return None
+
+
+def do_scraper(nome):
+    """
+    A função `nome` de services.scraper, importado só quando ela é
+    chamada: o app sobe sem carregar o scraper (requests, bs4).
+    """
+    def obter_dados(*args, **kwargs):
+        from services import scraper
+        return getattr(scraper, nome)(*args, **kwargs)
+
+    obter_dados.__name__ = nome
+    return obter_dados
+
+
+def listar(etapa, campos_filtro, obter_dados):
+    """
+    Implementação comum das rotas GET /api/<etapa>.
+
+    Por padrão os dados vêm da tabela `cultivares` (populada por
+    scripts/populate_db.py), com filtros e paginação resolvidos em SQL.
+    O scraping ao vivo da Embrapa só roda com `fonte=scraper`: o
+    planejador reduz a busca aos anos e categorias filtrados, e o
+    resultado fica em cache (services.cache_dados) para as páginas seguintes.
+
+    - etapa: valor da coluna `etapa` (ex.: "Produção")
+    - campos_filtro: filtros de igualdade aceitos pela rota
+    - obter_dados: função do scraper usada quando fonte=scraper
+
+    Com `cursor` na query string (vazio na primeira página), a paginação
+    é por chave: a resposta vira {"dados": [...], "next_cursor": ...} e
+    `offset` é ignorado. No banco a ordem é (ano, id).
+
+    `format=ndjson` ou `format=json-stream` transmitem os registros
+    conforme são lidos (cursor do lado do servidor no banco), sem montar
+    a lista inteira: a memória fica constante mesmo com `limit` grande.
+    Esses formatos paginam por limit/offset.
+    """
+    try:
+        ano_inicio = int(request.args.get("ano_inicio", 1970))
+        ano_fim = int(request.args.get("ano_fim", 2024))
+        limit = int(request.args.get("limit", 100))
+        offset = int(request.args.get("offset", 0))
+    except ValueError:
+        return jsonify({"erro": "Parâmetros numéricos inválidos"}), 400
+    if limit < 1 or offset < 0:
+        return jsonify({"erro": "limit deve ser >= 1 e offset >= 0"}), 400
+
+    cursor = request.args.get("cursor")
+    formato = request.args.get("format")
+    if formato not in (None, "json", *FORMATOS_STREAM):
+        return jsonify({"erro": "Formato inválido"}), 400
+    ano = ano_ou_none(request.args.get("ano"))
+    filtros = {campo: request.args.get(campo) for campo in campos_filtro}
+
+    if request.args.get("fonte") == "scraper":
+        from services.planejador import planejar
+        plano = planejar(etapa, ano=ano, ano_inicio=ano_inicio,
+                         ano_fim=ano_fim, filtros=filtros)
+        try:
+            dados = [] if plano.vazio else carregar_dados(
+                etapa, plano.ano_inicio, plano.ano_fim, obter_dados,
+                plano.categorias)
+        except Exception as e:
+            logger.error(f"Erro ao obter dados de {etapa.lower()}: {e}")
+            return jsonify({"erro": "Erro interno ao processar os dados"}), 500
+
+        if ano is not None:
+            dados = [item for item in dados if item.get("ano") == ano]
+        for campo, valor in filtros.items():
+            if valor:
+                dados = [item for item in dados if item.get(campo) == valor]
+        if formato in FORMATOS_STREAM:
+            return _transmitir(iter(paginar(dados, limit, offset)), formato)
+        if cursor is None:
+            return jsonify(paginar(dados, limit, offset))
+
+        # no conjunto raspado (em memória) o cursor guarda a posição
+        try:
+            (inicio,) = decodificar_cursor(cursor, "pos") if cursor else (0,)
+        except ValueError:
+            return jsonify({"erro": "Cursor inválido"}), 400
+        fim = inicio + limit
+        proximo = codificar_cursor(pos=fim) if fim < len(dados) else None
+        return _resposta_cursor(paginar(dados, limit, inicio), proximo)
+
+    if formato in FORMATOS_STREAM:
+        return _transmitir(_registros_do_banco(
+            etapa=etapa, filtros=filtros, ano=ano, ano_inicio=ano_inicio,
+            ano_fim=ano_fim, limit=limit, offset=offset), formato)
+
+    session = sessao_da_requisicao()
+    try:
+        if cursor is not None:
+            dados, proximo = consultar_pagina(
+                session, etapa, filtros, ano=ano, ano_inicio=ano_inicio,
+                ano_fim=ano_fim, limit=limit, cursor=cursor)
+            return _resposta_cursor(dados, proximo)
+        dados = consultar_cultivares(
+            session, etapa, filtros, ano=ano, ano_inicio=ano_inicio,
+            ano_fim=ano_fim, limit=limit, offset=offset)
+    except ValueError:
+        return jsonify({"erro": "Cursor inválido"}), 400
+    except Exception as e:
+        logger.error(f"Erro ao consultar {etapa.lower()} no banco: {e}")
+        return jsonify({"erro": "Erro interno ao processar os dados"}), 500
+
+    return jsonify(dados)
+
+
+def agregar_rota(etapa, campos_filtro):
+    """
+    Implementação comum das rotas GET /api/<etapa>/agregado: GROUP BY
+    em SQL (ou nos agregados pré-calculados, quando a consulta cabe
+    neles) com os mesmos filtros da listagem.
+
+    - group_by: colunas separadas por vírgula (ex.: "ano,pais")
+    - metric: funções separadas por vírgula (ex.: "sum(valor_usd)");
+      padrão "count(*)"
+    O header X-Agregacao informa se a resposta veio dos agregados
+    ("pre-calculado") ou de `cultivares` ("sql").
+    """
+    try:
+        ano_inicio = int(request.args.get("ano_inicio", 1970))
+        ano_fim = int(request.args.get("ano_fim", 2024))
+    except ValueError:
+        return jsonify({"erro": "Parâmetros numéricos inválidos"}), 400
+    # importados aqui (como o scraper e o numpy nas rotas abaixo): o app
+    # sobe sem carregá-los
+    from services.agregacao import (
+        agregar,
+        interpretar_group_by,
+        interpretar_metricas
+    )
+
+    try:
+        group_by = interpretar_group_by(request.args.get("group_by"))
+        metricas = interpretar_metricas(request.args.get("metric"))
+    except ValueError as e:
+        return jsonify({"erro": str(e)}), 400
+
+    ano = ano_ou_none(request.args.get("ano"))
+    filtros = {campo: request.args.get(campo) for campo in campos_filtro}
+
+    try:
+        linhas, pre_calculado = agregar(
+            sessao_da_requisicao(), etapa, group_by, metricas, filtros,
+            ano=ano, ano_inicio=ano_inicio, ano_fim=ano_fim)
+    except Exception as e:
+        logger.error(f"Erro ao agregar {etapa.lower()}: {e}")
+        return jsonify({"erro": "Erro interno ao processar os dados"}), 500
+
+    resposta = jsonify(linhas)
+    resposta.headers["X-Agregacao"] = "pre-calculado" if pre_calculado else "sql"
+    return resposta
+
+
+def series_rota(etapa, campos_filtro):
+    """
+    Implementação comum das rotas GET /api/<etapa>/series: uma série
+    anual por combinação de `serie_por`, com crescimento ano a ano (yoy),
+    média móvel de `janela` anos e CAGR (services.analitico).
+
+    - serie_por: colunas separadas por vírgula (padrão depende da etapa)
+    - metric: quantidade_kg | valor_usd | quantidade_l
+    - janela: anos da média móvel (padrão 3)
+    """
+    from services.analitico import calcular_series
+
+    try:
+        ano_inicio = int(request.args.get("ano_inicio", 1970))
+        ano_fim = int(request.args.get("ano_fim", 2024))
+        janela = int(request.args.get("janela", 3))
+    except ValueError:
+        return jsonify({"erro": "Parâmetros numéricos inválidos"}), 400
+
+    serie_por = request.args.get("serie_por")
+    if serie_por:
+        serie_por = tuple(c.strip() for c in serie_por.split(",") if c.strip())
+    filtros = {campo: request.args.get(campo) for campo in campos_filtro}
+
+    try:
+        series = calcular_series(
+            sessao_da_requisicao(), etapa, serie_por,
+            request.args.get("metric"), filtros,
+            ano_inicio=ano_inicio, ano_fim=ano_fim, janela=janela)
+    except ValueError as e:
+        return jsonify({"erro": str(e)}), 400
+    except Exception as e:
+        logger.error(f"Erro ao calcular séries de {etapa.lower()}: {e}")
+        return jsonify({"erro": "Erro interno ao processar os dados"}), 500
+
+    return jsonify(series)
@@ -0,0 +1,45 @@
+# routes/export.py
+
+from flask import Blueprint, jsonify, request, send_file
+from flask_jwt_extended import jwt_required
+from models.database import sessao_da_requisicao
+from services.exportador import (
+    ETAPAS_EXPORTAVEIS,
+    FORMATOS,
+    FormatoIndisponivel,
+    arquivo_exportado
+)
+from routes.comum import versionado
+from logging_config import logger
+
+export_bp = Blueprint("export", __name__, url_prefix="/api/export")
+
+
+@export_bp.route("/<etapa>", methods=["GET"])
+@jwt_required()
+@versionado
+def exportar(etapa):
+    """
+    Todos os registros da etapa em um único arquivo, para consumo em lote.
+      - etapa: producao | processamento | comercializacao | importacao |
+        exportacao
+      - format (string, default=csv): csv (gzip) | parquet | arrow (IPC);
+        parquet e arrow requerem pyarrow (501 se não estiver instalado)
+    """
+    formato = request.args.get("format", "csv")
+    if etapa not in ETAPAS_EXPORTAVEIS:
+        return jsonify({"erro": "Etapa desconhecida"}), 404
+    if formato not in FORMATOS:
+        return jsonify({"erro": "Formato inválido"}), 400
+
+    try:
+        caminho = arquivo_exportado(sessao_da_requisicao(), etapa, formato)
+    except FormatoIndisponivel as e:
+        return jsonify({"erro": str(e)}), 501
+    except Exception as e:
+        logger.error(f"Erro ao exportar {etapa} ({formato}): {e}")
+        return jsonify({"erro": "Erro interno ao processar os dados"}), 500
+
+    extensao, mimetype = FORMATOS[formato]
+    return send_file(caminho, mimetype=mimetype, as_attachment=True,
+                     download_name=f"{etapa}.{extensao}")
@@ -0,0 +1,67 @@
+# routes/monitoramento.py
+
+from flask import Blueprint, current_app, jsonify, request
+from flask_jwt_extended import jwt_required
+from models.database import estatisticas_pool
+from services.cache_dados import cache_dados, estatisticas
+from services.materializacao import respostas_materializadas
+
+monitoramento_bp = Blueprint(
+    "monitoramento", __name__, url_prefix="/api/monitoramento")
+
+
+@monitoramento_bp.route("/cache", methods=["GET"])
+@jwt_required()
+def status_cache():
+    """
+    Estatísticas do cache em memória dos dados raspados ao vivo
+    (entradas, bytes ocupados, acertos e falhas) e, por chave, quantas
+    requisições estão esperando um scraping em andamento.
+    """
+    return jsonify(estatisticas())
+
+
+@monitoramento_bp.route("/cache", methods=["DELETE"])
+@jwt_required()
+def invalidar_cache():
+    """
+    Invalida o cache em memória. Parâmetro opcional (query string):
+      - etapa (string): invalida só a etapa informada (ex.: "Importação")
+    """
+    removidas = cache_dados.invalidar(request.args.get("etapa"))
+    return jsonify({"removidas": removidas})
+
+
+@monitoramento_bp.route("/respostas", methods=["GET"])
+@jwt_required()
+def status_respostas():
+    """
+    Respostas materializadas (consultas mais pedidas, já serializadas e
+    comprimidas): versão dos dados a que pertencem, quantas são, bytes
+    ocupados e acertos/falhas.
+    """
+    return jsonify(respostas_materializadas.estatisticas())
+
+
+@monitoramento_bp.route("/atualizacao", methods=["GET"])
+@jwt_required()
+def status_atualizacao():
+    """
+    Estado do agendador de atualização em segundo plano: intervalo, se
+    há uma rodada em andamento, a última execução, seu resumo e erro.
+    """
+    agendador = current_app.extensions.get("agendador")
+    if agendador is None:
+        return jsonify({"ativo": False})
+    return jsonify(agendador.estatisticas())
+
+
+@monitoramento_bp.route("/db", methods=["GET"])
+@jwt_required()
+def status_db():
+    """
+    Pool de conexões do banco neste processo: tamanho, conexões em uso e
+    livres, overflow, checkouts, timeouts e espera média/máxima (ms) por
+    uma conexão.
+    """
+    return jsonify(estatisticas_pool())
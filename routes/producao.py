@@ -1,55 +1,71 @@
 # routes/producao.py
 
-from flask import Blueprint, jsonify, request
+from flask import Blueprint
 from flask_jwt_extended import jwt_required
-from services.scraper import get_producao_data
-from logging_config import logger
+from routes.comum import (
+    agregar_rota,
+    do_scraper,
+    listar,
+    materializado,
+    series_rota,
+    versionado
+)
 
 producao_bp = Blueprint("producao", __name__, url_prefix="/api/producao")
 
-
-def paginar(dados, limit, offset):
-    return dados[offset: offset + limit]
+# o scraper só é importado no primeiro fonte=scraper
+get_producao_data = do_scraper("get_producao_data")
 
 
 @producao_bp.route("", methods=["GET"])
 @jwt_required()
+@versionado
+@materializado
 def listar_producao():
     """
     Parâmetros opcionais (query string):
       - ano (int)
       - categoria_produto (string)
       - tipo_produto (string)
-      - ano_inicio (int, default=2020)
+      - ano_inicio (int, default=1970)
       - ano_fim (int, default=2024)
       - limit (int, default=100)
       - offset (int, default=0)
+      - cursor (string): paginação por chave (vazio na primeira página,
+        depois o next_cursor da resposta anterior); a resposta vira
+        {"dados": [...], "next_cursor": ...}
+      - format (string): "ndjson" ou "json-stream" transmitem os registros
+        aos poucos, sem montar a resposta inteira em memória
+      - fonte (string): "scraper" força o scraping ao vivo da Embrapa;
+        sem ele os dados são lidos do banco
+    """
+    return listar(
+        "Produção", ("categoria_produto", "tipo_produto"), get_producao_data)
+
+
+@producao_bp.route("/agregado", methods=["GET"])
+@jwt_required()
+@versionado
+def agregar_producao():
+    """
+    Agregação em SQL (ex.: ?group_by=ano&metric=sum(quantidade_kg)).
+      - group_by (string): colunas separadas por vírgula
+      - metric (string): sum|avg|min|max|count sobre quantidade_kg,
+        valor_usd ou quantidade_l, ou count(*) (padrão)
+      - ano, ano_inicio, ano_fim e os filtros da listagem
+    """
+    return agregar_rota("Produção", ("categoria_produto", "tipo_produto"))
+
+
+@producao_bp.route("/series", methods=["GET"])
+@jwt_required()
+@versionado
+def series_producao():
+    """
+    Séries anuais com crescimento ano a ano, média móvel e CAGR.
+      - serie_por (string): colunas que identificam a série
+      - metric (string): quantidade_kg | valor_usd | quantidade_l
+      - janela (int, default=3): anos da média móvel
+      - ano_inicio, ano_fim e os filtros da listagem
     """
-    try:
-        ano_inicio = int(request.args.get("ano_inicio", 1970))
-        ano_fim = int(request.args.get("ano_fim", 2024))
-        dados = get_producao_data(ano_inicio=ano_inicio, ano_fim=ano_fim)
-    except Exception as e:
-        logger.error(f"Erro ao obter dados de produção: {e}")
-        return jsonify({"erro": "Erro interno ao processar os dados"}), 500
-
-    ano_f = request.args.get("ano")
-    if ano_f:
-        try:
-            ano_i = int(ano_f)
-            dados = [item for item in dados if item.get("ano") == ano_i]
-        except ValueError:
-            pass
-
-    cat_prod = request.args.get("categoria_produto")
-    if cat_prod:
-        dados = [item for item in dados if item.get(
-            "categoria_produto") == cat_prod]
-
-    tipo = request.args.get("tipo_produto")
-    if tipo:
-        dados = [item for item in dados if item.get("tipo_produto") == tipo]
-
-    limit = int(request.args.get("limit", 100))
-    offset = int(request.args.get("offset", 0))
-    return jsonify(paginar(dados, limit, offset))
+    return series_rota("Produção", ("categoria_produto", "tipo_produto"))
@@ -0,0 +1,27 @@
+# routes/saude.py
+
+from flask import Blueprint, jsonify
+from services.inicializacao import inicializacao
+
+saude_bp = Blueprint("saude", __name__, url_prefix="")
+
+
+@saude_bp.route("/health", methods=["GET"])
+def health():
+    """
+    Liveness: o processo está de pé e atendendo. Não consulta o banco
+    nem depende da inicialização. Não requer autenticação.
+    """
+    return jsonify({"status": "ok"})
+
+
+@saude_bp.route("/ready", methods=["GET"])
+def ready():
+    """
+    Readiness: 200 quando o esquema foi criado e a carga inicial (se
+    houver) terminou; 503 enquanto isso, com a fase e o progresso da
+    carga (etapa em andamento, etapas concluídas, percentual). Não requer
+    autenticação.
+    """
+    estado = inicializacao.estatisticas()
+    return jsonify(estado), 200 if estado["pronto"] else 503
@@ -0,0 +1,58 @@
+# scripts/benchmark_parser.py
+
+import argparse
+import os
+import time
+
+from services import scraper
+from tests.test_parser import FIXTURES, PAGINAS
+
+
+def _paginas():
+    for nome, (etapa, categoria, ano, _) in sorted(PAGINAS.items()):
+        with open(os.path.join(FIXTURES, nome), encoding="utf-8") as f:
+            yield nome, etapa, categoria, ano, f.read()
+
+
+def medir(html, etapa, categoria, ano, parser, so_tabela, repeticoes):
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        scraper.extrair_pagina(etapa, html, categoria, ano,
+                               parser=parser, so_tabela=so_tabela)
+    return (time.perf_counter() - inicio) / repeticoes
+
+
+def benchmark(repeticoes: int = 50):
+    """
+    Tempo médio de parse + extração por página, para cada backend
+    disponível, com e sem o modo que só materializa a tabela tb_dados.
+    """
+    backends = ["html.parser"]
+    if scraper._resolver_parser("auto") == "lxml":
+        backends.append("lxml")
+
+    modos = [(parser, so_tabela)
+             for parser in backends for so_tabela in (False, True)]
+    cabecalho = "".join(
+        f"{parser + (' +tabela' if so_tabela else ''):>22}"
+        for parser, so_tabela in modos)
+    print(f"{'página':<36}{cabecalho}")
+
+    totais = [0.0] * len(modos)
+    for nome, etapa, categoria, ano, html in _paginas():
+        tempos = [medir(html, etapa, categoria, ano, parser, so_tabela,
+                        repeticoes)
+                  for parser, so_tabela in modos]
+        totais = [t + novo for t, novo in zip(totais, tempos)]
+        print(f"{nome:<36}" + "".join(f"{t * 1000:>19.2f} ms" for t in tempos))
+
+    print(f"{'média por página':<36}"
+          + "".join(f"{t / len(PAGINAS) * 1000:>19.2f} ms" for t in totais))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Mede o tempo de parse das páginas salvas do vitibrasil")
+    parser.add_argument("-n", "--repeticoes", type=int, default=50)
+    args = parser.parse_args()
+    benchmark(args.repeticoes)
@@ -1,94 +1,413 @@
 # scripts/populate_db.py
 
+import argparse
+import hashlib
+import json
+import os
+import time
+from datetime import date, datetime, timezone
+
 from services.scraper import (
-    get_processamento_data,
-    get_producao_data,
-    get_comercializacao_data,
-    get_importacao_data,
-    get_exportacao_data
+    ETAPAS,
+    FONTES,
+    campo_categoria,
+    categorias_da_etapa,
+    coletar_paginas
 )
+from services.agregacao import atualizar_agregados
+from services.balanca import atualizar_balanca
+from services.snapshot import gerar_snapshot
+from services.versao import incrementar_versao, ler_versao
 from models.database import SessionLocal, init_db
 from models.cultivar import Cultivar
-from sqlalchemy import and_
+from models.sincronizacao import EstadoSincronizacao
+from sqlalchemy import insert
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+# Registros por INSERT multi-linha em `salvar`
+POPULATE_BATCH_SIZE = int(os.getenv("POPULATE_BATCH_SIZE", "500"))
+
+# Colunas de `uix_cultivar_unico`: definem quando um registro é duplicata
+_COLUNAS_UNICAS = (
+    "etapa", "ano", "categoria_uva", "tipo_uva", "nome_uva",
+    "categoria_produto", "tipo_produto", "produto", "quantidade_l",
+    "quantidade_kg", "valor_usd", "pais",
+)
 
 
 def banco_vazio(session):
     return session.query(Cultivar).first() is None
 
 
-def salvar(dados, session):
+def _normalizar(item: dict) -> dict:
+    """
+    Converte um registro do scraper em uma linha com exatamente as colunas
+    de `uix_cultivar_unico` (campos ausentes viram None).
+    """
+    linha = {coluna: None for coluna in _COLUNAS_UNICAS}
+    for k, v in item.items():
+        if k in ("quantidade/L", "Quantidade/L"):
+            linha["quantidade_l"] = v
+        elif k in linha:
+            linha[k] = v
+    return linha
+
+
+def _chave(linha: dict) -> tuple:
+    return tuple(linha[coluna] for coluna in _COLUNAS_UNICAS)
+
+
+def _carregar_chaves(session, linhas: list[dict], existentes: dict):
+    """
+    Completa `existentes` ({(etapa, ano): chaves únicas já gravadas}) com
+    as (etapa, ano) do lote ainda não lidas, numa só consulta: cada par é
+    lido uma vez por chamada de `salvar`, não a cada lote.
+    """
+    faltando = {(linha["etapa"], linha["ano"]) for linha in linhas} \
+        - existentes.keys()
+    if not faltando:
+        return
+    etapas = {etapa for etapa, _ in faltando}
+    anos = {ano for _, ano in faltando}
+    for etapa in etapas:
+        for ano in anos:
+            existentes.setdefault((etapa, ano), set())
+    colunas = [getattr(Cultivar, coluna) for coluna in _COLUNAS_UNICAS]
+    query = session.query(*colunas).filter(
+        Cultivar.etapa.in_(etapas), Cultivar.ano.in_(anos))
+    for row in query:
+        existentes[(row.etapa, row.ano)].add(tuple(row))
+
+
+def _inserir_lote(session, linhas: list[dict]) -> int:
+    """
+    INSERT de várias linhas num único comando, ignorando conflitos com
+    `uix_cultivar_unico` (ON CONFLICT DO NOTHING no Postgres e no SQLite,
+    INSERT IGNORE no MySQL). Retorna quantas linhas foram inseridas.
+    """
+    dialeto = session.get_bind().dialect.name
+    if dialeto == "postgresql":
+        stmt = pg_insert(Cultivar).values(linhas).on_conflict_do_nothing(
+            constraint="uix_cultivar_unico")
+    elif dialeto == "sqlite":
+        stmt = sqlite_insert(Cultivar).values(linhas).on_conflict_do_nothing()
+    elif dialeto == "mysql":
+        stmt = insert(Cultivar).values(linhas).prefix_with("IGNORE")
+    else:
+        stmt = insert(Cultivar).values(linhas)
+    result = session.execute(stmt)
+    return result.rowcount if result.rowcount is not None \
+        and result.rowcount >= 0 else len(linhas)
+
+
+def salvar(dados, session, batch_size: int | None = None,
+           imprimir_resumo: bool = True):
+    """
+    Grava os registros em lotes de `batch_size` (padrão
+    POPULATE_BATCH_SIZE): um INSERT multi-linha por lote, em vez de um
+    por registro. As chaves já gravadas são lidas uma vez por (etapa, ano),
+    quando o primeiro lote com o par aparece.
+
+    Um registro é ignorado quando já existe no banco (ou no próprio lote)
+    com os mesmos valores nas colunas de `uix_cultivar_unico`. A checagem
+    é feita também em Python porque a constraint não detecta duplicatas
+    com colunas NULL (NULL != NULL em SQL). Retorna (inseridos, ignorados).
+    """
+    batch_size = batch_size or POPULATE_BATCH_SIZE
     novos = 0
     ignorados = 0
+    vistos: set[tuple] = set()
+    existentes: dict[tuple, set[tuple]] = {}
+
+    for inicio in range(0, len(dados), batch_size):
+        linhas = [_normalizar(item)
+                  for item in dados[inicio:inicio + batch_size]]
+        _carregar_chaves(session, linhas, existentes)
+
+        lote = []
+        for linha in linhas:
+            chave = _chave(linha)
+            if chave in existentes[(linha["etapa"], linha["ano"])] \
+                    or chave in vistos:
+                ignorados += 1
+                continue
+            vistos.add(chave)
+            lote.append(linha)
+
+        if lote:
+            inseridos = _inserir_lote(session, lote)
+            novos += inseridos
+            ignorados += len(lote) - inseridos
+
+    if imprimir_resumo:
+        print(
+            f"\nResumo: {novos} inseridos | {ignorados} ignorados (duplicatas)\n")
+    return novos, ignorados
+
+
+# =====================< SINCRONIZAÇÃO INCREMENTAL >==================
+
+def hash_registros(registros: list[dict]) -> str:
+    """Hash estável do conteúdo extraído de uma página."""
+    texto = json.dumps(registros, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(texto.encode("utf-8")).hexdigest()
+
+
+def anos_abertos(hoje: date | None = None) -> set[int]:
+    """Anos que a Embrapa ainda revisa: o atual e o anterior."""
+    ano_atual = (hoje or date.today()).year
+    return {ano_atual - 1, ano_atual}
+
+
+def _remover_pagina(session, etapa, categoria, ano):
+    query = session.query(Cultivar).filter(
+        Cultivar.etapa == etapa, Cultivar.ano == ano)
+    coluna = campo_categoria(etapa)
+    if coluna is not None:
+        query = query.filter(getattr(Cultivar, coluna) == categoria)
+    return query.delete(synchronize_session=False)
 
-    for item in dados:
-        filtros = []
-
-        if item.get("etapa") is not None:
-            filtros.append(Cultivar.etapa == item["etapa"])
-        if item.get("categoria_uva") is not None:
-            filtros.append(Cultivar.categoria_uva == item["categoria_uva"])
-        if item.get("tipo_uva") is not None:
-            filtros.append(Cultivar.tipo_uva == item["tipo_uva"])
-        if item.get("nome_uva") is not None:
-            filtros.append(Cultivar.nome_uva == item["nome_uva"])
-        if item.get("categoria_produto") is not None:
-            filtros.append(Cultivar.categoria_produto ==
-                           item["categoria_produto"])
-        if item.get("tipo_produto") is not None:
-            filtros.append(Cultivar.tipo_produto == item["tipo_produto"])
-        if item.get("produto") is not None:
-            filtros.append(Cultivar.produto == item["produto"])
-        if item.get("quantidade_l"):
-            filtros.append(Cultivar.quantidade_l == item["quantidade_l"])
-        qtkg = item.get("quantidade_kg")
-        if isinstance(qtkg, int):
-            filtros.append(Cultivar.quantidade_kg == qtkg)
-
-        valor_usd = item.get("valor_usd")
-        if isinstance(valor_usd, int):
-            filtros.append(Cultivar.valor_usd == valor_usd)
-        if item.get("ano") is not None:
-            filtros.append(Cultivar.ano == item["ano"])
-        if item.get("pais"):
-            filtros.append(Cultivar.pais == item["pais"])
-
-        exists = session.query(Cultivar).filter(and_(*filtros)).first()
-
-        if not exists:
-            # Constrói o dicionário “novo_item” exatamente com as chaves que nosso modelo aceita:
-            novo_item = {}
-            for k, v in item.items():
-                if k in ("quantidade/L", "Quantidade/L"):
-                    novo_item["quantidade_l"] = v
-                else:
-                    novo_item[k] = v
-            session.add(Cultivar(**novo_item))
-            novos += 1
-            print(f"✔ Inserido: {novo_item}")
+
+def _estados_da_etapa(session, etapa) -> dict:
+    return {
+        (e.subopcao, e.ano): e
+        for e in session.query(EstadoSincronizacao).filter(
+            EstadoSincronizacao.etapa == etapa)
+    }
+
+
+def _coletar_etapa(etapa, estados, ano_inicio, ano_fim, forcar, abertos,
+                   max_workers, fonte) -> list:
+    subopcoes = categorias_da_etapa(etapa)
+    # anos agrupados pelas categorias a buscar: nos anos em aberto (ou
+    # com `forcar`) todas; nos fechados, só as nunca sincronizadas
+    pendentes: dict[tuple, list[int]] = {}
+    for ano in range(ano_inicio, ano_fim + 1):
+        categorias = tuple(
+            categoria for categoria, subopcao in subopcoes.items()
+            if forcar or ano in abertos
+            or (subopcao or "", ano) not in estados)
+        if categorias:
+            pendentes.setdefault(categorias, []).append(ano)
+
+    paginas = []
+    for categorias, anos in pendentes.items():
+        paginas.extend(coletar_paginas(
+            etapa, anos, max_workers, fonte,
+            categorias=None if len(categorias) == len(subopcoes)
+            else list(categorias)))
+    return paginas
+
+
+def coletar_pendentes(session, etapas=None, ano_inicio: int = 1970,
+                      ano_fim: int | None = None, forcar: bool = False,
+                      max_workers: int | None = None,
+                      fonte: str | None = None) -> dict:
+    """
+    Busca no site as páginas que `sincronizar` buscaria, sem gravar nada.
+    A sessão só é lida (estado da sincronização); quem chama a fecha antes
+    de abrir a transação de escrita e passa o resultado em
+    `sincronizar(..., paginas=...)`, de modo que a raspagem não segura
+    transação nenhuma aberta. Retorna {etapa: [PaginaColetada, ...]}.
+    """
+    ano_fim = ano_fim or date.today().year
+    abertos = anos_abertos()
+    return {
+        etapa: _coletar_etapa(
+            etapa, _estados_da_etapa(session, etapa), ano_inicio, ano_fim,
+            forcar, abertos, max_workers, fonte)
+        for etapa in (etapas or ETAPAS)
+    }
+
+
+def sincronizar(session, etapas=None, ano_inicio: int = 1970,
+                ano_fim: int | None = None, forcar: bool = False,
+                max_workers: int | None = None,
+                fonte: str | None = None, confirmar: bool = True,
+                progresso=None, paginas: dict | None = None) -> dict:
+    """
+    Sincronização incremental com o site da Embrapa.
+
+    Para cada etapa, só busca as páginas (subopção, ano) que nunca foram
+    sincronizadas e as dos anos em aberto (ou todas, com `forcar`). Uma
+    página cujo hash de conteúdo mudou tem seus registros substituídos;
+    uma página igual à anterior só tem a data de sincronização atualizada.
+    Uma página que falhou ou veio sem registros (erro ou manutenção do
+    site) conta como falha e mantém os registros e o hash anteriores.
+    O estado fica na tabela `estado_sincronizacao`.
+
+    `ano_fim` padrão é o ano atual, de modo que anos novos publicados no
+    site entram sem precisar recriar o banco. `fonte="csv"` busca as
+    páginas nos arquivos de download do site (ver `coletar_paginas`).
+    Com `confirmar=False` nada é confirmado (só flush), para a carga
+    inteira entrar numa única transação de quem chamou. `progresso`, se
+    informado, é chamado como progresso(etapa, concluidas, total) antes de
+    cada etapa e como progresso(None, total, total) no fim. `paginas`, se
+    informado, traz as páginas já buscadas por `coletar_pendentes`, e aí
+    nada é buscado no site.
+    Retorna um resumo por etapa.
+    """
+    ano_fim = ano_fim or date.today().year
+    abertos = anos_abertos()
+    resumo = {}
+    etapas = list(etapas or (paginas.keys() if paginas else ETAPAS))
+
+    for indice, etapa in enumerate(etapas):
+        if progresso is not None:
+            progresso(etapa, indice, len(etapas))
+        estados = _estados_da_etapa(session, etapa)
+        contagem = {"paginas": 0, "alteradas": 0, "inalteradas": 0,
+                    "falhas": 0, "inseridos": 0, "removidos": 0}
+
+        if paginas is not None:
+            coletadas = paginas.get(etapa, [])
         else:
-            ignorados += 1
+            coletadas = _coletar_etapa(
+                etapa, estados, ano_inicio, ano_fim, forcar, abertos,
+                max_workers, fonte)
+
+        for pagina in coletadas:
+            subopcao = pagina.subopcao or ""
+            estado = estados.get((subopcao, pagina.ano))
+            if not forcar and estado is not None \
+                    and pagina.ano not in abertos:
+                continue  # página fechada já sincronizada
+            contagem["paginas"] += 1
+            if not pagina.registros:
+                contagem["falhas"] += 1
+                continue
 
-    print(
-        f"\nResumo: {novos} inseridos | {ignorados} ignorados (duplicatas)\n")
+            agora = datetime.now(timezone.utc).replace(tzinfo=None)
+            hash_atual = hash_registros(pagina.registros)
+            if estado is not None and estado.hash_conteudo == hash_atual:
+                estado.sincronizado_em = agora
+                contagem["inalteradas"] += 1
+                continue
 
+            contagem["alteradas"] += 1
+            contagem["removidos"] += _remover_pagina(
+                session, etapa, pagina.categoria, pagina.ano)
+            novos, _ = salvar(
+                pagina.registros, session, imprimir_resumo=False)
+            contagem["inseridos"] += novos
 
-def popular_banco():
+            if estado is None:
+                estado = EstadoSincronizacao(
+                    etapa=etapa, subopcao=subopcao, ano=pagina.ano)
+                session.add(estado)
+                estados[(subopcao, pagina.ano)] = estado
+            estado.categoria = pagina.categoria
+            estado.hash_conteudo = hash_atual
+            estado.registros = len(pagina.registros)
+            estado.sincronizado_em = agora
+
+        if confirmar:
+            session.commit()
+        else:
+            session.flush()
+        resumo[etapa] = contagem
+        print(f"🔄 {etapa}: {contagem}")
+
+    if progresso is not None:
+        progresso(None, len(etapas), len(etapas))
+    return resumo
+
+
+def registrar_versao(session, resumo: dict | None = None,
+                     confirmar: bool = True):
+    """
+    Incrementa a versão dos dados (ETag/Last-Modified da API) quando a
+    carga alterou alguma página, ou quando o banco ainda não tem versão.
+    """
+    alterou = any(c["alteradas"] for c in (resumo or {}).values())
+    if alterou or ler_versao(session) is None:
+        versao = incrementar_versao(session, confirmar)
+        print(f"🏷 Versão dos dados: {versao.numero}")
+
+
+def popular_banco(incremental: bool = False, forcar: bool = False,
+                  fonte: str | None = None, progresso=None):
+    """
+    Com o banco vazio, faz a carga completa (registrando o estado de cada
+    página). Com `incremental=True`, sincroniza só o que mudou mesmo com o
+    banco já populado; `forcar=True` rebusca todas as páginas. `fonte`
+    escolhe entre o HTML e os CSVs de download (padrão: SCRAPER_FONTE);
+    `progresso` é repassado ao `sincronizar`.
+    Depois de cada carga, os agregados pré-calculados e a balança
+    comercial são refeitos e a versão dos dados é incrementada se algo
+    mudou.
+    """
     session = SessionLocal()
-    if banco_vazio(session):
-        print("📦 Banco vazio. Iniciando inserção de dados da Embrapa...\n")
-        salvar(get_producao_data(), session)
-        salvar(get_processamento_data(), session)
-        salvar(get_comercializacao_data(), session)
-        salvar(get_importacao_data(), session)
-        salvar(get_exportacao_data(), session)
-        print("✅ Dados populados com sucesso.")
-    else:
-        print("⚠ Banco já possui dados. Nenhuma inserção realizada.")
+    try:
+        if banco_vazio(session):
+            print("📦 Banco vazio. Iniciando inserção de dados da Embrapa...\n")
+            resumo = sincronizar(session, fonte=fonte, progresso=progresso)
+            atualizar_agregados(session)
+            atualizar_balanca(session)
+            registrar_versao(session, resumo)
+            print("✅ Dados populados com sucesso.")
+        elif incremental:
+            print("🔄 Sincronização incremental com a Embrapa...\n")
+            resumo = sincronizar(session, forcar=forcar, fonte=fonte,
+                                 progresso=progresso)
+            atualizar_agregados(session)
+            atualizar_balanca(session)
+            registrar_versao(session, resumo)
+            print("✅ Sincronização concluída.")
+        else:
+            print("⚠ Banco já possui dados. Nenhuma inserção realizada.")
+            registrar_versao(session)
+        session.commit()
+    finally:
+        session.close()
 
-    session.commit()
-    session.close()
+
+def gravar_snapshot(caminho: str):
+    """Grava em `caminho` o snapshot compacto do banco (services.snapshot)."""
+    session = SessionLocal()
+    try:
+        cabecalho = gerar_snapshot(session, caminho)
+    finally:
+        session.close()
+    print(f"📸 Snapshot gravado em {caminho}: {cabecalho['etapas']}")
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Popula o banco com os dados da Embrapa")
+    parser.add_argument(
+        "--incremental", action="store_true",
+        help="sincroniza só as páginas novas, abertas ou alteradas")
+    parser.add_argument(
+        "--forcar", action="store_true",
+        help="com --incremental, rebusca também os anos já sincronizados")
+    parser.add_argument(
+        "--fonte", choices=FONTES,
+        help="html (uma página por categoria/ano) ou csv (arquivos de "
+             "download, com o HTML como reserva); padrão: SCRAPER_FONTE")
+    parser.add_argument(
+        "--intervalo", type=int, default=0,
+        help="segundos entre sincronizações: mantém o processo rodando e "
+             "atualiza os anos em aberto periodicamente (modo sidecar)")
+    parser.add_argument(
+        "--snapshot", metavar="ARQUIVO",
+        help="depois da carga, grava um snapshot compacto dos dados, que o "
+             "app carrega na inicialização (SNAPSHOT_PATH) sem banco nem rede")
+    args = parser.parse_args()
+
     init_db()
-    popular_banco()
+    popular_banco(incremental=args.incremental, forcar=args.forcar,
+                  fonte=args.fonte)
+    if args.snapshot:
+        gravar_snapshot(args.snapshot)
+    if args.intervalo > 0:
+        from services.agendador import atualizar_dados
+        while True:
+            time.sleep(args.intervalo)
+            try:
+                resumo = atualizar_dados(args.fonte)
+                if args.snapshot and resumo is not None:
+                    gravar_snapshot(args.snapshot)
+            except Exception as e:
+                print(f"⚠ Falha na sincronização periódica: {e}")
@@ -0,0 +1,191 @@
+# services/agendador.py
+
+import contextlib
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import func
+
+from logging_config import logger
+from models.database import SessionLocal
+from models.sincronizacao import EstadoSincronizacao
+from routes.comum import aquecer_consulta
+from scripts.populate_db import (
+    coletar_pendentes,
+    registrar_versao,
+    sincronizar
+)
+from services.agregacao import atualizar_agregados
+from services.balanca import atualizar_balanca
+from services.cache_compartilhado import (
+    CACHE_COMPARTILHADO_PATH,
+    trava_arquivo
+)
+from services.materializacao import respostas_materializadas
+from services.versao import esquecer_versao
+
+# =============< CONFIGURAÇÕES GERAIS >===============================
+
+# Intervalo (segundos) entre atualizações automáticas; 0 desliga
+ATUALIZACAO_INTERVALO = int(os.getenv("ATUALIZACAO_INTERVALO", "0"))
+
+# Listagens sempre aquecidas após uma atualização, além das mais pedidas
+_ROTAS_PADRAO = (
+    "/api/producao", "/api/processamento", "/api/comercializacao",
+    "/api/importacao", "/api/exportacao",
+)
+
+
+# =====================< ATUALIZAÇÃO >================================
+
+def _atualizado_ha_pouco(session, segundos: float) -> bool:
+    # com vários workers cada um tem seu agendador: quem chega depois de
+    # uma sincronização recente (de outro processo) não a repete
+    if segundos <= 0:
+        return False
+    ultima = session.query(func.max(EstadoSincronizacao.sincronizado_em)).scalar()
+    agora = datetime.now(timezone.utc).replace(tzinfo=None)
+    return ultima is not None and agora - ultima < timedelta(seconds=segundos)
+
+
+def _trava_rodada():
+    # workers do mesmo host fazem a rodada um de cada vez; quem vem depois
+    # encontra a sincronização recente e a pula (`pular_se_recente`)
+    if not CACHE_COMPARTILHADO_PATH:
+        return contextlib.nullcontext()
+    return trava_arquivo(os.path.dirname(CACHE_COMPARTILHADO_PATH),
+                         "agendador")
+
+
+def atualizar_dados(fonte: str | None = None,
+                    pular_se_recente: float = 0) -> dict | None:
+    """
+    Sincroniza os anos em aberto (e páginas nunca buscadas), refaz
+    agregados e balança e incrementa a versão dos dados, tudo numa única
+    transação: até o commit, as requisições continuam lendo a versão
+    anterior completa; depois dele, a nova. As páginas são buscadas no
+    site antes, com a sessão de leitura já fechada, para a transação de
+    escrita não ficar aberta durante a raspagem. Retorna o resumo da
+    sincronização, ou None se outro processo sincronizou há menos de
+    `pular_se_recente` segundos.
+    """
+    session = SessionLocal()
+    try:
+        if _atualizado_ha_pouco(session, pular_se_recente):
+            return None
+        paginas = coletar_pendentes(session, fonte=fonte)
+    finally:
+        session.close()
+
+    session = SessionLocal()
+    try:
+        resumo = sincronizar(session, confirmar=False, paginas=paginas)
+        atualizar_agregados(session, confirmar=False)
+        atualizar_balanca(session, confirmar=False)
+        registrar_versao(session, resumo, confirmar=False)
+        session.commit()
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        session.close()
+    esquecer_versao()
+    return resumo
+
+
+def aquecer_respostas(app) -> int:
+    """
+    Refaz, para a versão atual, as respostas materializadas das consultas
+    mais pedidas (e das listagens padrão), para que o primeiro cliente
+    depois de uma atualização não pague a consulta. Retorna quantas
+    consultas foram feitas.
+    """
+    assinaturas = list(respostas_materializadas.mais_pedidas())
+    for rota in _ROTAS_PADRAO:
+        if (rota, ()) not in assinaturas:
+            assinaturas.append((rota, ()))
+
+    feitas = sum(aquecer_consulta(app, caminho, argumentos)
+                 for caminho, argumentos in assinaturas)
+    logger.info(f"[Agendador] {feitas} respostas aquecidas")
+    return feitas
+
+
+# =====================< AGENDADOR >==================================
+
+class Agendador:
+    """
+    Thread em segundo plano que, a cada `intervalo` segundos, atualiza
+    os dados (`atualizar_dados`) e aquece as respostas. Enquanto isso as
+    requisições seguem sendo atendidas com a versão anterior.
+    """
+
+    def __init__(self, app, intervalo: int = ATUALIZACAO_INTERVALO,
+                 fonte: str | None = None):
+        self.app = app
+        self.intervalo = intervalo
+        self.fonte = fonte
+        self._parar = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+        self.execucoes = 0
+        self.em_andamento = False
+        self.ultima_execucao = None
+        self.ultimo_resumo = None
+        self.ultimo_erro = None
+
+    def executar(self):
+        """Uma rodada: atualiza os dados e aquece as respostas."""
+        with self._lock:
+            if self.em_andamento:
+                return
+            self.em_andamento = True
+        inicio = time.monotonic()
+        try:
+            with _trava_rodada():
+                resumo = atualizar_dados(
+                    self.fonte, pular_se_recente=self.intervalo / 2)
+            if resumo is not None:
+                self.ultimo_resumo = resumo
+            aquecer_respostas(self.app)
+            self.ultimo_erro = None
+        except Exception as e:
+            logger.error(f"[Agendador] falha na atualização: {e}")
+            self.ultimo_erro = str(e)
+        finally:
+            self.execucoes += 1
+            self.ultima_execucao = datetime.now(timezone.utc).isoformat()
+            self.em_andamento = False
+            logger.info(f"[Agendador] rodada em "
+                        f"{time.monotonic() - inicio:.1f}s")
+
+    def _laco(self):
+        while not self._parar.wait(self.intervalo):
+            self.executar()
+
+    def iniciar(self):
+        if self.intervalo <= 0 or self._thread is not None:
+            return
+        self._thread = threading.Thread(
+            target=self._laco, daemon=True, name="agendador")
+        self._thread.start()
+        logger.info(f"[Agendador] atualização a cada {self.intervalo}s")
+
+    def parar(self):
+        self._parar.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def estatisticas(self) -> dict:
+        return {
+            "intervalo": self.intervalo,
+            "ativo": self._thread is not None,
+            "em_andamento": self.em_andamento,
+            "execucoes": self.execucoes,
+            "ultima_execucao": self.ultima_execucao,
+            "ultimo_resumo": self.ultimo_resumo,
+            "ultimo_erro": self.ultimo_erro,
+        }
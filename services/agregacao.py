@@ -0,0 +1,262 @@
+# services/agregacao.py
+
+import re
+from datetime import datetime, timezone
+from decimal import Decimal
+from typing import NamedTuple
+
+from sqlalchemy import BigInteger, case, cast, func
+
+from logging_config import logger
+from models.agregado import Agregado
+from models.cultivar import Cultivar
+from services.consulta import filtrar_cultivares
+from services.scraper import ETAPAS, TABELAS
+
+# =============< CONFIGURAÇÕES GERAIS >===============================
+
+# Colunas aceitas em group_by
+DIMENSOES = (
+    "ano", "pais", "categoria_uva", "tipo_uva", "nome_uva",
+    "categoria_produto", "tipo_produto", "produto",
+)
+
+_FUNCOES = {
+    "sum": func.sum,
+    "avg": func.avg,
+    "min": func.min,
+    "max": func.max,
+    "count": func.count,
+}
+
+# `quantidade_l` é gravada como texto no formato do site ("1.234.567",
+# "-" para zero); a expressão abaixo a converte para número em SQL
+_LITROS = case(
+    (Cultivar.quantidade_l.in_(("", "-", "nd", "*")), None),
+    else_=cast(func.replace(Cultivar.quantidade_l, ".", ""), BigInteger),
+)
+
+# Campos numéricos aceitos nas métricas
+CAMPOS_NUMERICOS = {
+    "quantidade_kg": Cultivar.quantidade_kg,
+    "valor_usd": Cultivar.valor_usd,
+    "quantidade_l": _LITROS,
+}
+
+_METRICA = re.compile(r"\s*(sum|avg|min|max|count)\(\s*(\w+|\*)\s*\)\s*")
+
+
+class Metrica(NamedTuple):
+    funcao: str
+    campo: str  # "*" só em count(*)
+
+    @property
+    def nome(self) -> str:
+        return "count" if self.campo == "*" else f"{self.funcao}_{self.campo}"
+
+
+# =====================< PARÂMETROS >=================================
+
+def interpretar_group_by(texto: str | None) -> tuple[str, ...]:
+    """ "ano,pais" -> ("ano", "pais"); levanta ValueError fora de DIMENSOES."""
+    colunas = tuple(c.strip() for c in (texto or "").split(",") if c.strip())
+    invalidas = [c for c in colunas if c not in DIMENSOES]
+    if invalidas:
+        raise ValueError(f"group_by inválido: {', '.join(invalidas)}")
+    if len(set(colunas)) != len(colunas):
+        raise ValueError("group_by com colunas repetidas")
+    return colunas
+
+
+def interpretar_metricas(texto: str | None) -> tuple[Metrica, ...]:
+    """
+    "sum(valor_usd),avg(quantidade_kg)" -> (Metrica, ...). Sem `texto`,
+    conta os registros. Levanta ValueError para funções/campos fora da
+    lista permitida.
+    """
+    texto = texto or "count(*)"
+    metricas, posicao = [], 0
+    while posicao < len(texto):
+        encontrada = _METRICA.match(texto, posicao)
+        if not encontrada:
+            raise ValueError(f"metric inválida: {texto}")
+        funcao, campo = encontrada.groups()
+        if campo == "*" and funcao != "count" \
+                or campo != "*" and campo not in CAMPOS_NUMERICOS:
+            raise ValueError(f"metric inválida: {funcao}({campo})")
+        metricas.append(Metrica(funcao, campo))
+        posicao = encontrada.end()
+        if posicao < len(texto):
+            if texto[posicao] != ",":
+                raise ValueError(f"metric inválida: {texto}")
+            posicao += 1
+    return tuple(metricas)
+
+
+# =====================< AGREGAÇÃO EM SQL >===========================
+
+def _coluna_categoria(etapa: str) -> str:
+    """Coluna que a dimensão "categoria" dos agregados representa."""
+    spec = TABELAS[etapa]
+    return spec.campo_categoria or spec.campo_item
+
+
+def _expressao(metrica: Metrica):
+    if metrica.campo == "*":
+        return func.count()
+    return _FUNCOES[metrica.funcao](CAMPOS_NUMERICOS[metrica.campo])
+
+
+def sem_linha_total(query):
+    # Importação/Exportação trazem a linha "Total" do site como um país;
+    # somá-la junto dos países dobraria os totais
+    return query.filter((Cultivar.pais.is_(None)) | (Cultivar.pais != "Total"))
+
+
+def _numero(valor):
+    # somas e médias voltam como Decimal em alguns bancos (ex.: Postgres)
+    if isinstance(valor, Decimal):
+        return int(valor) if valor == valor.to_integral_value() \
+            else float(valor)
+    return valor
+
+
+def _linhas(resultado, nomes) -> list[dict]:
+    return [{nome: _numero(valor) for nome, valor in zip(nomes, linha)}
+            for linha in resultado]
+
+
+def agregar_sql(session, etapa: str, group_by: tuple, metricas: tuple,
+                filtros: dict | None = None, ano: int | None = None,
+                ano_inicio: int = 1970, ano_fim: int = 2024) -> list[dict]:
+    """GROUP BY direto sobre `cultivares`, com os mesmos filtros das rotas."""
+    colunas = [getattr(Cultivar, nome) for nome in group_by]
+    query = session.query(*colunas, *[_expressao(m) for m in metricas])
+    query = sem_linha_total(filtrar_cultivares(
+        query, etapa, filtros, ano=ano, ano_inicio=ano_inicio,
+        ano_fim=ano_fim))
+    if colunas:
+        query = query.group_by(*colunas).order_by(*colunas)
+    return _linhas(query.all(), [*group_by, *[m.nome for m in metricas]])
+
+
+# =====================< AGREGADOS PRÉ-CALCULADOS >===================
+
+def _dimensao_pre_calculada(etapa: str, group_by: tuple) -> tuple | None:
+    """
+    (dimensão, coluna) dos agregados que respondem a `group_by`, ou None.
+    Servem group_by = ano, <categoria>[,ano] e pais[,ano].
+    """
+    resto = tuple(c for c in group_by if c != "ano")
+    if not resto:
+        return ("ano", None) if group_by else None
+    if len(resto) > 1:
+        return None
+    if resto[0] == _coluna_categoria(etapa):
+        return ("categoria", resto[0])
+    if resto[0] == "pais":
+        return ("pais", "pais")
+    return None
+
+
+def agregar_pre_calculado(session, etapa: str, group_by: tuple,
+                          metricas: tuple, ano: int | None = None,
+                          ano_inicio: int = 1970,
+                          ano_fim: int = 2024) -> list[dict] | None:
+    """
+    Responde a partir da tabela `agregados` quando a consulta cabe nela:
+    só somas e count(*), group_by coberto por uma dimensão e nenhum filtro
+    além dos de ano. count(<campo>) conta os não nulos, que os agregados
+    não guardam: cai no SQL. Retorna None quando não cabe (ou a tabela ainda não
+    foi calculada para a etapa).
+    """
+    dimensao = _dimensao_pre_calculada(etapa, group_by)
+    if dimensao is None or any(
+            m.funcao != "sum" and m.campo != "*" for m in metricas):
+        return None
+    dimensao, coluna = dimensao
+
+    expressoes = {"ano": Agregado.ano, coluna: Agregado.chave}
+    agrupar = [expressoes[nome] for nome in group_by]
+    valores = [func.sum(Agregado.registros) if m.campo == "*"
+               else func.sum(getattr(Agregado, m.campo)) for m in metricas]
+
+    base = session.query(Agregado).filter(
+        Agregado.etapa == etapa, Agregado.dimensao == dimensao)
+    if base.first() is None:
+        return None
+    query = session.query(*agrupar, *valores).filter(
+        Agregado.etapa == etapa, Agregado.dimensao == dimensao,
+        Agregado.ano >= ano_inicio, Agregado.ano <= ano_fim)
+    if ano is not None:
+        query = query.filter(Agregado.ano == ano)
+    query = query.group_by(*agrupar).order_by(*agrupar)
+    return _linhas(query.all(), [*group_by, *[m.nome for m in metricas]])
+
+
+def agregar(session, etapa: str, group_by: tuple, metricas: tuple,
+            filtros: dict | None = None, ano: int | None = None,
+            ano_inicio: int = 1970, ano_fim: int = 2024,
+            usar_pre_calculados: bool = True) -> tuple[list[dict], bool]:
+    """
+    Agrega os registros da etapa. Usa os agregados pré-calculados quando
+    possível e, senão, um GROUP BY em `cultivares`.
+    Retorna (linhas, veio_dos_pre_calculados).
+    """
+    if usar_pre_calculados and not any((filtros or {}).values()):
+        linhas = agregar_pre_calculado(
+            session, etapa, group_by, metricas, ano=ano,
+            ano_inicio=ano_inicio, ano_fim=ano_fim)
+        if linhas is not None:
+            return linhas, True
+    return agregar_sql(session, etapa, group_by, metricas, filtros, ano=ano,
+                       ano_inicio=ano_inicio, ano_fim=ano_fim), False
+
+
+def atualizar_agregados(session, etapas=None, confirmar: bool = True) -> int:
+    """
+    Refaz a tabela `agregados` das etapas (padrão: todas) a partir de
+    `cultivares`, com um GROUP BY por dimensão. Chamado pelo populate_db
+    ao fim de cada carga. Retorna quantas linhas foram gravadas.
+    `confirmar=False` deixa o commit para quem chamou.
+    """
+    agora = datetime.now(timezone.utc).replace(tzinfo=None)
+    totais = (func.count(), func.sum(Cultivar.quantidade_kg),
+              func.sum(Cultivar.valor_usd), func.sum(_LITROS))
+    gravadas = 0
+
+    for etapa in etapas or ETAPAS:
+        session.query(Agregado).filter(Agregado.etapa == etapa).delete(
+            synchronize_session=False)
+        dimensoes = {
+            "ano": None,
+            "categoria": getattr(Cultivar, _coluna_categoria(etapa)),
+            "pais": Cultivar.pais,
+        }
+        linhas = []
+        for dimensao, coluna in dimensoes.items():
+            agrupar = [Cultivar.ano] + ([coluna] if coluna is not None else [])
+            query = sem_linha_total(session.query(*agrupar, *totais).filter(
+                Cultivar.etapa == etapa))
+            if coluna is not None:
+                query = query.filter(coluna.isnot(None))
+            for linha in query.group_by(*agrupar):
+                if coluna is None:
+                    ano, registros, kg, usd, litros = linha
+                    chave = ""
+                else:
+                    ano, chave, registros, kg, usd, litros = linha
+                linhas.append({
+                    "etapa": etapa, "dimensao": dimensao, "chave": chave,
+                    "ano": ano, "registros": registros, "quantidade_kg": kg,
+                    "valor_usd": usd, "quantidade_l": litros,
+                    "atualizado_em": agora,
+                })
+        if linhas:
+            session.bulk_insert_mappings(Agregado, linhas)
+        gravadas += len(linhas)
+
+    if confirmar:
+        session.commit()
+    logger.info(f"[Agregados] {gravadas} linhas recalculadas")
+    return gravadas
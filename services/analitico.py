@@ -0,0 +1,176 @@
+# services/analitico.py
+
+import numpy as np
+from sqlalchemy import func
+
+from models.cultivar import Cultivar
+from services.agregacao import CAMPOS_NUMERICOS, DIMENSOES, sem_linha_total
+from services.cache_dados import CacheTTL
+from services.consulta import filtrar_cultivares
+from services.versao import chave_de_versao
+
+# =============< CONFIGURAÇÕES GERAIS >===============================
+
+# O que identifica uma série em cada etapa (padrão de `serie_por`)
+SERIES_PADRAO = {
+    "Produção": ("categoria_produto", "tipo_produto"),
+    "Processamento": ("categoria_uva", "tipo_uva", "nome_uva"),
+    "Comercialização": ("categoria_produto", "produto"),
+    "Importação": ("categoria_produto", "pais"),
+    "Exportação": ("categoria_produto", "pais"),
+}
+
+# Campo numérico analisado por padrão em cada etapa
+METRICA_PADRAO = {
+    "Produção": "quantidade_l",
+    "Processamento": "quantidade_kg",
+    "Comercialização": "quantidade_l",
+    "Importação": "valor_usd",
+    "Exportação": "valor_usd",
+}
+
+# Resultados por (etapa, versão dos dados, parâmetros): uma carga nova
+# muda a versão e as entradas antigas simplesmente deixam de ser usadas
+cache_series = CacheTTL()
+
+
+# =====================< MATRIZ SÉRIE × ANO >=========================
+
+def carregar_matriz(session, etapa: str, serie_por: tuple, metrica: str,
+                    filtros: dict | None = None, ano_inicio: int = 1970,
+                    ano_fim: int = 2024):
+    """
+    Soma `metrica` por (série, ano) em SQL e monta a matriz
+    (séries × anos) em NumPy, com NaN onde a série não tem valor.
+    Retorna (chaves das séries, vetor de anos, matriz float64).
+    """
+    colunas = [getattr(Cultivar, nome) for nome in serie_por]
+    query = session.query(*colunas, Cultivar.ano,
+                          func.sum(CAMPOS_NUMERICOS[metrica]))
+    query = sem_linha_total(filtrar_cultivares(
+        query, etapa, filtros, ano_inicio=ano_inicio, ano_fim=ano_fim))
+    linhas = query.group_by(*colunas, Cultivar.ano).order_by(*colunas).all()
+
+    anos = np.arange(ano_inicio, ano_fim + 1)
+    indices: dict[tuple, int] = {}
+    posicoes = np.empty(len(linhas), dtype=np.intp)
+    colunas_ano = np.empty(len(linhas), dtype=np.intp)
+    valores = np.empty(len(linhas))
+    for i, (*chave, ano, valor) in enumerate(linhas):
+        posicoes[i] = indices.setdefault(tuple(chave), len(indices))
+        colunas_ano[i] = ano - ano_inicio
+        valores[i] = np.nan if valor is None else valor
+
+    matriz = np.full((len(indices), len(anos)), np.nan)
+    matriz[posicoes, colunas_ano] = valores
+    return list(indices), anos, matriz
+
+
+# =====================< MÉTRICAS VETORIZADAS >=======================
+
+def crescimento_anual(matriz: np.ndarray) -> np.ndarray:
+    """Variação sobre o ano anterior; NaN no 1º ano e quando a base é 0/NaN."""
+    yoy = np.full(matriz.shape, np.nan)
+    anterior, atual = matriz[:, :-1], matriz[:, 1:]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        yoy[:, 1:] = np.where(anterior > 0, (atual - anterior) / anterior,
+                              np.nan)
+    return yoy
+
+
+def media_movel(matriz: np.ndarray, janela: int) -> np.ndarray:
+    """
+    Média dos últimos `janela` anos (ignorando anos sem valor), por somas
+    acumuladas; NaN até completar a primeira janela.
+    """
+    validos = ~np.isnan(matriz)
+    acumulado = np.cumsum(np.where(validos, matriz, 0.0), axis=1)
+    contagem = np.cumsum(validos, axis=1)
+    zeros = np.zeros((matriz.shape[0], 1))
+    acumulado = np.hstack([zeros, acumulado])
+    contagem = np.hstack([zeros, contagem])
+
+    medias = np.full(matriz.shape, np.nan)
+    if janela <= matriz.shape[1]:
+        somas = acumulado[:, janela:] - acumulado[:, :-janela]
+        quantos = contagem[:, janela:] - contagem[:, :-janela]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            medias[:, janela - 1:] = np.where(quantos > 0, somas / quantos,
+                                              np.nan)
+    return medias
+
+
+def cagr(matriz: np.ndarray, anos: np.ndarray) -> np.ndarray:
+    """
+    Taxa de crescimento anual composta entre o primeiro e o último ano
+    com valor positivo de cada série; NaN se houver menos de dois.
+    """
+    positivos = np.nan_to_num(matriz, nan=0.0) > 0
+    tem_valor = positivos.any(axis=1)
+    primeiro = np.argmax(positivos, axis=1)
+    ultimo = matriz.shape[1] - 1 - np.argmax(positivos[:, ::-1], axis=1)
+    linhas = np.arange(matriz.shape[0])
+    periodos = (anos[ultimo] - anos[primeiro]).astype(float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        taxa = (matriz[linhas, ultimo] / matriz[linhas, primeiro]) \
+            ** (1.0 / periodos) - 1.0
+    return np.where(tem_valor & (periodos > 0), taxa, np.nan)
+
+
+# =====================< API >========================================
+
+def _lista(vetor) -> list:
+    return [None if np.isnan(v) else round(float(v), 6) for v in vetor]
+
+
+def calcular_series(session, etapa: str, serie_por: tuple | None = None,
+                    metrica: str | None = None, filtros: dict | None = None,
+                    ano_inicio: int = 1970, ano_fim: int = 2024,
+                    janela: int = 3) -> list[dict]:
+    """
+    Série anual de `metrica` para cada combinação de `serie_por`, com
+    crescimento ano a ano, média móvel de `janela` anos e CAGR, todos
+    calculados de uma vez para a matriz inteira. O resultado fica em
+    cache pela versão dos dados (services.versao).
+
+    Levanta ValueError para colunas/métricas fora das permitidas.
+    """
+    serie_por = tuple(serie_por or SERIES_PADRAO[etapa])
+    metrica = metrica or METRICA_PADRAO[etapa]
+    if not serie_por or any(c not in DIMENSOES or c == "ano"
+                            for c in serie_por):
+        raise ValueError(f"serie_por inválido: {','.join(serie_por)}")
+    if metrica not in CAMPOS_NUMERICOS:
+        raise ValueError(f"metric inválida: {metrica}")
+    if janela < 1:
+        raise ValueError("janela deve ser positiva")
+    if ano_inicio > ano_fim:
+        raise ValueError("ano_inicio maior que ano_fim")
+
+    filtros = {k: v for k, v in (filtros or {}).items() if v}
+    chave = (etapa, chave_de_versao(session, etapa), serie_por, metrica,
+             tuple(sorted(filtros.items())), ano_inicio, ano_fim, janela)
+    series = cache_series.obter(chave)
+    if series is not None:
+        return series
+
+    chaves, anos, matriz = carregar_matriz(
+        session, etapa, serie_por, metrica, filtros, ano_inicio, ano_fim)
+    yoy = crescimento_anual(matriz)
+    medias = media_movel(matriz, janela)
+    taxas = cagr(matriz, anos)
+
+    lista_anos = anos.tolist()
+    series = [
+        {
+            "serie": dict(zip(serie_por, serie)),
+            "anos": lista_anos,
+            "valores": _lista(matriz[i]),
+            "yoy": _lista(yoy[i]),
+            "media_movel": _lista(medias[i]),
+            "cagr": _lista(taxas[i:i + 1])[0],
+        }
+        for i, serie in enumerate(chaves)
+    ]
+    cache_series.guardar(chave, series)
+    return series
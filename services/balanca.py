@@ -0,0 +1,135 @@
+# services/balanca.py
+
+import re
+import unicodedata
+from datetime import datetime, timezone
+
+from sqlalchemy import func
+
+from logging_config import logger
+from models.balanca import BalancaComercial
+from models.cultivar import Cultivar
+from services.agregacao import sem_linha_total
+
+# =============< CONFIGURAÇÕES GERAIS >===============================
+
+_NAO_ALFANUMERICO = re.compile(r"[^0-9a-z]+")
+
+
+def chave_pais(nome: str | None) -> str:
+    """
+    Forma normalizada do nome de um país, para casar Importação e
+    Exportação: sem acentos, minúscula, pontuação e espaços colapsados
+    ("  Países Baixos " e "paises baixos" dão "paises baixos"). Nomes
+    escritos de outro jeito (ex.: "Holanda") não são unificados.
+    """
+    texto = unicodedata.normalize("NFKD", nome or "")
+    texto = "".join(c for c in texto if not unicodedata.combining(c))
+    return _NAO_ALFANUMERICO.sub(" ", texto.casefold()).strip()
+
+
+# =====================< CÁLCULO >====================================
+
+def _totais(session, etapa: str) -> dict:
+    """{(chave_pais, categoria, ano): [nome, kg, usd]} somados em SQL."""
+    query = sem_linha_total(session.query(
+        Cultivar.pais, Cultivar.categoria_produto, Cultivar.ano,
+        func.sum(Cultivar.quantidade_kg), func.sum(Cultivar.valor_usd),
+    ).filter(Cultivar.etapa == etapa, Cultivar.pais.isnot(None)))
+    totais: dict = {}
+    for pais, categoria, ano, kg, usd in query.group_by(
+            Cultivar.pais, Cultivar.categoria_produto, Cultivar.ano):
+        chave = (chave_pais(pais), categoria, ano)
+        atual = totais.setdefault(chave, [pais.strip(), 0, 0])
+        atual[1] += int(kg or 0)
+        atual[2] += int(usd or 0)
+    return totais
+
+
+def calcular_balanca(session) -> list[dict]:
+    """
+    Junta os totais de Exportação e Importação por (país normalizado,
+    categoria, ano). Um lado ausente conta como zero; o nome exibido é o
+    da Exportação, quando existe.
+    """
+    exportacao = _totais(session, "Exportação")
+    importacao = _totais(session, "Importação")
+
+    linhas = []
+    for chave in sorted(exportacao.keys() | importacao.keys()):
+        nome_exp, exp_kg, exp_usd = exportacao.get(chave, (None, 0, 0))
+        nome_imp, imp_kg, imp_usd = importacao.get(chave, (None, 0, 0))
+        chave_normalizada, categoria, ano = chave
+        linhas.append({
+            "chave_pais": chave_normalizada,
+            "pais": nome_exp or nome_imp,
+            "categoria_produto": categoria,
+            "ano": ano,
+            "exportacao_kg": exp_kg,
+            "exportacao_usd": exp_usd,
+            "importacao_kg": imp_kg,
+            "importacao_usd": imp_usd,
+            "saldo_kg": exp_kg - imp_kg,
+            "saldo_usd": exp_usd - imp_usd,
+        })
+    return linhas
+
+
+def atualizar_balanca(session, confirmar: bool = True) -> int:
+    """
+    Refaz a tabela `balanca_comercial`. Chamado pelo populate_db ao fim
+    de cada carga. Retorna quantas linhas foram gravadas.
+    `confirmar=False` deixa o commit para quem chamou.
+    """
+    agora = datetime.now(timezone.utc).replace(tzinfo=None)
+    linhas = calcular_balanca(session)
+    for linha in linhas:
+        linha["atualizado_em"] = agora
+
+    session.query(BalancaComercial).delete(synchronize_session=False)
+    if linhas:
+        session.bulk_insert_mappings(BalancaComercial, linhas)
+    if confirmar:
+        session.commit()
+    logger.info(f"[Balança] {len(linhas)} linhas recalculadas")
+    return len(linhas)
+
+
+# =====================< CONSULTA >===================================
+
+def consultar_balanca(session, pais: str | None = None,
+                      categoria_produto: str | None = None,
+                      ano: int | None = None, ano_inicio: int = 1970,
+                      ano_fim: int = 2024, limit: int = 100,
+                      offset: int = 0) -> list[dict]:
+    """
+    Saldo comercial com filtros de país (comparado pela forma
+    normalizada), categoria e ano, paginado em SQL. Enquanto a tabela não
+    tiver sido calculada, o saldo é calculado na hora.
+    """
+    if session.query(BalancaComercial.id).first() is None:
+        linhas = [
+            linha for linha in calcular_balanca(session)
+            if (not pais or linha["chave_pais"] == chave_pais(pais))
+            and (not categoria_produto
+                 or linha["categoria_produto"] == categoria_produto)
+            and (ano is None or linha["ano"] == ano)
+            and ano_inicio <= linha["ano"] <= ano_fim
+        ]
+        for linha in linhas:
+            del linha["chave_pais"]
+        return linhas[offset: offset + limit]
+
+    query = session.query(BalancaComercial).filter(
+        BalancaComercial.ano >= ano_inicio, BalancaComercial.ano <= ano_fim)
+    if pais:
+        query = query.filter(BalancaComercial.chave_pais == chave_pais(pais))
+    if categoria_produto:
+        query = query.filter(
+            BalancaComercial.categoria_produto == categoria_produto)
+    if ano is not None:
+        query = query.filter(BalancaComercial.ano == ano)
+    query = query.order_by(
+        BalancaComercial.chave_pais, BalancaComercial.categoria_produto,
+        BalancaComercial.ano).offset(offset).limit(limit)
+    return [linha.to_dict() for linha in query]
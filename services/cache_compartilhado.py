@@ -0,0 +1,191 @@
+# services/cache_compartilhado.py
+
+import contextlib
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+from logging_config import logger
+
+try:
+    import fcntl
+except ImportError:  # Windows: sem travas entre processos
+    fcntl = None
+
+# =============< CONFIGURAÇÕES GERAIS >===============================
+
+_basedir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+# Arquivo SQLite do cache compartilhado entre os workers de um mesmo
+# host ("" volta ao cache em memória de cada processo)
+CACHE_COMPARTILHADO_PATH = os.getenv(
+    "CACHE_COMPARTILHADO_PATH",
+    os.path.join(_basedir, ".cache", "compartilhado.db"))
+
+
+# =====================< TRAVAS ENTRE PROCESSOS >=====================
+
+@contextlib.contextmanager
+def trava_arquivo(diretorio: str, nome: str):
+    """
+    Trava exclusiva (flock) identificada por `nome`, válida entre
+    processos do mesmo host: enquanto um worker a segura, os outros
+    esperam. Sem fcntl (Windows) não trava nada.
+    """
+    if fcntl is None:
+        yield
+        return
+    pasta = os.path.join(diretorio, ".travas")
+    os.makedirs(pasta, exist_ok=True)
+    arquivo = os.path.join(
+        pasta, hashlib.sha1(nome.encode()).hexdigest() + ".lock")
+    with open(arquivo, "a") as fd:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+
+
+# =====================< CACHE EM SQLITE >============================
+
+def _serializar_chave(chave) -> str:
+    return json.dumps(chave, ensure_ascii=False, default=list)
+
+
+class CacheCompartilhado:
+    """
+    Cache com TTL guardado num arquivo SQLite (modo WAL), com a mesma
+    interface do CacheTTL: todos os workers do host leem e gravam as
+    mesmas entradas, então um conjunto raspado por um worker serve a
+    todos. Os valores (listas de registros) são gravados como JSON
+    comprimido, ou como estão com `binario=True` (valores em bytes);
+    quando o arquivo passa de `max_bytes`, as entradas mais antigas são
+    removidas.
+
+    Cada thread de cada processo abre sua própria conexão, o que o torna
+    seguro com `gunicorn --preload` (conexões nunca atravessam um fork).
+    O arquivo só é criado no primeiro uso, não ao instanciar (o módulo
+    que o instancia pode ser importado sem que o cache seja usado).
+    """
+
+    def __init__(self, caminho: str, ttl: float, max_bytes: int,
+                 binario: bool = False):
+        self.caminho = caminho
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.binario = binario
+        self._local = threading.local()
+        self.acertos = 0
+        self.falhas = 0
+
+    def _conexao(self) -> sqlite3.Connection:
+        conexao = getattr(self._local, "conexao", None)
+        if conexao is None or self._local.pid != os.getpid():
+            os.makedirs(os.path.dirname(self.caminho) or ".", exist_ok=True)
+            conexao = sqlite3.connect(self.caminho, timeout=30,
+                                      isolation_level=None)
+            conexao.execute("PRAGMA journal_mode=WAL")
+            conexao.execute("PRAGMA synchronous=NORMAL")
+            conexao.execute("""
+                CREATE TABLE IF NOT EXISTS entradas (
+                    chave TEXT PRIMARY KEY,
+                    etapa TEXT,
+                    valor BLOB NOT NULL,
+                    tamanho INTEGER NOT NULL,
+                    criado_em REAL NOT NULL
+                )""")
+            conexao.execute(
+                "CREATE INDEX IF NOT EXISTS ix_entradas_criado_em "
+                "ON entradas (criado_em)")
+            self._local.conexao = conexao
+            self._local.pid = os.getpid()
+        return conexao
+
+    def obter_com_validade(self, chave):
+        """(valor, ainda_valido), ou (None, False) se não houver entrada."""
+        linha = self._conexao().execute(
+            "SELECT valor, criado_em FROM entradas WHERE chave = ?",
+            (_serializar_chave(chave),)).fetchone()
+        if linha is None:
+            self.falhas += 1
+            return None, False
+        valor = linha[0] if self.binario \
+            else json.loads(zlib.decompress(linha[0]))
+        valido = time.time() - linha[1] < self.ttl
+        if valido:
+            self.acertos += 1
+        else:
+            self.falhas += 1
+        return valor, valido
+
+    def obter(self, chave):
+        valor, valido = self.obter_com_validade(chave)
+        return valor if valido else None
+
+    def guardar(self, chave, valor):
+        blob = bytes(valor) if self.binario else zlib.compress(
+            json.dumps(valor, ensure_ascii=False).encode())
+        if len(blob) > self.max_bytes:
+            logger.warning(
+                f"[Cache] {chave} ({len(blob)} bytes) excede o limite; "
+                f"não cacheado")
+            return
+        etapa = chave[0] if isinstance(chave, tuple) else None
+        conexao = self._conexao()
+        conexao.execute(
+            "INSERT OR REPLACE INTO entradas "
+            "(chave, etapa, valor, tamanho, criado_em) VALUES (?, ?, ?, ?, ?)",
+            (_serializar_chave(chave), etapa, blob, len(blob), time.time()))
+        total = conexao.execute(
+            "SELECT COALESCE(SUM(tamanho), 0) FROM entradas").fetchone()[0]
+        if total > self.max_bytes:
+            self._despejar(conexao, total)
+
+    def _despejar(self, conexao, total: int):
+        """Remove as entradas mais antigas até ficar em 90% do limite."""
+        alvo = self.max_bytes * 0.9
+        removidas = []
+        for chave, tamanho in conexao.execute(
+                "SELECT chave, tamanho FROM entradas ORDER BY criado_em"):
+            if total <= alvo:
+                break
+            removidas.append((chave,))
+            total -= tamanho
+        conexao.executemany("DELETE FROM entradas WHERE chave = ?", removidas)
+
+    def trava(self, chave):
+        """Trava entre processos para a chave (ver `trava_arquivo`)."""
+        return trava_arquivo(os.path.dirname(self.caminho) or ".",
+                             _serializar_chave(chave))
+
+    def remover(self, chave):
+        self._conexao().execute("DELETE FROM entradas WHERE chave = ?",
+                                (_serializar_chave(chave),))
+
+    def invalidar(self, etapa: str | None = None) -> int:
+        conexao = self._conexao()
+        if etapa is None:
+            cursor = conexao.execute("DELETE FROM entradas")
+        else:
+            cursor = conexao.execute(
+                "DELETE FROM entradas WHERE etapa = ?", (etapa,))
+        return cursor.rowcount
+
+    def estatisticas(self) -> dict:
+        entradas, total = self._conexao().execute(
+            "SELECT COUNT(*), COALESCE(SUM(tamanho), 0) FROM entradas"
+        ).fetchone()
+        return {
+            "entradas": entradas,
+            "bytes": total,
+            "max_bytes": self.max_bytes,
+            "ttl": self.ttl,
+            "acertos": self.acertos,
+            "falhas": self.falhas,
+            "compartilhado": self.caminho,
+        }
@@ -0,0 +1,291 @@
+# services/cache_dados.py
+
+import contextlib
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+from logging_config import logger
+from services.cache_compartilhado import (
+    CACHE_COMPARTILHADO_PATH,
+    CacheCompartilhado
+)
+
+# =============< CONFIGURAÇÕES GERAIS >===============================
+
+# Validade (segundos) de um conjunto de dados raspado mantido em memória
+DADOS_CACHE_TTL = int(os.getenv("DADOS_CACHE_TTL", "3600"))
+
+# Memória máxima (aproximada) ocupada pelos conjuntos cacheados
+DADOS_CACHE_MAX_BYTES = int(
+    os.getenv("DADOS_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+
+
+def tamanho_aproximado(valor) -> int:
+    """
+    Estimativa do espaço ocupado por uma lista de registros (dicts),
+    somando o container, os dicts e os valores de cada campo.
+    """
+    total = sys.getsizeof(valor)
+    if isinstance(valor, (list, tuple)):
+        for item in valor:
+            total += sys.getsizeof(item)
+            if isinstance(item, dict):
+                total += sum(sys.getsizeof(v) for v in item.values())
+    return total
+
+
+class CacheTTL:
+    """
+    Cache em memória com expiração por tempo (TTL) e despejo LRU limitado
+    pelo tamanho aproximado dos valores. Seguro para uso entre threads.
+    """
+
+    def __init__(self, ttl: float = DADOS_CACHE_TTL,
+                 max_bytes: int = DADOS_CACHE_MAX_BYTES):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._itens: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self.acertos = 0
+        self.falhas = 0
+
+    def obter(self, chave):
+        """Retorna o valor cacheado ou None (conta acerto/falha)."""
+        with self._lock:
+            entrada = self._itens.get(chave)
+            if entrada is not None:
+                valor, criado_em, tamanho = entrada
+                if time.monotonic() - criado_em < self.ttl:
+                    self._itens.move_to_end(chave)
+                    self.acertos += 1
+                    return valor
+                del self._itens[chave]
+                self._bytes -= tamanho
+            self.falhas += 1
+            return None
+
+    def obter_com_validade(self, chave):
+        """
+        (valor, ainda_valido): ao contrário de `obter`, devolve também a
+        entrada vencida (None se não houver nenhuma), que continua
+        disponível até ser substituída ou despejada.
+        """
+        with self._lock:
+            entrada = self._itens.get(chave)
+            if entrada is None:
+                self.falhas += 1
+                return None, False
+            valor, criado_em, _ = entrada
+            self._itens.move_to_end(chave)
+            valido = time.monotonic() - criado_em < self.ttl
+            if valido:
+                self.acertos += 1
+            else:
+                self.falhas += 1
+            return valor, valido
+
+    def guardar(self, chave, valor):
+        tamanho = tamanho_aproximado(valor)
+        if tamanho > self.max_bytes:
+            logger.warning(
+                f"[Cache] {chave} ({tamanho} bytes) excede o limite; não cacheado")
+            return
+        with self._lock:
+            antigo = self._itens.pop(chave, None)
+            if antigo is not None:
+                self._bytes -= antigo[2]
+            self._itens[chave] = (valor, time.monotonic(), tamanho)
+            self._bytes += tamanho
+            while self._bytes > self.max_bytes:
+                _, (_, _, tamanho_removido) = self._itens.popitem(last=False)
+                self._bytes -= tamanho_removido
+
+    def trava(self, chave):
+        # o cache em memória é de um só processo: o SingleFlight basta
+        return contextlib.nullcontext()
+
+    def remover(self, chave):
+        with self._lock:
+            entrada = self._itens.pop(chave, None)
+            if entrada is not None:
+                self._bytes -= entrada[2]
+
+    def invalidar(self, etapa: str | None = None) -> int:
+        """
+        Remove do cache todas as entradas (ou só as da `etapa`, quando a
+        chave começa por ela). Retorna quantas entradas foram removidas.
+        """
+        with self._lock:
+            chaves = [c for c in self._itens
+                      if etapa is None or (isinstance(c, tuple) and c[0] == etapa)]
+            for chave in chaves:
+                self._bytes -= self._itens.pop(chave)[2]
+            return len(chaves)
+
+    def estatisticas(self) -> dict:
+        with self._lock:
+            return {
+                "entradas": len(self._itens),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "ttl": self.ttl,
+                "acertos": self.acertos,
+                "falhas": self.falhas,
+            }
+
+
+class _Chamada:
+    def __init__(self):
+        self.concluida = threading.Event()
+        self.resultado = None
+        self.erro = None
+        self.aguardando = 0
+
+
+class SingleFlight:
+    """
+    Agrupa chamadas concorrentes com a mesma chave: a primeira executa a
+    função e as demais esperam por ela e recebem o mesmo resultado (ou a
+    mesma exceção).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._em_andamento: dict = {}
+        self.compartilhadas = 0
+
+    def executar(self, chave, funcao):
+        with self._lock:
+            chamada = self._em_andamento.get(chave)
+            lider = chamada is None
+            if lider:
+                chamada = _Chamada()
+                self._em_andamento[chave] = chamada
+            else:
+                chamada.aguardando += 1
+                self.compartilhadas += 1
+
+        if not lider:
+            chamada.concluida.wait()
+            with self._lock:
+                chamada.aguardando -= 1
+            if chamada.erro is not None:
+                raise chamada.erro
+            return chamada.resultado
+
+        try:
+            chamada.resultado = funcao()
+            return chamada.resultado
+        except Exception as erro:
+            chamada.erro = erro
+            raise
+        finally:
+            with self._lock:
+                del self._em_andamento[chave]
+            chamada.concluida.set()
+
+    def aguardando(self) -> dict:
+        """Quantas chamadas estão esperando cada chave em andamento."""
+        with self._lock:
+            return {chave: c.aguardando
+                    for chave, c in self._em_andamento.items()}
+
+
+# Cache compartilhado pelas rotas para os dados raspados ao vivo (num
+# arquivo SQLite comum a todos os workers do host, ou em memória com
+# CACHE_COMPARTILHADO_PATH=""), e o agrupador que impede scrapings
+# idênticos simultâneos
+cache_dados = CacheCompartilhado(
+    CACHE_COMPARTILHADO_PATH, DADOS_CACHE_TTL, DADOS_CACHE_MAX_BYTES
+) if CACHE_COMPARTILHADO_PATH else CacheTTL()
+scrapings_em_andamento = SingleFlight()
+
+# Chaves vencidas sendo rebuscadas em segundo plano
+_revalidando: set = set()
+_revalidando_lock = threading.Lock()
+
+
+def _revalidar(chave, raspar):
+    """Rebusca uma chave vencida numa thread, sem segurar a requisição."""
+    with _revalidando_lock:
+        if chave in _revalidando:
+            return
+        _revalidando.add(chave)
+
+    def executar():
+        try:
+            scrapings_em_andamento.executar(chave, raspar)
+        except Exception as e:
+            logger.warning(f"[Cache] falha ao revalidar {chave}: {e}")
+        finally:
+            with _revalidando_lock:
+                _revalidando.discard(chave)
+
+    threading.Thread(target=executar, daemon=True,
+                     name="revalidar-cache").start()
+
+
+def carregar_dados(etapa: str, ano_inicio: int, ano_fim: int, carregar,
+                   categorias: tuple | None = None):
+    """
+    Memoiza `carregar(ano_inicio=..., ano_fim=...)` (uma função
+    get_*_data do scraper) pela chave (etapa, ano_inicio, ano_fim,
+    categorias): paginar o mesmo conjunto custa um único scraping.
+    Requisições simultâneas para a mesma chave esperam o mesmo scraping
+    em andamento. `categorias` (subopções, None = todas) é repassado ao
+    scraper quando informado.
+
+    Uma entrada vencida continua sendo servida enquanto é rebuscada em
+    segundo plano (stale-while-revalidate): só o primeiro acesso a uma
+    chave espera pelo site. Com o cache compartilhado, uma trava por
+    chave faz com que só um worker do host raspe; os outros esperam e
+    leem o resultado dele.
+
+    Um scraping vazio (site fora do ar ou sem a tabela de dados) não é
+    cacheado nem substitui a cópia anterior: a próxima requisição tenta
+    de novo.
+    """
+    chave = (etapa, ano_inicio, ano_fim, categorias)
+
+    def raspar():
+        with cache_dados.trava(chave):
+            dados, valido = cache_dados.obter_com_validade(chave)
+            if valido:  # outro processo raspou enquanto esperávamos
+                return dados
+            argumentos = {"ano_inicio": ano_inicio, "ano_fim": ano_fim}
+            if categorias is not None:
+                argumentos["categorias"] = categorias
+            dados = carregar(**argumentos)
+            if not dados:
+                logger.warning(f"[Cache] scraping vazio para {chave}; "
+                               f"não cacheado")
+                return dados
+            cache_dados.guardar(chave, dados)
+            return dados
+
+    dados, valido = cache_dados.obter_com_validade(chave)
+    if dados is not None:
+        if not valido:
+            _revalidar(chave, raspar)
+        return dados
+    return scrapings_em_andamento.executar(chave, raspar)
+
+
+def estatisticas() -> dict:
+    """Estado do cache e dos scrapings em andamento, para monitoramento."""
+    stats = cache_dados.estatisticas()
+    stats["compartilhadas"] = scrapings_em_andamento.compartilhadas
+    with _revalidando_lock:
+        stats["revalidando"] = len(_revalidando)
+    stats["em_andamento"] = [
+        {"etapa": etapa, "ano_inicio": inicio, "ano_fim": fim,
+         "categorias": list(categorias) if categorias is not None else None,
+         "aguardando": aguardando}
+        for (etapa, inicio, fim, categorias), aguardando
+        in scrapings_em_andamento.aguardando().items()
+    ]
+    return stats
@@ -0,0 +1,201 @@
+# services/cache_paginas.py
+
+import gzip
+import os
+import re
+import threading
+import time
+from datetime import date
+from typing import NamedTuple
+from urllib.parse import parse_qs, urlsplit
+
+from logging_config import logger
+from services.cache_compartilhado import trava_arquivo
+
+# =============< CONFIGURAÇÕES GERAIS >===============================
+
+_basedir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+# Diretório do cache de páginas ("" desliga o cache)
+SCRAPER_CACHE_DIR = os.getenv(
+    "SCRAPER_CACHE_DIR", os.path.join(_basedir, ".cache", "vitibrasil"))
+
+# Tamanho máximo do cache em disco (bytes comprimidos)
+SCRAPER_CACHE_MAX_BYTES = int(
+    os.getenv("SCRAPER_CACHE_MAX_BYTES", str(200 * 1024 * 1024)))
+
+# Validade (segundos) das páginas de anos em aberto (ano atual e anterior).
+# Anos fechados não mudam mais no site e nunca expiram.
+SCRAPER_CACHE_TTL_ABERTO = int(
+    os.getenv("SCRAPER_CACHE_TTL_ABERTO", str(6 * 3600)))
+
+
+class ChavePagina(NamedTuple):
+    opcao: str | None
+    subopcao: str | None
+    ano: int | None
+    metodo: str
+
+
+class PaginaCacheada(NamedTuple):
+    html: str
+    buscada_em: float
+    fresca: bool
+
+
+def chave_pagina(metodo: str, url: str, params: dict | None = None,
+                 data: dict | None = None) -> ChavePagina:
+    """
+    Monta a chave (opção, subopção, ano, método) de uma requisição ao
+    vitibrasil, olhando a query string da URL, `params` e `data`.
+    """
+    campos = {k: v[0] for k, v in parse_qs(urlsplit(url).query).items()}
+    campos.update(params or {})
+    campos.update(data or {})
+    ano = campos.get("ano")
+    return ChavePagina(
+        opcao=campos.get("opcao"),
+        subopcao=campos.get("subopcao"),
+        ano=int(ano) if ano is not None and str(ano).isdigit() else None,
+        metodo=metodo.upper(),
+    )
+
+
+def ttl_para_ano(ano: int | None, ttl_aberto: int = SCRAPER_CACHE_TTL_ABERTO,
+                 hoje: date | None = None) -> float | None:
+    """
+    Política de validade por ano: o ano atual e o anterior ainda recebem
+    revisões da Embrapa e expiram em `ttl_aberto` segundos; anos fechados
+    não expiram (None). Páginas sem ano são tratadas como abertas.
+    """
+    ano_atual = (hoje or date.today()).year
+    if ano is None or ano >= ano_atual - 1:
+        return ttl_aberto
+    return None
+
+
+class CachePaginas:
+    """
+    Cache persistente do HTML bruto das páginas do vitibrasil.
+
+    Cada página fica em um arquivo gzip no diretório do cache; o mtime do
+    arquivo registra quando ela foi buscada. Quando o total em disco passa
+    de `max_bytes`, as páginas buscadas há mais tempo são removidas.
+    """
+
+    def __init__(self, diretorio: str, max_bytes: int = SCRAPER_CACHE_MAX_BYTES,
+                 ttl_aberto: int = SCRAPER_CACHE_TTL_ABERTO):
+        self.diretorio = diretorio
+        self.max_bytes = max_bytes
+        self.ttl_aberto = ttl_aberto
+        self._lock = threading.Lock()
+        self._tamanho_total = None
+
+    def _arquivo(self, chave: ChavePagina) -> str:
+        partes = [chave.opcao or "-", chave.subopcao or "-",
+                  str(chave.ano) if chave.ano is not None else "-", chave.metodo]
+        nome = re.sub(r"[^A-Za-z0-9_-]", "_", "_".join(partes))
+        return os.path.join(self.diretorio, f"{nome}.html.gz")
+
+    def ler(self, chave: ChavePagina) -> PaginaCacheada | None:
+        """
+        Retorna a página cacheada (fresca ou vencida) ou None se não existir.
+        Cabe a quem chama decidir se usa uma página vencida (ex.: quando a
+        nova busca falha).
+        """
+        arquivo = self._arquivo(chave)
+        try:
+            buscada_em = os.path.getmtime(arquivo)
+            with gzip.open(arquivo, "rt", encoding="utf-8") as f:
+                html = f.read()
+        except (OSError, EOFError):
+            return None
+
+        ttl = ttl_para_ano(chave.ano, self.ttl_aberto)
+        fresca = ttl is None or time.time() - buscada_em < ttl
+        return PaginaCacheada(html, buscada_em, fresca)
+
+    def gravar(self, chave: ChavePagina, html: str):
+        """Grava (ou revalida) a página; a escrita é atômica via os.replace."""
+        arquivo = self._arquivo(chave)
+        os.makedirs(self.diretorio, exist_ok=True)
+        tmp = f"{arquivo}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with gzip.open(tmp, "wt", encoding="utf-8") as f:
+            f.write(html)
+        novo = os.path.getsize(tmp)
+        try:
+            antigo = os.path.getsize(arquivo)
+        except OSError:
+            antigo = 0
+        os.replace(tmp, arquivo)
+
+        with self._lock:
+            if self._tamanho_total is None:
+                self._tamanho_total = self._medir()
+            else:
+                self._tamanho_total += novo - antigo
+            if self._tamanho_total > self.max_bytes:
+                self._tamanho_total = self._despejar()
+
+    def trava(self, chave: ChavePagina):
+        """
+        Trava entre processos para a página: com vários workers no host,
+        só um a busca no site; os outros esperam e leem a cópia gravada.
+        """
+        nome = os.path.basename(self._arquivo(chave))
+        return trava_arquivo(self.diretorio, nome)
+
+    def revalidar(self, chave: ChavePagina):
+        """Marca a página como recém-buscada sem reescrever o conteúdo."""
+        try:
+            os.utime(self._arquivo(chave))
+        except OSError:
+            pass
+
+    def _listar(self) -> list[tuple[float, int, str]]:
+        itens = []
+        try:
+            nomes = os.listdir(self.diretorio)
+        except OSError:
+            return itens
+        for nome in nomes:
+            if not nome.endswith(".html.gz"):
+                continue
+            caminho = os.path.join(self.diretorio, nome)
+            try:
+                st = os.stat(caminho)
+            except OSError:
+                continue
+            itens.append((st.st_mtime, st.st_size, caminho))
+        return itens
+
+    def _medir(self) -> int:
+        return sum(tamanho for _, tamanho, _ in self._listar())
+
+    def _despejar(self) -> int:
+        """Remove as páginas mais antigas até ficar em 90% do limite."""
+        itens = sorted(self._listar())
+        total = sum(tamanho for _, tamanho, _ in itens)
+        alvo = self.max_bytes * 0.9
+        removidas = 0
+        for _, tamanho, caminho in itens:
+            if total <= alvo:
+                break
+            try:
+                os.remove(caminho)
+            except OSError:
+                continue
+            total -= tamanho
+            removidas += 1
+        logger.info(
+            f"[Cache] {removidas} páginas removidas; {total} bytes em disco")
+        return total
+
+    def limpar(self):
+        for _, _, caminho in self._listar():
+            try:
+                os.remove(caminho)
+            except OSError:
+                pass
+        with self._lock:
+            self._tamanho_total = 0
@@ -0,0 +1,134 @@
+# services/consulta.py
+
+import base64
+import json
+import os
+
+from sqlalchemy import tuple_
+from models.cultivar import Cultivar
+
+# =============< CONFIGURAÇÕES GERAIS >===============================
+
+# Linhas trazidas do banco por vez ao transmitir um resultado (yield_per)
+CONSULTA_LOTE_STREAM = int(os.getenv("CONSULTA_LOTE_STREAM", "1000"))
+
+# Filtros de igualdade aceitos pelas rotas -> coluna correspondente no banco
+_COLUNAS_FILTRO = {
+    "categoria_uva": Cultivar.categoria_uva,
+    "tipo_uva": Cultivar.tipo_uva,
+    "categoria_produto": Cultivar.categoria_produto,
+    "tipo_produto": Cultivar.tipo_produto,
+    "produto": Cultivar.produto,
+    "pais": Cultivar.pais,
+}
+
+
+# =====================< CONSULTAS >==================================
+
+def filtrar_cultivares(query, etapa: str, filtros: dict | None = None,
+                       ano: int | None = None, ano_inicio: int = 1970,
+                       ano_fim: int = 2024):
+    """
+    Aplica à query os mesmos filtros que as rotas faziam em Python,
+    agora como cláusulas WHERE sobre a tabela `cultivares`.
+    Filtros com valor vazio/None são ignorados.
+    """
+    query = query.filter(
+        Cultivar.etapa == etapa,
+        Cultivar.ano >= ano_inicio,
+        Cultivar.ano <= ano_fim,
+    )
+    if ano is not None:
+        query = query.filter(Cultivar.ano == ano)
+
+    for campo, valor in (filtros or {}).items():
+        if not valor:
+            continue
+        coluna = _COLUNAS_FILTRO.get(campo)
+        if coluna is None:
+            raise ValueError(f"Filtro não suportado: {campo}")
+        query = query.filter(coluna == valor)
+
+    return query
+
+
+def consultar_cultivares(session, etapa: str, filtros: dict | None = None,
+                         ano: int | None = None, ano_inicio: int = 1970,
+                         ano_fim: int = 2024, limit: int = 100,
+                         offset: int = 0) -> list[dict]:
+    """
+    Lê do banco os registros de uma etapa (Produção, Processamento, ...),
+    com filtros e paginação resolvidos em SQL (WHERE / LIMIT / OFFSET).
+    A ordenação por id mantém a ordem em que o scraper gravou os dados.
+    """
+    query = filtrar_cultivares(
+        session.query(Cultivar), etapa, filtros,
+        ano=ano, ano_inicio=ano_inicio, ano_fim=ano_fim)
+    query = query.order_by(Cultivar.id).offset(offset).limit(limit)
+    return [c.to_dict() for c in query.all()]
+
+
+def iterar_cultivares(session, etapa: str, filtros: dict | None = None,
+                      ano: int | None = None, ano_inicio: int = 1970,
+                      ano_fim: int = 2024, limit: int | None = None,
+                      offset: int = 0, lote: int | None = None):
+    """
+    Mesma consulta de `consultar_cultivares`, como gerador: as linhas vêm
+    de um cursor do lado do servidor, `lote` por vez (padrão
+    CONSULTA_LOTE_STREAM), sem materializar o resultado inteiro.
+    """
+    query = filtrar_cultivares(
+        session.query(Cultivar), etapa, filtros,
+        ano=ano, ano_inicio=ano_inicio, ano_fim=ano_fim)
+    query = query.order_by(Cultivar.id).offset(offset)
+    if limit is not None:
+        query = query.limit(limit)
+    for cultivar in query.yield_per(lote or CONSULTA_LOTE_STREAM):
+        yield cultivar.to_dict()
+
+
+# =====================< PAGINAÇÃO POR CURSOR >======================
+
+def codificar_cursor(**posicao) -> str:
+    """Cursor opaco (JSON em base64 url-safe) com a posição da última linha."""
+    texto = json.dumps(posicao, sort_keys=True, separators=(",", ":"))
+    return base64.urlsafe_b64encode(texto.encode()).decode().rstrip("=")
+
+
+def decodificar_cursor(cursor: str, *campos: str) -> tuple[int, ...]:
+    """
+    Lê os `campos` (inteiros) de um cursor gerado por `codificar_cursor`.
+    Levanta ValueError se o cursor estiver corrompido ou incompleto.
+    """
+    try:
+        texto = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        posicao = json.loads(texto)
+        return tuple(int(posicao[campo]) for campo in campos)
+    except (ValueError, KeyError, TypeError) as erro:
+        raise ValueError("Cursor inválido") from erro
+
+
+def consultar_pagina(session, etapa: str, filtros: dict | None = None,
+                     ano: int | None = None, ano_inicio: int = 1970,
+                     ano_fim: int = 2024, limit: int = 100,
+                     cursor: str | None = None) -> tuple[list[dict], str | None]:
+    """
+    Paginação por chave (keyset): ordena por (ano, id) e continua a
+    partir da última linha entregue, em vez de pular `offset` linhas. O
+    custo de cada página não depende da profundidade, então percorrer a
+    tabela inteira é O(n). Retorna (registros, próximo cursor ou None).
+    """
+    query = filtrar_cultivares(
+        session.query(Cultivar), etapa, filtros,
+        ano=ano, ano_inicio=ano_inicio, ano_fim=ano_fim)
+    if cursor:
+        ultimo_ano, ultimo_id = decodificar_cursor(cursor, "ano", "id")
+        query = query.filter(
+            tuple_(Cultivar.ano, Cultivar.id) > (ultimo_ano, ultimo_id))
+    linhas = query.order_by(Cultivar.ano, Cultivar.id).limit(limit + 1).all()
+
+    proximo = None
+    if len(linhas) > limit:
+        linhas = linhas[:limit]
+        proximo = codificar_cursor(ano=linhas[-1].ano, id=linhas[-1].id)
+    return [c.to_dict() for c in linhas], proximo
@@ -0,0 +1,190 @@
+# services/exportador.py
+
+import csv
+import gzip
+import os
+import tempfile
+
+from logging_config import logger
+from models.cultivar import Cultivar
+from services.cache_dados import SingleFlight
+from services.versao import chave_de_versao
+
+# =============< CONFIGURAÇÕES GERAIS >===============================
+
+_basedir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+# Onde ficam os arquivos exportados (um por etapa, formato e versão)
+EXPORT_CACHE_DIR = os.getenv(
+    "EXPORT_CACHE_DIR", os.path.join(_basedir, ".cache", "export"))
+
+# Linhas lidas do banco e gravadas no arquivo por vez
+EXPORT_LOTE = int(os.getenv("EXPORT_LOTE", "5000"))
+
+# Etapa na URL (/api/export/<etapa>) -> valor da coluna `etapa`
+ETAPAS_EXPORTAVEIS = {
+    "producao": "Produção",
+    "processamento": "Processamento",
+    "comercializacao": "Comercialização",
+    "importacao": "Importação",
+    "exportacao": "Exportação",
+}
+
+# formato -> (extensão, mimetype)
+FORMATOS = {
+    "csv": ("csv.gz", "application/gzip"),
+    "parquet": ("parquet", "application/vnd.apache.parquet"),
+    "arrow": ("arrow", "application/vnd.apache.arrow.file"),
+}
+
+# Colunas exportadas, na ordem de Cultivar.to_dict, e seu tipo
+_COLUNAS = (
+    ("id", "int"), ("etapa", "texto"), ("categoria_uva", "texto"),
+    ("tipo_uva", "texto"), ("nome_uva", "texto"),
+    ("categoria_produto", "texto"), ("tipo_produto", "texto"),
+    ("produto", "texto"), ("quantidade_l", "texto"),
+    ("quantidade_kg", "int"), ("valor_usd", "int"), ("ano", "int"),
+    ("pais", "texto"),
+)
+
+
+class FormatoIndisponivel(Exception):
+    """O formato pedido depende de uma biblioteca que não está instalada."""
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.ipc  # noqa: F401
+        import pyarrow.parquet  # noqa: F401
+        return pyarrow
+    except ImportError as erro:
+        raise FormatoIndisponivel(
+            "Parquet e Arrow requerem o pacote pyarrow") from erro
+
+
+# =====================< LEITURA EM LOTES >===========================
+
+def _lotes(session, etapa: str, lote: int):
+    """Linhas da etapa em ordem de id, `lote` por vez (cursor no servidor)."""
+    colunas = [getattr(Cultivar, nome) for nome, _ in _COLUNAS]
+    query = session.query(*colunas).filter(
+        Cultivar.etapa == etapa).order_by(Cultivar.id).yield_per(lote)
+    bloco = []
+    for linha in query:
+        bloco.append(tuple(linha))
+        if len(bloco) >= lote:
+            yield bloco
+            bloco = []
+    if bloco:
+        yield bloco
+
+
+# =====================< ESCRITORES >=================================
+
+def _gravar_csv(arquivo, lotes):
+    with gzip.open(arquivo, "wt", encoding="utf-8", newline="") as saida:
+        escritor = csv.writer(saida)
+        escritor.writerow([nome for nome, _ in _COLUNAS])
+        for bloco in lotes:
+            escritor.writerows(bloco)
+
+
+def _esquema_arrow(pa):
+    tipos = {"int": pa.int64(), "texto": pa.string()}
+    return pa.schema([(nome, tipos[tipo]) for nome, tipo in _COLUNAS])
+
+
+def _lote_arrow(pa, esquema, bloco):
+    colunas = list(zip(*bloco))
+    return pa.RecordBatch.from_arrays(
+        [pa.array(valores, type=campo.type)
+         for valores, campo in zip(colunas, esquema)],
+        schema=esquema)
+
+
+def _gravar_parquet(arquivo, lotes):
+    pa = _pyarrow()
+    esquema = _esquema_arrow(pa)
+    with pa.parquet.ParquetWriter(arquivo, esquema,
+                                  compression="zstd") as escritor:
+        for bloco in lotes:
+            escritor.write_batch(_lote_arrow(pa, esquema, bloco))
+
+
+def _gravar_arrow(arquivo, lotes):
+    pa = _pyarrow()
+    esquema = _esquema_arrow(pa)
+    with pa.OSFile(arquivo, "wb") as saida, \
+            pa.ipc.new_file(saida, esquema) as escritor:
+        for bloco in lotes:
+            escritor.write_batch(_lote_arrow(pa, esquema, bloco))
+
+
+_ESCRITORES = {
+    "csv": _gravar_csv,
+    "parquet": _gravar_parquet,
+    "arrow": _gravar_arrow,
+}
+
+
+# =====================< EXPORTAÇÃO >=================================
+
+# Evita que requisições simultâneas gerem o mesmo arquivo em paralelo
+_geracoes = SingleFlight()
+
+
+def _caminho(slug: str, formato: str, versao: str) -> str:
+    extensao, _ = FORMATOS[formato]
+    return os.path.join(EXPORT_CACHE_DIR, f"{slug}-{versao}.{extensao}")
+
+
+def _remover_versoes_antigas(slug: str, formato: str, atual: str):
+    extensao, _ = FORMATOS[formato]
+    for nome in os.listdir(EXPORT_CACHE_DIR):
+        caminho = os.path.join(EXPORT_CACHE_DIR, nome)
+        if nome.startswith(f"{slug}-") and nome.endswith(f".{extensao}") \
+                and caminho != atual:
+            try:
+                os.remove(caminho)
+            except OSError:
+                pass
+
+
+def arquivo_exportado(session, slug: str, formato: str) -> str:
+    """
+    Caminho do arquivo com todos os registros da etapa `slug` no
+    `formato` pedido. O arquivo é gerado em lotes de EXPORT_LOTE linhas
+    (sem carregar a etapa inteira em memória) e fica em disco enquanto a
+    versão dos dados (services.versao) não mudar; downloads seguintes são
+    servidos direto do disco.
+
+    Levanta KeyError para etapa/formato desconhecidos e
+    FormatoIndisponivel se o formato exigir pyarrow e ele faltar.
+    """
+    etapa = ETAPAS_EXPORTAVEIS[slug]
+    escritor = _ESCRITORES[formato]
+    if formato != "csv":
+        _pyarrow()
+
+    caminho = _caminho(slug, formato, chave_de_versao(session, etapa))
+    if os.path.exists(caminho):
+        return caminho
+
+    def gerar():
+        if os.path.exists(caminho):
+            return caminho
+        os.makedirs(EXPORT_CACHE_DIR, exist_ok=True)
+        fd, temporario = tempfile.mkstemp(dir=EXPORT_CACHE_DIR, suffix=".tmp")
+        os.close(fd)
+        try:
+            escritor(temporario, _lotes(session, etapa, EXPORT_LOTE))
+            os.replace(temporario, caminho)
+        except BaseException:
+            os.remove(temporario)
+            raise
+        logger.info(f"[Export] {caminho} gerado")
+        _remover_versoes_antigas(slug, formato, caminho)
+        return caminho
+
+    return _geracoes.executar(caminho, gerar)
@@ -0,0 +1,173 @@
+# services/inicializacao.py
+
+import contextlib
+import os
+import threading
+import time
+from datetime import datetime, timezone
+
+from logging_config import logger
+
+# =============< CONFIGURAÇÕES GERAIS >===============================
+
+# Faz a carga inicial (popular_banco, só age com o banco vazio) em segundo
+# plano ao subir o app; `python app.py` a faz sempre
+POPULAR_NA_INICIALIZACAO = os.getenv(
+    "POPULAR_NA_INICIALIZACAO", "0").lower() in ("1", "true", "yes")
+
+# Quanto tempo (segundos) uma requisição à API espera o esquema do banco
+# ser criado antes de receber 503
+INICIALIZACAO_ESPERA_ESQUEMA = float(
+    os.getenv("INICIALIZACAO_ESPERA_ESQUEMA", "10"))
+
+
+def _trava_inicializacao():
+    # com vários workers cada um inicializa o seu processo: um de cada vez,
+    # então só o primeiro cria o esquema e faz a carga (os outros encontram
+    # o banco pronto)
+    from services.cache_compartilhado import (
+        CACHE_COMPARTILHADO_PATH,
+        trava_arquivo
+    )
+    if not CACHE_COMPARTILHADO_PATH:
+        return contextlib.nullcontext()
+    return trava_arquivo(os.path.dirname(CACHE_COMPARTILHADO_PATH),
+                         "inicializacao")
+
+
+# =====================< INICIALIZAÇÃO >==============================
+
+class Inicializacao:
+    """
+    Prepara o banco numa thread em segundo plano, para o servidor aceitar
+    conexões (e responder /health) sem esperar por ela. As fases são
+    "aguardando" (não iniciada), "criando_esquema", "carregando_snapshot"
+    (com SNAPSHOT_PATH e o banco vazio), "populando" (com a etapa em
+    andamento e quantas já terminaram), "pronto" e "erro".
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._liberado = threading.Event()
+        self._thread = None
+        self.fase = "aguardando"
+        self.etapa = None
+        self.etapas_concluidas = 0
+        self.total_etapas = 0
+        self.iniciado_em = None
+        self.concluido_em = None
+        self.erro = None
+        self.esquema_criado = False
+        self._inicio = None
+
+    @property
+    def pronto(self) -> bool:
+        return self.fase == "pronto"
+
+    def progresso(self, etapa: str | None, concluidas: int, total: int):
+        """Callback do `sincronizar`: etapa em andamento e quantas faltam."""
+        with self._lock:
+            self.etapa = etapa
+            self.etapas_concluidas = concluidas
+            self.total_etapas = total
+
+    def _fase(self, fase: str):
+        with self._lock:
+            self.fase = fase
+        logger.info(f"[Inicialização] {fase} "
+                    f"({time.monotonic() - self._inicio:.1f}s)")
+
+    def executar(self, popular: bool = False, ao_concluir=None):
+        """
+        Cria o esquema, carrega o snapshot (SNAPSHOT_PATH) se o banco
+        estiver vazio e, com `popular`, faz a carga inicial pelo site (que
+        não faz nada se o snapshot já populou o banco); ao terminar chama
+        `ao_concluir` (ex.: ligar o agendador).
+        """
+        from config import BaseConfig
+        from models.database import init_db
+
+        if self._inicio is None:
+            self._inicio = time.monotonic()
+        try:
+            if BaseConfig.SNAPSHOT_PATH:
+                from services.snapshot import reservar_banco_temporario
+                reservar_banco_temporario()
+            with _trava_inicializacao():
+                self._fase("criando_esquema")
+                init_db()
+                self.esquema_criado = True
+                self._liberado.set()
+                if BaseConfig.SNAPSHOT_PATH:
+                    from services.snapshot import carregar_se_vazio
+                    self._fase("carregando_snapshot")
+                    carregar_se_vazio(BaseConfig.SNAPSHOT_PATH)
+                if popular:
+                    # importado só aqui: puxa o scraper (requests, bs4)
+                    from scripts.populate_db import popular_banco
+                    self._fase("populando")
+                    popular_banco(progresso=self.progresso)
+            with self._lock:
+                self.etapa = None
+                self.concluido_em = datetime.now(timezone.utc).isoformat()
+            self._fase("pronto")
+            if ao_concluir is not None:
+                ao_concluir()
+        except Exception as e:
+            logger.error(f"[Inicialização] falha: {e}")
+            with self._lock:
+                self.fase = "erro"
+                self.erro = str(e)
+        finally:
+            # se o esquema não saiu, ninguém fica esperando por ele
+            self._liberado.set()
+
+    def iniciar(self, popular: bool = POPULAR_NA_INICIALIZACAO,
+                ao_concluir=None):
+        """Roda `executar` numa thread (uma vez por processo)."""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._inicio = time.monotonic()
+            self.iniciado_em = datetime.now(timezone.utc).isoformat()
+            self._thread = threading.Thread(
+                target=self.executar, args=(popular, ao_concluir),
+                daemon=True, name="inicializacao")
+        self._thread.start()
+
+    def aguardar(self, timeout: float | None = None) -> bool:
+        """Espera a inicialização terminar; True se ficou pronta."""
+        if self._thread is not None:
+            self._thread.join(timeout)
+        return self.pronto
+
+    def aguardar_esquema(self,
+                         timeout: float = INICIALIZACAO_ESPERA_ESQUEMA
+                         ) -> bool:
+        """
+        Espera o esquema do banco existir. Sem inicialização em segundo
+        plano neste processo, não há o que esperar.
+        """
+        if self._thread is None:
+            return True
+        return self._liberado.wait(timeout) and self.esquema_criado
+
+    def estatisticas(self) -> dict:
+        with self._lock:
+            percentual = (100 * self.etapas_concluidas // self.total_etapas
+                          if self.total_etapas else None)
+            return {
+                "fase": self.fase,
+                "pronto": self.fase == "pronto",
+                "etapa": self.etapa,
+                "etapas_concluidas": self.etapas_concluidas,
+                "total_etapas": self.total_etapas,
+                "percentual": percentual,
+                "iniciado_em": self.iniciado_em,
+                "concluido_em": self.concluido_em,
+                "erro": self.erro,
+            }
+
+
+# Instância do processo (usada pelo app e por /ready)
+inicializacao = Inicializacao()
@@ -0,0 +1,221 @@
+# services/materializacao.py
+
+import gzip
+import json
+import os
+import struct
+import threading
+from collections import Counter
+from typing import NamedTuple
+
+from logging_config import logger
+from services.cache_compartilhado import (
+    CACHE_COMPARTILHADO_PATH,
+    CacheCompartilhado
+)
+from services.cache_dados import CacheTTL
+
+try:
+    import brotli
+except ImportError:  # opcional: sem ele só há gzip
+    brotli = None
+
+# =============< CONFIGURAÇÕES GERAIS >===============================
+
+# Quantas assinaturas de consulta (rota + query string) mais pedidas têm
+# a resposta guardada pronta
+MATERIALIZAR_TOP_N = int(os.getenv("MATERIALIZAR_TOP_N", "32"))
+
+# Respostas maiores que isso (bytes, sem compressão) não são guardadas
+MATERIALIZAR_MAX_BYTES = int(
+    os.getenv("MATERIALIZAR_MAX_BYTES", str(1024 * 1024)))
+
+# Espaço total (bytes) das respostas guardadas, comprimidas incluídas
+MATERIALIZAR_CACHE_MAX_BYTES = int(
+    os.getenv("MATERIALIZAR_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+# Validade (segundos) de uma resposta guardada; na prática elas saem
+# antes, quando a versão dos dados muda
+MATERIALIZAR_TTL = int(os.getenv("MATERIALIZAR_TTL", "86400"))
+
+# tamanho do cabeçalho de uma resposta empacotada
+_TAMANHO = struct.Struct("<I")
+
+
+def codificacoes_disponiveis() -> tuple[str, ...]:
+    """Content-Encodings pré-calculados, na ordem de preferência."""
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def comprimir(corpo: bytes) -> dict[str, bytes]:
+    """{codificação: corpo}; "identity" é o corpo original."""
+    corpos = {"identity": corpo,
+              "gzip": gzip.compress(corpo, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        corpos["br"] = brotli.compress(corpo)
+    return corpos
+
+
+class RespostaMaterializada(NamedTuple):
+    mimetype: str
+    headers: tuple  # headers próprios da rota (ex.: X-Next-Cursor)
+    corpos: dict    # codificação -> bytes
+
+
+def _empacotar(resposta: RespostaMaterializada) -> bytes:
+    """Cabeçalho JSON (com o tamanho de cada corpo) seguido dos corpos."""
+    cabecalho = json.dumps({
+        "mimetype": resposta.mimetype,
+        "headers": list(resposta.headers),
+        "corpos": {c: len(corpo) for c, corpo in resposta.corpos.items()},
+    }).encode()
+    return (_TAMANHO.pack(len(cabecalho)) + cabecalho
+            + b"".join(resposta.corpos.values()))
+
+
+def _desempacotar(dados: bytes) -> RespostaMaterializada:
+    (tamanho,) = _TAMANHO.unpack_from(dados)
+    inicio = _TAMANHO.size + tamanho
+    cabecalho = json.loads(dados[_TAMANHO.size:inicio])
+    corpos = {}
+    for codificacao, tamanho_corpo in cabecalho["corpos"].items():
+        corpos[codificacao] = dados[inicio:inicio + tamanho_corpo]
+        inicio += tamanho_corpo
+    return RespostaMaterializada(
+        cabecalho["mimetype"], tuple(map(tuple, cabecalho["headers"])),
+        corpos)
+
+
+def _cache_padrao():
+    # no arquivo SQLite ao lado do cache compartilhado (comum aos
+    # workers do host) ou, com CACHE_COMPARTILHADO_PATH="", em memória
+    if CACHE_COMPARTILHADO_PATH:
+        return CacheCompartilhado(
+            os.path.join(os.path.dirname(CACHE_COMPARTILHADO_PATH),
+                         "respostas.db"),
+            MATERIALIZAR_TTL, MATERIALIZAR_CACHE_MAX_BYTES, binario=True)
+    return CacheTTL(MATERIALIZAR_TTL, MATERIALIZAR_CACHE_MAX_BYTES)
+
+
+class Materializador:
+    """
+    Guarda, serializadas e já comprimidas, as respostas das MATERIALIZAR_TOP_N
+    assinaturas de consulta mais pedidas, por versão dos dados
+    (services.versao): quando ela muda, as da versão anterior são
+    descartadas e as novas voltam a ser geradas conforme os pedidos
+    chegam. A contagem de pedidos é de cada processo e sobrevive à troca
+    de versão, então as consultas quentes continuam quentes; os corpos
+    ficam em `cache` (padrão: o cache compartilhado do host), então uma
+    resposta materializada por um worker serve a todos. Seguro para uso
+    entre threads.
+    """
+
+    def __init__(self, top_n: int = MATERIALIZAR_TOP_N,
+                 max_bytes: int = MATERIALIZAR_MAX_BYTES, cache=None):
+        self.top_n = top_n
+        self.max_bytes = max_bytes
+        self._pedidos: Counter = Counter()
+        self._cache = cache
+        # assinaturas guardadas por este processo na versão atual
+        self._guardadas: set = set()
+        self._versao = None
+        self._lock = threading.Lock()
+        self.acertos = 0
+        self.falhas = 0
+
+    @property
+    def cache(self):
+        # criado no primeiro uso: importar o módulo não cria arquivos
+        if self._cache is None:
+            with self._lock:
+                if self._cache is None:
+                    self._cache = _cache_padrao()
+        return self._cache
+
+    def _trocar_versao(self, versao) -> list:
+        """Passa para `versao`; retorna as chaves da versão anterior."""
+        if versao == self._versao:
+            return []
+        antigas = [(self._versao, a) for a in self._guardadas]
+        self._guardadas = set()
+        self._versao = versao
+        return antigas
+
+    def obter(self, versao, assinatura) -> RespostaMaterializada | None:
+        """Resposta guardada para a assinatura (conta o pedido)."""
+        with self._lock:
+            antigas = self._trocar_versao(versao)
+            self._pedidos[assinatura] += 1
+            if len(self._pedidos) > 8 * self.top_n:
+                # esquece a cauda de consultas raras
+                self._pedidos = Counter(
+                    dict(self._pedidos.most_common(4 * self.top_n)))
+        for chave in antigas:
+            self.cache.remover(chave)
+
+        dados = self.cache.obter((versao, assinatura))
+        with self._lock:
+            if dados is None:
+                self.falhas += 1
+            else:
+                self.acertos += 1
+        return None if dados is None else _desempacotar(dados)
+
+    def _mais_pedidas(self) -> set:
+        return {a for a, _ in self._pedidos.most_common(self.top_n)}
+
+    def guardar(self, versao, assinatura, corpo: bytes, mimetype: str,
+                headers=()) -> RespostaMaterializada | None:
+        """
+        Materializa a resposta se a assinatura estiver no top N e a
+        retorna (None quando não entra). As que este processo guardou e
+        saíram do top N são removidas.
+        """
+        if len(corpo) > self.max_bytes or self.top_n <= 0:
+            return None
+        with self._lock:
+            if versao != self._versao \
+                    or assinatura not in self._mais_pedidas():
+                return None
+        materializada = RespostaMaterializada(
+            mimetype, tuple(headers), comprimir(corpo))
+        self.cache.guardar((versao, assinatura), _empacotar(materializada))
+        with self._lock:
+            if versao != self._versao:
+                return None
+            self._guardadas.add(assinatura)
+            mais_pedidas = self._mais_pedidas()
+            despejar = [a for a in self._guardadas if a not in mais_pedidas]
+            self._guardadas.difference_update(despejar)
+        for antiga in despejar:
+            self.cache.remover((versao, antiga))
+        logger.info(f"[Materialização] {assinatura} materializada")
+        return materializada
+
+    def mais_pedidas(self, quantas: int | None = None) -> list:
+        """As assinaturas mais pedidas (padrão: top N), da mais à menos."""
+        with self._lock:
+            return [assinatura for assinatura, _ in
+                    self._pedidos.most_common(quantas or self.top_n)]
+
+    def invalidar(self) -> int:
+        with self._lock:
+            self._guardadas = set()
+        return self.cache.invalidar()
+
+    def estatisticas(self) -> dict:
+        cache = self.cache.estatisticas()
+        with self._lock:
+            return {
+                "versao": self._versao,
+                "respostas": cache["entradas"],
+                "top_n": self.top_n,
+                "bytes": cache["bytes"],
+                "codificacoes": ["identity", *codificacoes_disponiveis()],
+                "acertos": self.acertos,
+                "falhas": self.falhas,
+            }
+
+
+# Instância usada pelas rotas de listagem
+respostas_materializadas = Materializador()
@@ -0,0 +1,60 @@
+# services/planejador.py
+
+from typing import NamedTuple
+
+from services.scraper import campo_categoria, categorias_da_etapa
+
+
+class PlanoBusca(NamedTuple):
+    """
+    O mínimo que precisa ser raspado para responder a uma consulta:
+    os anos [ano_inicio, ano_fim] e as categorias (subopções) da aba.
+    `categorias` None significa todas; vazio, nenhuma.
+    """
+    etapa: str
+    ano_inicio: int
+    ano_fim: int
+    categorias: tuple | None = None
+
+    @property
+    def vazio(self) -> bool:
+        return self.ano_inicio > self.ano_fim or self.categorias == ()
+
+    def paginas(self) -> list[tuple]:
+        """Lista (subopção, ano) das páginas que o plano busca."""
+        if self.vazio:
+            return []
+        subopcoes = categorias_da_etapa(self.etapa)
+        categorias = subopcoes if self.categorias is None else self.categorias
+        return [(subopcoes[categoria], ano)
+                for categoria in categorias
+                for ano in range(self.ano_inicio, self.ano_fim + 1)]
+
+
+def planejar(etapa: str, ano: int | None = None, ano_inicio: int = 1970,
+             ano_fim: int = 2024, filtros: dict | None = None) -> PlanoBusca:
+    """
+    Traduz os filtros de uma rota no plano de busca mínimo:
+
+    - `ano` reduz o intervalo a um único ano (ou a nenhum, se estiver
+      fora de [ano_inicio, ano_fim]);
+    - o filtro na coluna de categoria da aba (ex.: `categoria_produto`
+      em Importação) reduz as subopções à categoria pedida; uma categoria
+      que não existe no site não busca nada.
+
+    Os demais filtros (país, produto...) não mudam quais páginas são
+    buscadas e continuam sendo aplicados sobre os registros.
+    """
+    if ano is not None:
+        if ano_inicio <= ano <= ano_fim:
+            ano_inicio = ano_fim = ano
+        else:
+            ano_inicio, ano_fim = ano, ano - 1
+
+    categorias = None
+    coluna = campo_categoria(etapa)
+    valor = (filtros or {}).get(coluna) if coluna else None
+    if valor:
+        categorias = (valor,) if valor in categorias_da_etapa(etapa) else ()
+
+    return PlanoBusca(etapa, ano_inicio, ano_fim, categorias)
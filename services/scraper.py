@@ -1,18 +1,59 @@
 # services/scraper.py
 
+import asyncio
+import csv
+import itertools
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import NamedTuple
+from urllib.parse import urlsplit
+
 import requests
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from bs4 import BeautifulSoup, SoupStrainer
 from logging_config import logger
+from services.cache_paginas import CachePaginas, SCRAPER_CACHE_DIR, chave_pagina
 
 # =============< CONFIGURAÇÕES GERAIS >===============================
 
 REQUEST_TIMEOUT = 10
 
+# Quantas páginas podem ser buscadas ao mesmo tempo
+SCRAPER_MAX_WORKERS = int(os.getenv("SCRAPER_MAX_WORKERS", "8"))
+
+# Máximo de requisições por segundo para um mesmo host (0 = sem limite)
+SCRAPER_RATE_LIMIT = float(os.getenv("SCRAPER_RATE_LIMIT", "10"))
+
+# Backend do BeautifulSoup: "html.parser" (sempre disponível), "lxml"
+# (mais rápido, se instalado) ou "auto" (lxml quando disponível)
+SCRAPER_PARSER = os.getenv("SCRAPER_PARSER", "auto")
+
+# Só materializa a tabela `tb_dados` (o resto da página é descartado
+# durante o parse). "0" volta a montar a árvore do documento inteiro.
+SCRAPER_PARSE_SO_TABELA = os.getenv("SCRAPER_PARSE_SO_TABELA", "1") != "0"
+
+# De onde vêm os dados: "html" (uma página por categoria e ano) ou "csv"
+# (os arquivos de download do site, um por aba/subopção com todos os
+# anos). No modo "csv", o que os arquivos não cobrirem é buscado no HTML.
+SCRAPER_FONTE = os.getenv("SCRAPER_FONTE", "html")
+FONTES = ("html", "csv")
+
+# Como as páginas HTML são buscadas: "threads" (requests, até
+# SCRAPER_MAX_WORKERS por vez) ou "async" (httpx + asyncio numa única
+# thread, até SCRAPER_ASYNC_CONCORRENCIA por vez; ver scraper_async)
+SCRAPER_MOTOR = os.getenv("SCRAPER_MOTOR", "threads")
+MOTORES = ("threads", "async")
+
 HTTP_HEADERS = {
     "User-Agent": "Embrapa-Data-Scraper/1.0 (+https://www.embrapa.br)"
 }
 
 _BASE_URL = "http://vitibrasil.cnpuv.embrapa.br/index.php"
+_DOWNLOAD_URL = "http://vitibrasil.cnpuv.embrapa.br/download/"
 
 _IMPORT_CATEGORIES = {
     "Vinhos de mesa": "subopt_01",
@@ -37,108 +78,727 @@ _PROCESS_CATEGORIES = {
 }
 
 
-# =====================< HELPERS INTERNOS >===========================
+# =====================< MOTOR DE BUSCA CONCORRENTE >=================
 
-def _safe_get(url: str, params: dict = None) -> BeautifulSoup | None:
-    logger.info(f"[GET] {url} | params={params}")
+class _Requisicao(NamedTuple):
+    metodo: str
+    url: str
+    params: dict | None = None
+    data: dict | None = None
+
+
+class _LimitadorPorHost:
+    """
+    Espaça as requisições a um mesmo host em pelo menos 1/taxa segundos,
+    mesmo quando várias threads disputam o mesmo host.
+    """
+
+    def __init__(self, taxa: float):
+        self.intervalo = 1.0 / taxa if taxa > 0 else 0.0
+        self._lock = threading.Lock()
+        self._proxima_vaga: dict[str, float] = {}
+
+    def reservar(self, host: str) -> float:
+        """Reserva a próxima vaga do host; retorna quanto esperar por ela."""
+        if not self.intervalo:
+            return 0.0
+        with self._lock:
+            agora = time.monotonic()
+            vaga = max(agora, self._proxima_vaga.get(host, agora))
+            self._proxima_vaga[host] = vaga + self.intervalo
+        return vaga - agora
+
+    def aguardar(self, host: str):
+        espera = self.reservar(host)
+        if espera > 0:
+            time.sleep(espera)
+
+
+_limitador = _LimitadorPorHost(SCRAPER_RATE_LIMIT)
+_sessao_compartilhada: requests.Session | None = None
+_sessao_lock = threading.Lock()
+
+
+def _sessao() -> requests.Session:
+    """
+    Sessão HTTP única do scraper, com pool de conexões keep-alive
+    dimensionado para SCRAPER_MAX_WORKERS threads simultâneas.
+    """
+    global _sessao_compartilhada
+    with _sessao_lock:
+        if _sessao_compartilhada is None:
+            sessao = requests.Session()
+            adaptador = HTTPAdapter(
+                pool_connections=4, pool_maxsize=max(SCRAPER_MAX_WORKERS, 1))
+            sessao.mount("http://", adaptador)
+            sessao.mount("https://", adaptador)
+            sessao.headers.update(HTTP_HEADERS)
+            _sessao_compartilhada = sessao
+        return _sessao_compartilhada
+
+
+_cache_paginas = CachePaginas(SCRAPER_CACHE_DIR) if SCRAPER_CACHE_DIR else None
+
+
+def _baixar_html(req: _Requisicao) -> str | None:
+    """
+    Executa uma requisição respeitando o limite por host.
+    Retorna o HTML da página ou None em caso de erro HTTP/rede.
+    """
+    _limitador.aguardar(urlsplit(req.url).netloc)
+    logger.info(
+        f"[{req.metodo}] {req.url} | params={req.params} data={req.data}")
     try:
-        resp = requests.get(url, params=params,
-                            headers=HTTP_HEADERS, timeout=REQUEST_TIMEOUT)
+        resp = _sessao().request(req.metodo, req.url, params=req.params,
+                                 data=req.data, timeout=REQUEST_TIMEOUT)
         resp.raise_for_status()
-        return BeautifulSoup(resp.text, "html.parser")
+        # o site não declara charset; sem isso requests assume ISO-8859-1
+        if "charset" not in resp.headers.get("Content-Type", "").lower():
+            resp.encoding = "utf-8"
+        return resp.text
     except requests.exceptions.RequestException as err:
-        logger.error(f"[HTTP ERROR] GET {url} with params={params}: {err}")
+        logger.error(
+            f"[HTTP ERROR] {req.metodo} {req.url} with "
+            f"params={req.params} data={req.data}: {err}")
         return None
 
 
-def _safe_post(url: str, data: dict) -> BeautifulSoup | None:
-    logger.info(f"[POST] {url} | data={data}")
-    try:
-        resp = requests.post(
-            url, data=data, headers=HTTP_HEADERS, timeout=REQUEST_TIMEOUT)
-        resp.raise_for_status()
-        return BeautifulSoup(resp.text, "html.parser")
-    except requests.exceptions.RequestException as err:
-        logger.error(f"[HTTP ERROR] POST {url} with data={data}: {err}")
+def _ler_cache(req: _Requisicao):
+    """(chave, cópia cacheada ou None) da página no cache em disco."""
+    chave = chave_pagina(req.metodo, req.url, req.params, req.data)
+    return chave, _cache_paginas.ler(chave)
+
+
+def _resultado_do_download(chave, cacheada, html: str | None) -> str | None:
+    """
+    Aplica ao cache o resultado de uma busca: grava/revalida a página
+    nova ou, se a busca falhou, devolve a cópia vencida.
+    """
+    if html is None:
+        if cacheada is not None:
+            logger.warning(f"[Cache] usando cópia vencida de {chave}")
+            return cacheada.html
         return None
 
+    # só guarda páginas com a tabela de dados (evita cachear páginas de erro)
+    if "tb_dados" in html:
+        if cacheada is not None and cacheada.html == html:
+            _cache_paginas.revalidar(chave)
+        else:
+            _cache_paginas.gravar(chave, html)
+    return html
+
+
+def _buscar_html(req: _Requisicao) -> str | None:
+    """
+    Busca uma página passando pelo cache em disco: páginas frescas não
+    tocam a rede; páginas vencidas são rebuscadas e, se a nova busca
+    falhar, a cópia vencida é usada no lugar.
+    """
+    if _cache_paginas is None:
+        return _baixar_html(req)
+
+    chave, cacheada = _ler_cache(req)
+    if cacheada is not None and cacheada.fresca:
+        return cacheada.html
+    with _cache_paginas.trava(chave):
+        # outro worker pode ter buscado a página enquanto esperávamos
+        chave, cacheada = _ler_cache(req)
+        if cacheada is not None and cacheada.fresca:
+            return cacheada.html
+        return _resultado_do_download(chave, cacheada, _baixar_html(req))
+
+
+def _em_paralelo(funcao, itens: list, max_workers: int | None = None) -> list:
+    """
+    Aplica `funcao` a cada item com no máximo `max_workers` threads
+    (padrão: SCRAPER_MAX_WORKERS), devolvendo os resultados na ordem
+    de `itens`, independente da ordem em que terminam.
+    """
+    workers = min(max_workers or SCRAPER_MAX_WORKERS, len(itens))
+    if workers <= 1:
+        return [funcao(item) for item in itens]
+    with ThreadPoolExecutor(max_workers=workers,
+                            thread_name_prefix="scraper") as executor:
+        return list(executor.map(funcao, itens))
 
-def _clean_number_string(s: str) -> int:
+
+def _buscar_paginas(requisicoes: list[_Requisicao],
+                    max_workers: int | None = None) -> list[str | None]:
+    """
+    Busca várias páginas em paralelo, com no máximo `max_workers`
+    requisições simultâneas (padrão: SCRAPER_MAX_WORKERS).
+    O resultado segue exatamente a ordem de `requisicoes`, independente
+    da ordem em que as respostas chegam.
+    """
+    return _em_paralelo(_buscar_html, requisicoes, max_workers)
+
+
+# =====================< PARSE DO HTML >==============================
+
+# Durante o parse o atributo class ainda não foi separado em valores
+# ("tb_base tb_dados"), por isso o filtro usa uma regex por palavra
+_SO_TABELA_DADOS = SoupStrainer(
+    "table", class_=re.compile(r"(^|\s)tb_dados(\s|$)"))
+
+
+def _resolver_parser(nome: str) -> str:
+    if nome not in ("auto", "lxml"):
+        return nome
+    try:
+        import lxml  # noqa: F401
+        return "lxml"
+    except ImportError:
+        if nome == "lxml":
+            logger.warning("[Parser] lxml não instalado; usando html.parser")
+        return "html.parser"
+
+
+_parser = _resolver_parser(SCRAPER_PARSER)
+
+
+def _parse_html(html: str, parser: str | None = None,
+                so_tabela: bool | None = None) -> BeautifulSoup:
+    """
+    Monta a árvore do HTML com o backend configurado. Por padrão só a
+    tabela `tb_dados` é materializada, que é tudo o que os extratores usam.
+    """
+    if so_tabela is None:
+        so_tabela = SCRAPER_PARSE_SO_TABELA
+    return BeautifulSoup(
+        html, parser or _parser,
+        parse_only=_SO_TABELA_DADOS if so_tabela else None)
+
+
+# =====================< HELPERS INTERNOS >===========================
+
+def _safe_get(url: str, params: dict = None) -> BeautifulSoup | None:
+    html = _buscar_html(_Requisicao("GET", url, params=params))
+    return _parse_html(html) if html is not None else None
+
+
+def _safe_post(url: str, data: dict) -> BeautifulSoup | None:
+    html = _buscar_html(_Requisicao("POST", url, data=data))
+    return _parse_html(html) if html is not None else None
+
+
+def _clean_number_string(s: str, padrao: int | None = 0) -> int | None:
+    """
+    Converte números no formato do site ("1.234.567") em int.
+    Traços, "nd", "*" e vazios viram `padrao`.
+    """
     texto = s.replace(".", "").strip()
-    return int(texto) if texto.isdigit() else 0
+    return int(texto) if texto.isdigit() else padrao
 
 
-def _extract_table_categorizada(soup, etapa, categoria_uva, ano):
-    tabela = soup.find("table", class_="tb_base tb_dados")
-    resultados = []
-    if not tabela:
-        logger.warning(
-            f"[{etapa}] Nenhuma tabela encontrada para {categoria_uva} - {ano}")
-        return resultados
+# Conversões aplicáveis ao texto de uma célula
+_CONVERSORES = {
+    "texto": lambda texto: texto,
+    "int": _clean_number_string,
+    "int_ou_none": lambda texto: _clean_number_string(texto, None),
+}
+
+
+# =====================< ESPECIFICAÇÃO DAS ABAS >=====================
 
+@dataclass(frozen=True)
+class TabelaSpec:
+    """
+    Descrição declarativa de uma aba do vitibrasil: como paginar (opção,
+    método, subopções e ordem) e como transformar a tabela `tb_dados` em
+    registros.
+
+    Layout hierárquico (duas colunas, linhas `tb_item`/`tb_subitem`):
+      - campo_item: campo que recebe o texto da linha `tb_item` corrente
+      - campo_subitem: campo que recebe o nome da linha `tb_subitem`
+      - campo_valor / conversor: segunda coluna do subitem
+      - registrar_itens: se a linha `tb_item` também vira um registro
+        (de total, com nome e valor vazios)
+
+    Layout plano (uma linha por registro):
+      - colunas: ((campo, conversor), ...) na ordem das células
+      - pular_cabecalho: descarta a primeira linha da tabela
+      - linha_total: a página traz uma linha "Total" (no rodapé) que também
+        vira registro; no CSV ela não existe e é calculada
+
+    arquivos_csv: {categoria: arquivo} dos downloads em CSV da aba
+    ({None: arquivo} quando ela não tem subopções).
+    """
+    etapa: str
+    opcao: str
+    metodo: str = "GET"
+    subopcoes: dict | None = None
+    campo_categoria: str | None = None
+    ordem: str = "ano"
+    hierarquica: bool = True
+    campo_item: str | None = None
+    campo_subitem: str | None = None
+    campo_valor: str | None = None
+    conversor: str = "texto"
+    registrar_itens: bool = False
+    colunas: tuple = ()
+    pular_cabecalho: bool = False
+    linha_total: bool = False
+    arquivos_csv: dict | None = None
+
+
+TABELAS = {
+    spec.etapa: spec for spec in (
+        TabelaSpec(
+            etapa="Produção", opcao="opt_02",
+            campo_item="categoria_produto", campo_subitem="tipo_produto",
+            campo_valor="quantidade_l", registrar_itens=True,
+            arquivos_csv={None: "Producao.csv"}),
+        TabelaSpec(
+            etapa="Processamento", opcao="opt_03",
+            subopcoes=_PROCESS_CATEGORIES, campo_categoria="categoria_uva",
+            campo_item="tipo_uva", campo_subitem="nome_uva",
+            campo_valor="quantidade_kg", conversor="int_ou_none",
+            arquivos_csv={
+                "Viníferas": "ProcessaViniferas.csv",
+                "Americanas e híbridas": "ProcessaAmericanas.csv",
+                "Uvas de mesa": "ProcessaMesa.csv",
+                "Sem classificação": "ProcessaSemclass.csv",
+            }),
+        TabelaSpec(
+            etapa="Comercialização", opcao="opt_04",
+            campo_item="categoria_produto", campo_subitem="produto",
+            campo_valor="quantidade_l", registrar_itens=True,
+            arquivos_csv={None: "Comercio.csv"}),
+        TabelaSpec(
+            etapa="Importação", opcao="opt_05", metodo="POST",
+            subopcoes=_IMPORT_CATEGORIES, campo_categoria="categoria_produto",
+            ordem="categoria", hierarquica=False, pular_cabecalho=True,
+            colunas=(("pais", "texto"), ("quantidade_kg", "int"),
+                     ("valor_usd", "int")),
+            linha_total=True,
+            arquivos_csv={
+                "Vinhos de mesa": "ImpVinhos.csv",
+                "Espumantes": "ImpEspumantes.csv",
+                "Uvas frescas": "ImpFrescas.csv",
+                "Uvas passas": "ImpPassas.csv",
+                "Suco de uva": "ImpSuco.csv",
+            }),
+        TabelaSpec(
+            etapa="Exportação", opcao="opt_06", metodo="POST",
+            subopcoes=_EXPORT_CATEGORIES, campo_categoria="categoria_produto",
+            ordem="categoria", hierarquica=False, pular_cabecalho=True,
+            colunas=(("pais", "texto"), ("quantidade_kg", "int"),
+                     ("valor_usd", "int")),
+            linha_total=True,
+            arquivos_csv={
+                "Vinhos de mesa": "ExpVinho.csv",
+                "Espumantes": "ExpEspumantes.csv",
+                "Uvas frescas": "ExpUva.csv",
+                "Suco de uva": "ExpSuco.csv",
+            }),
+    )
+}
+
+ETAPAS = tuple(TABELAS)
+
+
+# =====================< MOTOR DE EXTRAÇÃO >=========================
+
+def _linhas_html(spec: TabelaSpec, tabela):
+    """
+    Linhas da tabela `tb_dados` no formato comum do motor: tuplas com o
+    texto das células (layout plano) ou (classe, nome, valor) com classe
+    "tb_item"/"tb_subitem" (layout hierárquico).
+    """
     linhas = tabela.find_all("tr")
-    tipo_uva_atual = None
+    if spec.pular_cabecalho:
+        linhas = linhas[1:]
+
+    if not spec.hierarquica:
+        n = len(spec.colunas)
+        for linha in linhas:
+            celulas = linha.find_all("td", recursive=False)
+            if len(celulas) == n:
+                yield tuple(celula.get_text().strip() for celula in celulas)
+        return
 
     for linha in linhas:
-        colunas = linha.find_all("td")
-        if len(colunas) != 2:
+        celulas = linha.find_all("td", recursive=False)
+        if len(celulas) != 2:
             continue
+        classes = celulas[0].get("class") or ()
+        for classe in ("tb_item", "tb_subitem"):
+            if classe in classes:
+                yield (classe, celulas[0].get_text(strip=True),
+                       celulas[1].get_text(strip=True))
+                break
 
-        texto0 = colunas[0].get_text(strip=True)
-        texto1 = colunas[1].get_text(strip=True)
 
-        if "tb_item" in colunas[0].get("class", []):
-            tipo_uva_atual = texto0
+def _montar_registros(spec: TabelaSpec, linhas, categoria, ano) -> list[dict]:
+    """
+    Transforma as linhas (de uma página HTML ou de um CSV) em registros
+    conforme a `spec`. É o laço quente do scraper: todas as abas passam
+    por aqui.
+    """
+    base = {"etapa": spec.etapa}
+    if spec.campo_categoria:
+        base[spec.campo_categoria] = categoria
+    resultados = []
 
-        elif "tb_subitem" in colunas[0].get("class", []):
-            qt = texto1.replace(".", "").strip()
-            if qt.isdigit():
-                quantidade_kg = int(qt)
-            else:
-                quantidade_kg = None
+    if not spec.hierarquica:
+        conversores = [(campo, _CONVERSORES[nome])
+                       for campo, nome in spec.colunas]
+        for celulas in linhas:
+            registro = dict(base)
+            for (campo, converter), texto in zip(conversores, celulas):
+                registro[campo] = converter(texto)
+            registro["ano"] = ano
+            resultados.append(registro)
+        return resultados
 
-            resultados.append({
-                "etapa": etapa,
-                "categoria_uva": categoria_uva,
-                "tipo_uva": tipo_uva_atual,
-                "nome_uva": texto0,
-                "quantidade_kg": quantidade_kg,
-                "ano": ano
-            })
+    converter = _CONVERSORES[spec.conversor]
+    item_atual = None
+    for classe, nome, valor in linhas:
+        if classe == "tb_item":
+            item_atual = nome
+            if spec.registrar_itens:
+                registro = dict(base)
+                registro[spec.campo_item] = item_atual
+                registro[spec.campo_subitem] = ""
+                registro[spec.campo_valor] = ""
+                registro["ano"] = ano
+                resultados.append(registro)
+        else:
+            registro = dict(base)
+            registro[spec.campo_item] = item_atual
+            registro[spec.campo_subitem] = nome
+            registro[spec.campo_valor] = converter(valor)
+            registro["ano"] = ano
+            resultados.append(registro)
 
     return resultados
 
 
-def get_processamento_data(ano_inicio=1970, ano_fim=2024):
-    logger.info(
-        f"Iniciando scraping de Processamento ({ano_inicio}-{ano_fim})")
-    base_url = _BASE_URL
-    subopcoes = _PROCESS_CATEGORIES
-    todos = []
-    session = requests.Session()
-
-    for ano in range(ano_inicio, ano_fim + 1):
-        for categoria_uva, subopt in subopcoes.items():
-            params = {"opcao": "opt_03", "subopcao": subopt, "ano": str(ano)}
+def _extrair(spec: TabelaSpec, soup, categoria, ano) -> list[dict]:
+    """Registros da tabela `tb_dados` de uma página já interpretada."""
+    tabela = soup.find("table", class_="tb_dados")
+    if not tabela:
+        logger.warning(
+            f"[{spec.etapa}] Nenhuma tabela encontrada para {categoria} - {ano}")
+        return []
+    return _montar_registros(
+        spec, _linhas_html(spec, tabela), categoria, ano)
+
+
+# =====================< COLETA POR PÁGINA >==========================
+
+class PaginaColetada(NamedTuple):
+    etapa: str
+    categoria: str | None
+    subopcao: str | None
+    ano: int
+    registros: list[dict] | None  # None quando a página não pôde ser obtida
+
+
+def categorias_da_etapa(etapa: str) -> dict:
+    """{categoria: subopção} da aba; {None: None} se ela não tem subopções."""
+    return TABELAS[etapa].subopcoes or {None: None}
+
+
+def campo_categoria(etapa: str) -> str | None:
+    """Coluna que guarda a categoria da subopção (None se não houver)."""
+    return TABELAS[etapa].campo_categoria
+
+
+def extrair_pagina(etapa: str, html: str, categoria: str | None, ano: int,
+                   parser: str | None = None,
+                   so_tabela: bool | None = None) -> list[dict]:
+    """Interpreta o HTML de uma página da `etapa` e devolve seus registros."""
+    soup = _parse_html(html, parser, so_tabela)
+    return _extrair(TABELAS[etapa], soup, categoria, ano)
+
+
+def _requisicao_pagina(spec: TabelaSpec, subopcao: str | None,
+                       ano: int) -> _Requisicao:
+    if spec.metodo == "POST":
+        return _Requisicao(
+            "POST", f"{_BASE_URL}?opcao={spec.opcao}",
+            data={"subopcao": subopcao, "ano": str(ano)})
+    params = {"opcao": spec.opcao, "ano": str(ano)}
+    if subopcao:
+        params = {"opcao": spec.opcao,
+                  "subopcao": subopcao, "ano": str(ano)}
+    return _Requisicao("GET", _BASE_URL, params=params)
+
+
+# =====================< DOWNLOADS EM CSV >==========================
+
+# Nos CSVs, a coluna "control" dos subitens leva o prefixo do item
+# ("vm_Tinto", "ti_Alicante Bouschet"); a dos itens é o próprio nome
+_SUBITEM_CSV = re.compile(r"^[a-z]+_")
+
+
+def _formatar_numero_csv(texto: str) -> str:
+    """
+    Número do CSV ("159405566") no formato das páginas ("159.405.566",
+    "-" para zero), para passar pelos mesmos conversores do HTML.
+    """
+    texto = texto.strip()
+    if not texto.isdigit():
+        return texto
+    numero = int(texto)
+    return f"{numero:,}".replace(",", ".") if numero else "-"
+
+
+def _linhas_resposta(resp):
+    with resp:
+        for bruta in resp.iter_lines():
+            if not bruta:
+                continue
+            try:
+                yield bruta.decode("utf-8-sig")
+            except UnicodeDecodeError:
+                yield bruta.decode("latin-1")
+
+
+def _abrir_csv(arquivo: str):
+    """
+    Abre um CSV de download do site em streaming (respeitando o limite
+    por host). Retorna um iterador sobre as linhas de texto, ou None em
+    caso de erro HTTP/rede.
+    """
+    url = _DOWNLOAD_URL + arquivo
+    _limitador.aguardar(urlsplit(url).netloc)
+    logger.info(f"[GET] {url}")
+    try:
+        resp = _sessao().get(url, stream=True, timeout=REQUEST_TIMEOUT)
+        resp.raise_for_status()
+    except requests.exceptions.RequestException as err:
+        logger.error(f"[HTTP ERROR] GET {url}: {err}")
+        return None
+    return _linhas_resposta(resp)
+
+
+def _linhas_csv(spec: TabelaSpec, linhas, anos) -> dict[int, list[tuple]]:
+    """
+    Lê um CSV de download (uma linha por produto/país e uma coluna por
+    ano; duas, quantidade e valor, nas abas de comércio exterior) linha a
+    linha, separando-o por ano no formato comum do motor. Só os `anos`
+    pedidos são guardados; anos ausentes do arquivo não aparecem no
+    resultado. O delimitador (";" ou tabulação) vem do cabeçalho.
+    """
+    linhas = iter(linhas)
+    primeira = next(linhas, None)
+    if primeira is None:
+        raise ValueError("CSV vazio")
+    delimitador = "\t" if "\t" in primeira else ";"
+    leitor = csv.reader(itertools.chain([primeira], linhas),
+                        delimiter=delimitador)
+
+    cabecalho = [celula.strip() for celula in next(leitor)]
+    indices = [i for i, celula in enumerate(cabecalho)
+               if len(celula) == 4 and celula.isdigit()]
+    if not indices:
+        raise ValueError("CSV sem colunas de ano")
+    coluna_nome = indices[0] - 1
+    if spec.hierarquica:
+        posicoes = [(int(cabecalho[i]), (i,)) for i in indices]
+    else:
+        posicoes = [(int(cabecalho[i]), (i, j))
+                    for i, j in zip(indices[::2], indices[1::2])]
+    anos = set(anos)
+    posicoes = [(ano, cols) for ano, cols in posicoes if ano in anos]
+    por_ano: dict[int, list[tuple]] = {ano: [] for ano, _ in posicoes}
+
+    for celulas in leitor:
+        if len(celulas) < len(cabecalho):
+            continue
+        nome = celulas[coluna_nome].strip()
+        if spec.hierarquica:
+            classe = ("tb_subitem"
+                      if _SUBITEM_CSV.match(celulas[coluna_nome - 1].strip())
+                      else "tb_item")
+            for ano, (i,) in posicoes:
+                por_ano[ano].append(
+                    (classe, nome, _formatar_numero_csv(celulas[i])))
+        else:
+            for ano, cols in posicoes:
+                por_ano[ano].append(
+                    (nome,) + tuple(_formatar_numero_csv(celulas[i])
+                                    for i in cols))
+
+    if spec.linha_total:
+        for linhas_ano in por_ano.values():
+            totais = [sum(_clean_number_string(celulas[i])
+                          for celulas in linhas_ano)
+                      for i in range(1, len(spec.colunas))]
+            linhas_ano.append(
+                ("Total",) + tuple(_formatar_numero_csv(str(t))
+                                   for t in totais))
+    return por_ano
+
+
+def extrair_csv(etapa: str, linhas, categoria: str | None,
+                anos) -> dict[int, list[dict]]:
+    """
+    Interpreta as linhas de um CSV de download da `etapa` e devolve
+    {ano: registros}, com os mesmos registros que as páginas de cada ano.
+    """
+    spec = TABELAS[etapa]
+    return {ano: _montar_registros(spec, linhas_ano, categoria, ano)
+            for ano, linhas_ano in _linhas_csv(spec, linhas, anos).items()}
+
+
+def _coletar_csv(spec: TabelaSpec, categorias: list, anos: list,
+                 max_workers: int | None = None) -> dict:
+    """
+    Baixa (em paralelo) o CSV de cada categoria e devolve os registros
+    por (categoria, ano). Arquivos que falharem ficam de fora.
+    """
+    def baixar(categoria):
+        arquivo = spec.arquivos_csv.get(categoria)
+        linhas = _abrir_csv(arquivo) if arquivo else None
+        if linhas is None:
+            return {}
+        try:
+            registros = extrair_csv(spec.etapa, linhas, categoria, anos)
+        except (ValueError, csv.Error,
+                requests.exceptions.RequestException) as erro:
+            logger.error(f"[{spec.etapa}] Erro no CSV {arquivo}: {erro}")
+            return {}
+        return {(categoria, ano): regs for ano, regs in registros.items()}
+
+    coletados = {}
+    for parcial in _em_paralelo(baixar, categorias, max_workers):
+        coletados.update(parcial)
+    return coletados
+
+
+def coletar_paginas(etapa: str, anos, max_workers: int | None = None,
+                    fonte: str | None = None,
+                    categorias=None) -> list[PaginaColetada]:
+    """
+    Busca (em paralelo) e interpreta todas as páginas da `etapa` para os
+    `anos` informados, uma por (categoria, ano). A lista volta sempre na
+    ordem de paginação da aba, independente da ordem de chegada.
+
+    Com `fonte="csv"` (padrão: SCRAPER_FONTE), os registros vêm dos
+    arquivos de download da aba; só as páginas que eles não cobrirem
+    (arquivo indisponível ou ano ainda não publicado) são buscadas no HTML.
+
+    `categorias` restringe a busca a essas subopções da aba (None = todas);
+    é ignorado nas abas sem subopções.
+
+    Com SCRAPER_MOTOR="async" a coleta roda num event loop próprio nesta
+    thread (services.scraper_async.coletar_paginas_async), com bem mais
+    requisições em voo do que threads.
+    """
+    if SCRAPER_MOTOR == "async":
+        # import tardio: scraper_async depende deste módulo
+        from services.scraper_async import coletar_paginas_async
+        return asyncio.run(coletar_paginas_async(
+            etapa, anos, fonte, categorias))
+
+    fonte, spec, categorias, anos, combinacoes = _planejar_coleta(
+        etapa, anos, fonte, categorias)
+
+    registros = {}
+    if fonte == "csv" and spec.arquivos_csv and combinacoes:
+        registros = _coletar_csv(
+            spec, [categoria for categoria, _ in categorias], anos,
+            max_workers)
+    faltando = _fora_dos_csvs(etapa, fonte, combinacoes, registros)
+
+    htmls = _buscar_paginas(
+        [_requisicao_pagina(spec, subopcao, ano)
+         for _, subopcao, ano in faltando],
+        max_workers)
+    return _montar_coleta(etapa, combinacoes, faltando, htmls, registros)
+
+
+def _planejar_coleta(etapa: str, anos, fonte: str | None, categorias):
+    """
+    Valida os parâmetros de `coletar_paginas` e lista as páginas
+    (categoria, subopção, ano) na ordem de paginação da aba.
+    Retorna (fonte, spec, categorias, anos, combinações).
+    """
+    fonte = fonte or SCRAPER_FONTE
+    if fonte not in FONTES:
+        raise ValueError(f"Fonte desconhecida: {fonte}")
+    spec = TABELAS[etapa]
+    todas = categorias_da_etapa(etapa)
+    if categorias is not None and spec.subopcoes:
+        desconhecidas = set(categorias) - set(todas)
+        if desconhecidas:
+            raise ValueError(
+                f"Categorias desconhecidas em {etapa}: {sorted(desconhecidas)}")
+        categorias = [(c, s) for c, s in todas.items() if c in categorias]
+    else:
+        categorias = list(todas.items())
+    anos = list(anos)
+    if spec.ordem == "categoria":
+        combinacoes = [(categoria, subopcao, ano)
+                       for categoria, subopcao in categorias for ano in anos]
+    else:
+        combinacoes = [(categoria, subopcao, ano)
+                       for ano in anos for categoria, subopcao in categorias]
+    return fonte, spec, categorias, anos, combinacoes
+
+
+def _fora_dos_csvs(etapa: str, fonte: str, combinacoes: list,
+                   registros: dict) -> list:
+    """Páginas que os CSVs não cobriram e precisam ser buscadas no HTML."""
+    faltando = [c for c in combinacoes if (c[0], c[2]) not in registros]
+    if fonte == "csv" and faltando:
+        logger.warning(
+            f"[{etapa}] {len(faltando)} página(s) fora dos CSVs; "
+            f"buscando no HTML")
+    return faltando
+
+
+def _montar_coleta(etapa: str, combinacoes: list, faltando: list,
+                   htmls: list, registros: dict) -> list[PaginaColetada]:
+    """Interpreta os HTMLs buscados e monta as páginas na ordem da aba."""
+    for (categoria, subopcao, ano), html in zip(faltando, htmls):
+        registros[(categoria, ano)] = None
+        if html is not None:
             try:
-                r = session.get(base_url, params=params, timeout=10)
-                r.encoding = "utf-8"
-                soup = BeautifulSoup(r.text, "html.parser")
-                todos.extend(
-                    _extract_table_categorizada(
-                        soup, "Processamento", categoria_uva, ano
-                    )
-                )
+                registros[(categoria, ano)] = extrair_pagina(
+                    etapa, html, categoria, ano)
             except Exception as erro:
-                logger.error(
-                    f"[Processamento] Erro em ({categoria_uva} - {ano}): {erro}")
-                continue
+                logger.error(f"[{etapa}] Erro em ({categoria} - {ano}): {erro}")
+
+    return [PaginaColetada(etapa, categoria, subopcao, ano,
+                           registros[(categoria, ano)])
+            for categoria, subopcao, ano in combinacoes]
+
+
+def _get_dados(etapa, ano_inicio, ano_fim, max_workers=None,
+               fonte=None, categorias=None) -> list[dict]:
+    if SCRAPER_MOTOR == "async":
+        # fonte=scraper das rotas (routes.comum.do_scraper) no motor async
+        from services.scraper_async import get_dados_async
+        return asyncio.run(get_dados_async(
+            etapa, ano_inicio, ano_fim, fonte, categorias))
+    logger.info(f"Iniciando scraping de {etapa} ({ano_inicio}-{ano_fim})"
+                + (f" {list(categorias)}" if categorias is not None else ""))
+    all_data: list[dict] = []
+    for pagina in coletar_paginas(
+            etapa, range(ano_inicio, ano_fim + 1), max_workers, fonte,
+            categorias):
+        all_data.extend(pagina.registros or [])
+    logger.info(f"Scraping de {etapa} completo: {len(all_data)} registros")
+    return all_data
 
-    logger.info(f"Scraping de Processamento completo: {len(todos)} registros")
-    return todos
 
+# =====================< API PÚBLICA >================================
 
-def get_producao_data(ano_inicio: int = 1970, ano_fim: int = 2024) -> list[dict]:
+def get_processamento_data(ano_inicio=1970, ano_fim=2024, max_workers=None,
+                           fonte=None, categorias=None):
+    return _get_dados("Processamento", ano_inicio, ano_fim, max_workers,
+                      fonte, categorias)
+
+
+def get_producao_data(ano_inicio: int = 1970, ano_fim: int = 2024,
+                      max_workers: int | None = None,
+                      fonte: str | None = None,
+                      categorias=None) -> list[dict]:
     """
     Faz scraping dos dados da aba Produção entre ano_inicio e ano_fim.
     Retorna uma lista de dicionários:
@@ -153,47 +813,14 @@ def get_producao_data(ano_inicio: int = 1970, ano_fim: int = 2024) -> list[dict]
         ...
       ]
     """
-    all_data: list[dict] = []
-
-    for ano in range(ano_inicio, ano_fim + 1):
-        url = f"{_BASE_URL}?opcao=opt_02&ano={ano}"
-        soup = _safe_get(url)
-        if soup is None:
-            continue
-
-        current_categoria = None
-        rows = soup.select("table.tb_dados tbody tr")
-
-        for row in rows:
-            cols = row.find_all("td")
-            if len(cols) != 2:
-                continue
+    return _get_dados(
+        "Produção", ano_inicio, ano_fim, max_workers, fonte, categorias)
 
-            nome = cols[0].get_text(strip=True)
-            valor = cols[1].get_text(strip=True)
-
-            if "tb_item" in cols[0].get("class", []):
-                current_categoria = nome
-                all_data.append({
-                    "etapa": "Produção",
-                    "categoria_produto": current_categoria,
-                    "tipo_produto": "",
-                    "quantidade_l": "",
-                    "ano": ano
-                })
-            elif "tb_subitem" in cols[0].get("class", []):
-                all_data.append({
-                    "etapa": "Produção",
-                    "categoria_produto": current_categoria,
-                    "tipo_produto": nome,
-                    "quantidade_l": valor,
-                    "ano": ano
-                })
 
-    return all_data
-
-
-def get_comercializacao_data(ano_inicio: int = 1970, ano_fim: int = 2024) -> list[dict]:
+def get_comercializacao_data(ano_inicio: int = 1970, ano_fim: int = 2024,
+                             max_workers: int | None = None,
+                             fonte: str | None = None,
+                             categorias=None) -> list[dict]:
     """
     Faz scraping dos dados da aba Comercialização entre ano_inicio e ano_fim.
     Retorna uma lista de dicionários:
@@ -208,149 +835,18 @@ def get_comercializacao_data(ano_inicio: int = 1970, ano_fim: int = 2024) -> lis
         ...
       ]
     """
-    all_data: list[dict] = []
-
-    for ano in range(ano_inicio, ano_fim + 1):
-        url = f"{_BASE_URL}?opcao=opt_04&ano={ano}"
-        soup = _safe_get(url)
-        if soup is None:
-            continue
-
-        current_categoria = None
-        rows = soup.select("table.tb_dados tbody tr")
-
-        for row in rows:
-            cols = row.find_all("td")
-            if len(cols) != 2:
-                continue
-
-            nome = cols[0].get_text(strip=True)
-            valor = cols[1].get_text(strip=True)
-
-            if "tb_item" in cols[0].get("class", []):
-                current_categoria = nome
-                all_data.append({
-                    "etapa": "Comercialização",
-                    "categoria_produto": current_categoria,
-                    "produto": "",
-                    "quantidade_l": "",
-                    "ano": ano
-                })
-            elif "tb_subitem" in cols[0].get("class", []):
-                all_data.append({
-                    "etapa": "Comercialização",
-                    "categoria_produto": current_categoria,
-                    "produto": nome,
-                    "quantidade_l": valor,
-                    "ano": ano
-                })
-
-    return all_data
-
-
-def get_importacao_data(ano_inicio=1970, ano_fim=2024):
-    logger.info(f"Iniciando scraping de Importação ({ano_inicio}-{ano_fim})")
-    BASE_URL = f"{_BASE_URL}?opcao=opt_05"
-    CATEGORIAS = _IMPORT_CATEGORIES
-    session = requests.Session()
-    all_data = []
+    return _get_dados(
+        "Comercialização", ano_inicio, ano_fim, max_workers, fonte,
+        categorias)
 
-    for categoria_nome, subopcao in CATEGORIAS.items():
-        for ano in range(ano_inicio, ano_fim + 1):
-            try:
-                logger.info(
-                    f"[Importação] solicitando ano={ano}, categoria={categoria_nome}")
-                response = session.post(
-                    BASE_URL,
-                    data={"subopcao": subopcao, "ano": str(ano)},
-                    timeout=10
-                )
-                if response.status_code != 200:
-                    continue
-
-                soup = BeautifulSoup(response.text, "html.parser")
-                table = soup.find("table", class_="tb_dados")
-                if not table:
-                    continue
-
-                rows = table.find_all("tr")[1:]
-                for row in rows:
-                    cols = row.find_all("td")
-                    if len(cols) != 3:
-                        continue
-                    pais = cols[0].text.strip()
-                    quantidade = cols[1].text.strip().replace(
-                        ".", "").replace("-", "0")
-                    valor = cols[2].text.strip().replace(
-                        ".", "").replace("-", "0")
-
-                    all_data.append({
-                        "etapa": "Importação",
-                        "categoria_produto": categoria_nome,
-                        "ano": ano,
-                        "pais": pais,
-                        "quantidade_kg": int(quantidade) if quantidade.isdigit() else 0,
-                        "valor_usd": int(valor) if valor.isdigit() else 0
-                    })
-
-            except Exception as e:
-                logger.error(
-                    f"[Importação] Erro em ({categoria_nome} - {ano}): {e}")
-                continue
 
-    logger.info(f"Scraping de Importação completo: {len(all_data)} registros")
-    return all_data
+def get_importacao_data(ano_inicio=1970, ano_fim=2024, max_workers=None,
+                        fonte=None, categorias=None):
+    return _get_dados("Importação", ano_inicio, ano_fim, max_workers, fonte,
+                      categorias)
 
 
-def get_exportacao_data(ano_inicio=1970, ano_fim=2024):
-    logger.info(f"Iniciando scraping de Exportação ({ano_inicio}-{ano_fim})")
-    BASE_URL = f"{_BASE_URL}?opcao=opt_06"
-    CATEGORIAS = _EXPORT_CATEGORIES
-    session = requests.Session()
-    all_data = []
-
-    for categoria_nome, subopcao in CATEGORIAS.items():
-        for ano in range(ano_inicio, ano_fim + 1):
-            try:
-                logger.info(
-                    f"[Exportação] solicitando ano={ano}, categoria={categoria_nome}")
-                response = session.post(
-                    BASE_URL,
-                    data={"subopcao": subopcao, "ano": str(ano)},
-                    timeout=10
-                )
-                if response.status_code != 200:
-                    continue
-
-                soup = BeautifulSoup(response.text, "html.parser")
-                table = soup.find("table", class_="tb_dados")
-                if not table:
-                    continue
-
-                rows = table.find_all("tr")[1:]
-                for row in rows:
-                    cols = row.find_all("td")
-                    if len(cols) != 3:
-                        continue
-                    pais = cols[0].text.strip()
-                    quantidade = cols[1].text.strip().replace(
-                        ".", "").replace("-", "0")
-                    valor = cols[2].text.strip().replace(
-                        ".", "").replace("-", "0")
-
-                    all_data.append({
-                        "etapa": "Exportação",
-                        "categoria_produto": categoria_nome,
-                        "ano": ano,
-                        "pais": pais,
-                        "quantidade_kg": int(quantidade) if quantidade.isdigit() else 0,
-                        "valor_usd": int(valor) if valor.isdigit() else 0
-                    })
-
-            except Exception as e:
-                logger.error(
-                    f"[Exportação] Erro em ({categoria_nome} - {ano}): {e}")
-                continue
-
-    logger.info(f"Scraping de Exportação completo: {len(all_data)} registros")
-    return all_data
+def get_exportacao_data(ano_inicio=1970, ano_fim=2024, max_workers=None,
+                        fonte=None, categorias=None):
+    return _get_dados("Exportação", ano_inicio, ano_fim, max_workers, fonte,
+                      categorias)
@@ -0,0 +1,152 @@
+# services/scraper_async.py
+
+import asyncio
+import contextlib
+import os
+from urllib.parse import urlsplit
+
+import httpx
+
+from logging_config import logger
+from services import scraper
+from services.scraper import (
+    HTTP_HEADERS,
+    REQUEST_TIMEOUT,
+    PaginaColetada,
+    _Requisicao,
+    _coletar_csv,
+    _fora_dos_csvs,
+    _montar_coleta,
+    _planejar_coleta,
+    _requisicao_pagina
+)
+
+# =============< CONFIGURAÇÕES GERAIS >===============================
+
+# Máximo de requisições ao site em voo ao mesmo tempo (por coleta)
+SCRAPER_ASYNC_CONCORRENCIA = int(os.getenv("SCRAPER_ASYNC_CONCORRENCIA", "100"))
+
+
+# =====================< BUSCA ASSÍNCRONA >===========================
+
+async def _baixar_html(cliente: httpx.AsyncClient,
+                       req: _Requisicao) -> str | None:
+    """Equivalente assíncrono de scraper._baixar_html."""
+    espera = scraper._limitador.reservar(urlsplit(req.url).netloc)
+    if espera > 0:
+        await asyncio.sleep(espera)
+    logger.info(
+        f"[{req.metodo}] {req.url} | params={req.params} data={req.data}")
+    try:
+        resp = await cliente.request(req.metodo, req.url, params=req.params,
+                                     data=req.data)
+        resp.raise_for_status()
+        # o site não declara charset; sem isso o texto sairia em latin-1
+        if "charset" not in resp.headers.get("Content-Type", "").lower():
+            resp.encoding = "utf-8"
+        return resp.text
+    except httpx.HTTPError as err:
+        logger.error(
+            f"[HTTP ERROR] {req.metodo} {req.url} with "
+            f"params={req.params} data={req.data}: {err}")
+        return None
+
+
+@contextlib.asynccontextmanager
+async def _travado(trava):
+    """
+    Segura uma trava entre processos (flock, bloqueante) tomando-a e
+    liberando-a numa thread, sem parar o event loop enquanto espera.
+    """
+    await asyncio.to_thread(trava.__enter__)
+    try:
+        yield
+    finally:
+        await asyncio.to_thread(trava.__exit__, None, None, None)
+
+
+async def _buscar_html(cliente: httpx.AsyncClient, semaforo: asyncio.Semaphore,
+                       req: _Requisicao) -> str | None:
+    """
+    Busca uma página pelo cache em disco (lido e gravado fora do event
+    loop), com no máximo `semaforo` downloads simultâneos. Como no
+    scraper síncrono, a trava por página faz com que só um worker do host
+    a busque no site.
+    """
+    if scraper._cache_paginas is None:
+        async with semaforo:
+            return await _baixar_html(cliente, req)
+
+    chave, cacheada = await asyncio.to_thread(scraper._ler_cache, req)
+    if cacheada is not None and cacheada.fresca:
+        return cacheada.html
+    async with _travado(scraper._cache_paginas.trava(chave)):
+        # outro worker pode ter buscado a página enquanto esperávamos
+        chave, cacheada = await asyncio.to_thread(scraper._ler_cache, req)
+        if cacheada is not None and cacheada.fresca:
+            return cacheada.html
+        async with semaforo:
+            html = await _baixar_html(cliente, req)
+        return await asyncio.to_thread(
+            scraper._resultado_do_download, chave, cacheada, html)
+
+
+async def buscar_paginas_async(requisicoes: list[_Requisicao],
+                               concorrencia: int | None = None
+                               ) -> list[str | None]:
+    """
+    Busca as páginas concorrentemente num único event loop, com até
+    `concorrencia` (padrão: SCRAPER_ASYNC_CONCORRENCIA) requisições em
+    voo e o mesmo limite por host do scraper síncrono. O resultado segue
+    a ordem de `requisicoes`.
+    """
+    concorrencia = concorrencia or SCRAPER_ASYNC_CONCORRENCIA
+    semaforo = asyncio.Semaphore(concorrencia)
+    limites = httpx.Limits(max_connections=concorrencia,
+                           max_keepalive_connections=concorrencia)
+    async with httpx.AsyncClient(headers=HTTP_HEADERS, limits=limites,
+                                 timeout=REQUEST_TIMEOUT) as cliente:
+        return await asyncio.gather(
+            *(_buscar_html(cliente, semaforo, req) for req in requisicoes))
+
+
+# =====================< API PÚBLICA >================================
+
+async def coletar_paginas_async(etapa: str, anos, fonte: str | None = None,
+                                categorias=None,
+                                concorrencia: int | None = None
+                                ) -> list[PaginaColetada]:
+    """
+    Versão assíncrona de scraper.coletar_paginas, com o mesmo resultado.
+    Os CSVs (poucos arquivos grandes) e o parse do HTML, que ocupam CPU,
+    rodam em threads para não travar o event loop.
+    """
+    fonte, spec, categorias, anos, combinacoes = _planejar_coleta(
+        etapa, anos, fonte, categorias)
+
+    registros = {}
+    if fonte == "csv" and spec.arquivos_csv and combinacoes:
+        registros = await asyncio.to_thread(
+            _coletar_csv, spec, [categoria for categoria, _ in categorias],
+            anos)
+    faltando = _fora_dos_csvs(etapa, fonte, combinacoes, registros)
+
+    htmls = await buscar_paginas_async(
+        [_requisicao_pagina(spec, subopcao, ano)
+         for _, subopcao, ano in faltando],
+        concorrencia)
+    return await asyncio.to_thread(
+        _montar_coleta, etapa, combinacoes, faltando, htmls, registros)
+
+
+async def get_dados_async(etapa: str, ano_inicio: int = 1970,
+                          ano_fim: int = 2024, fonte: str | None = None,
+                          categorias=None) -> list[dict]:
+    """Equivalente assíncrono das funções get_*_data do scraper."""
+    paginas = await coletar_paginas_async(
+        etapa, range(ano_inicio, ano_fim + 1), fonte, categorias)
+    dados = [registro for pagina in paginas
+             for registro in pagina.registros or []]
+    logger.info(f"Scraping assíncrono de {etapa} completo: "
+                f"{len(dados)} registros")
+    return dados
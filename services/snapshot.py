@@ -0,0 +1,394 @@
+# services/snapshot.py
+
+import array
+import atexit
+import json
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import zlib
+from datetime import datetime, timezone
+
+from sqlalchemy import DateTime, Integer, func
+
+from config import BaseConfig
+from logging_config import logger
+from models.agregado import Agregado
+from models.balanca import BalancaComercial
+from models.cultivar import Cultivar
+from models.database import SessionLocal
+from models.sincronizacao import EstadoSincronizacao
+from services.agregacao import atualizar_agregados
+from services.balanca import atualizar_balanca
+from services.versao import (
+    Versao,
+    esquecer_versao,
+    gravar_versao,
+    incrementar_versao,
+    ler_versao
+)
+
+try:
+    import fcntl
+except ImportError:  # Windows: a cópia temporária não é removida
+    fcntl = None
+
+# =============< CONFIGURAÇÕES GERAIS >===============================
+
+# Snapshot carregado na inicialização quando o banco está vazio ("" desliga)
+SNAPSHOT_PATH = BaseConfig.SNAPSHOT_PATH
+
+# Linhas por INSERT ao carregar um snapshot
+SNAPSHOT_LOTE = int(os.getenv("SNAPSHOT_LOTE", "5000"))
+
+# Versão do formato do arquivo (muda quando o layout muda)
+FORMATO_SNAPSHOT = 1
+
+# Tabelas gravadas, na ordem de carga. O estado da sincronização vai junto
+# para que uma instância que subiu do snapshot sincronize só o que mudou;
+# agregados e balança, para não precisarem ser recalculados na carga
+_TABELAS = (Cultivar, EstadoSincronizacao, Agregado, BalancaComercial)
+
+# mágico, formato, reservado, tamanho do cabeçalho comprimido
+_PREAMBULO = struct.Struct("<8sHHI")
+_MAGICO = b"EMBRSNAP"
+
+# inteiro nulo nas colunas inteiras (int64)
+_NULO = -(2 ** 63)
+
+
+class SnapshotInvalido(ValueError):
+    """O arquivo não é um snapshot ou é de um formato não suportado."""
+
+
+# =====================< CODIFICAÇÃO DAS COLUNAS >====================
+#
+# Layout do arquivo:
+#   preâmbulo | cabeçalho (JSON, zlib) | blocos (zlib)
+# O cabeçalho descreve cada tabela e coluna e onde estão seus blocos
+# (deslocamento a partir do fim do cabeçalho, tamanho). Colunas inteiras
+# são um bloco de int64; as demais são codificadas por dicionário: um
+# bloco com os valores distintos (JSON) e um com os códigos (uint8/16/32).
+# Tudo little-endian.
+
+def _tipo(coluna) -> str:
+    if isinstance(coluna.type, Integer):
+        return "inteiro"
+    if isinstance(coluna.type, DateTime):
+        return "data"
+    return "texto"
+
+
+def _little_endian(valores: array.array) -> array.array:
+    if sys.byteorder == "big":
+        valores.byteswap()
+    return valores
+
+
+def _codificar(tipo: str, valores) -> tuple[dict, list[bytes]]:
+    """(metadados extras, partes) de uma coluna."""
+    if tipo == "inteiro":
+        inteiros = array.array("q", (_NULO if v is None else v
+                                     for v in valores))
+        return {}, [_little_endian(inteiros).tobytes()]
+
+    if tipo == "data":
+        valores = [None if v is None else v.isoformat() for v in valores]
+    dicionario: dict = {}
+    codigos = [dicionario.setdefault(v, len(dicionario)) for v in valores]
+    largura = ("B" if len(dicionario) <= 0xFF
+               else "H" if len(dicionario) <= 0xFFFF else "I")
+    return {"largura": largura}, [
+        json.dumps(list(dicionario), ensure_ascii=False).encode(),
+        _little_endian(array.array(largura, codigos)).tobytes(),
+    ]
+
+
+def _decodificar(coluna: dict, partes: list[bytes]) -> list:
+    if coluna["tipo"] == "inteiro":
+        inteiros = array.array("q")
+        inteiros.frombytes(partes[0])
+        return [None if v == _NULO else v for v in _little_endian(inteiros)]
+
+    dicionario = json.loads(partes[0])
+    if coluna["tipo"] == "data":
+        dicionario = [None if v is None else datetime.fromisoformat(v)
+                      for v in dicionario]
+    codigos = array.array(coluna["largura"])
+    codigos.frombytes(partes[1])
+    return [dicionario[c] for c in _little_endian(codigos)]
+
+
+# =====================< GRAVAÇÃO >===================================
+
+def gerar_snapshot(session, caminho: str) -> dict:
+    """
+    Grava em `caminho` um snapshot das cinco etapas (tabela `cultivares`),
+    do estado da sincronização, dos agregados, da balança e da versão dos
+    dados, em colunas comprimidas. O arquivo é escrito ao lado e renomeado
+    no fim, então quem o lê nunca vê um snapshot pela metade. Retorna o
+    cabeçalho.
+    """
+    versao = ler_versao(session)
+    etapas = dict(session.query(Cultivar.etapa, func.count(Cultivar.id))
+                  .group_by(Cultivar.etapa).order_by(Cultivar.etapa))
+    tabelas = {}
+    blocos = []
+    posicao = 0
+
+    for modelo in _TABELAS:
+        colunas = list(modelo.__table__.columns)
+        linhas = session.query(*colunas).order_by(modelo.id).all()
+        valores = list(zip(*linhas)) or [()] * len(colunas)
+        descricao = []
+        for coluna, valores_coluna in zip(colunas, valores):
+            tipo = _tipo(coluna)
+            extras, partes = _codificar(tipo, valores_coluna)
+            posicoes = []
+            for parte in partes:
+                bloco = zlib.compress(parte)
+                posicoes.append([posicao, len(bloco)])
+                blocos.append(bloco)
+                posicao += len(bloco)
+            descricao.append({"nome": coluna.name, "tipo": tipo, **extras,
+                              "blocos": posicoes})
+        tabelas[modelo.__tablename__] = {"linhas": len(linhas),
+                                         "colunas": descricao}
+
+    cabecalho = {
+        "formato": FORMATO_SNAPSHOT,
+        "gerado_em": datetime.now(timezone.utc).isoformat(),
+        "versao": None if versao is None else {
+            "numero": versao.numero,
+            "atualizado_em": versao.atualizado_em.isoformat(),
+        },
+        "etapas": etapas,
+        "tabelas": tabelas,
+    }
+    comprimido = zlib.compress(
+        json.dumps(cabecalho, ensure_ascii=False).encode(), 9)
+
+    pasta = os.path.dirname(os.path.abspath(caminho))
+    os.makedirs(pasta, exist_ok=True)
+    fd, temporario = tempfile.mkstemp(dir=pasta, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as saida:
+            saida.write(_PREAMBULO.pack(
+                _MAGICO, FORMATO_SNAPSHOT, 0, len(comprimido)))
+            saida.write(comprimido)
+            for bloco in blocos:
+                saida.write(bloco)
+        os.replace(temporario, caminho)
+    except BaseException:
+        os.remove(temporario)
+        raise
+
+    logger.info(f"[Snapshot] {caminho}: {sum(etapas.values())} registros, "
+                f"{os.path.getsize(caminho)} bytes")
+    return cabecalho
+
+
+# =====================< LEITURA >====================================
+
+class Snapshot:
+    """
+    Snapshot aberto com mmap somente leitura: só o cabeçalho é lido ao
+    abrir; cada coluna é descomprimida direto do mapeamento quando pedida.
+    """
+
+    def __init__(self, caminho: str):
+        self.caminho = caminho
+        with open(caminho, "rb") as arquivo:
+            try:
+                self._mapa = mmap.mmap(arquivo.fileno(), 0,
+                                       access=mmap.ACCESS_READ)
+            except ValueError as erro:  # arquivo vazio
+                raise SnapshotInvalido(f"{caminho}: arquivo vazio") from erro
+        try:
+            self.cabecalho = self._ler_cabecalho()
+        except Exception:
+            self._mapa.close()
+            raise
+
+    def _ler_cabecalho(self) -> dict:
+        if len(self._mapa) < _PREAMBULO.size:
+            raise SnapshotInvalido(f"{self.caminho}: não é um snapshot")
+        magico, formato, _, tamanho = _PREAMBULO.unpack_from(self._mapa)
+        if magico != _MAGICO:
+            raise SnapshotInvalido(f"{self.caminho}: não é um snapshot")
+        if formato != FORMATO_SNAPSHOT:
+            raise SnapshotInvalido(
+                f"{self.caminho}: formato {formato} não suportado "
+                f"(esperado {FORMATO_SNAPSHOT})")
+        self._inicio_blocos = _PREAMBULO.size + tamanho
+        try:
+            return json.loads(zlib.decompress(
+                self._mapa[_PREAMBULO.size:self._inicio_blocos]))
+        except (zlib.error, ValueError) as erro:
+            raise SnapshotInvalido(
+                f"{self.caminho}: cabeçalho corrompido") from erro
+
+    @property
+    def versao(self) -> Versao | None:
+        versao = self.cabecalho["versao"]
+        if versao is None:
+            return None
+        return Versao(versao["numero"],
+                      datetime.fromisoformat(versao["atualizado_em"]))
+
+    @property
+    def tabelas(self) -> dict:
+        return self.cabecalho["tabelas"]
+
+    def _bloco(self, deslocamento: int, tamanho: int) -> bytes:
+        inicio = self._inicio_blocos + deslocamento
+        return zlib.decompress(self._mapa[inicio:inicio + tamanho])
+
+    def colunas(self, tabela: str) -> dict[str, list]:
+        """{coluna: valores} de uma tabela do snapshot."""
+        return {
+            coluna["nome"]: _decodificar(
+                coluna, [self._bloco(*bloco) for bloco in coluna["blocos"]])
+            for coluna in self.tabelas[tabela]["colunas"]
+        }
+
+    def linhas(self, tabela: str, nomes=None):
+        """Linhas da tabela como dicts (só as colunas em `nomes`, se dado)."""
+        colunas = self.colunas(tabela)
+        if nomes is not None:
+            colunas = {n: v for n, v in colunas.items() if n in nomes}
+        for valores in zip(*colunas.values()):
+            yield dict(zip(colunas, valores))
+
+    def fechar(self):
+        self._mapa.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.fechar()
+
+
+# =====================< CARGA >======================================
+
+def carregar_snapshot(session, caminho: str, confirmar: bool = True) -> dict:
+    """
+    Insere o conteúdo do snapshot no banco (que deve estar vazio) e grava
+    a versão dos dados do snapshot (mesmos ETags da instância que o
+    gerou). Agregados e balança só são recalculados se vierem vazios no
+    snapshot. Com `confirmar=False` o commit fica para quem chamou.
+    Retorna quantas linhas entraram por tabela.
+    """
+    inseridas = {}
+    with Snapshot(caminho) as snapshot:
+        for modelo in _TABELAS:
+            nome = modelo.__tablename__
+            if nome not in snapshot.tabelas:
+                continue
+            # INSERT do Core (executemany), sem o custo do ORM por linha
+            tabela = modelo.__table__
+            lote = []
+            inseridas[nome] = 0
+            for linha in snapshot.linhas(nome, tabela.columns.keys()):
+                lote.append(linha)
+                if len(lote) >= SNAPSHOT_LOTE:
+                    session.execute(tabela.insert(), lote)
+                    inseridas[nome] += len(lote)
+                    lote = []
+            if lote:
+                session.execute(tabela.insert(), lote)
+                inseridas[nome] += len(lote)
+        versao = snapshot.versao
+
+    if versao is None:
+        incrementar_versao(session, confirmar=False)
+    else:
+        gravar_versao(session, versao, confirmar=False)
+    if not inseridas.get(Agregado.__tablename__):
+        atualizar_agregados(session, confirmar=False)
+    if not inseridas.get(BalancaComercial.__tablename__):
+        atualizar_balanca(session, confirmar=False)
+    if confirmar:
+        session.commit()
+        esquecer_versao()
+    else:
+        session.flush()
+    logger.info(f"[Snapshot] {caminho} carregado: {inseridas}")
+    return inseridas
+
+
+# =====================< BANCO TEMPORÁRIO >===========================
+#
+# Sem DATABASE_URL o snapshot é carregado num SQLite temporário
+# (config.caminho_banco_do_snapshot), um por snapshot e não por processo.
+# Cada processo que o usa segura uma trava compartilhada num arquivo ao
+# lado; ao sair, quem conseguir a trava exclusiva (ninguém mais usando)
+# remove a cópia.
+
+# Arquivo da trava de uso deste processo (aberto até a saída)
+_uso_do_banco = None
+
+
+def reservar_banco_temporario(caminho: str = BaseConfig.BANCO_DO_SNAPSHOT):
+    """
+    Registra este processo como usuário da cópia temporária em `caminho`
+    e agenda para a saída a remoção dela, se for o último a usá-la. Não
+    faz nada sem cópia temporária (DATABASE_URL definido) ou sem fcntl.
+    """
+    global _uso_do_banco
+    if not caminho or fcntl is None or _uso_do_banco is not None:
+        return
+    trava = caminho + ".uso"
+    while True:
+        uso = open(trava, "a")
+        fcntl.flock(uso, fcntl.LOCK_SH)
+        # quem saiu por último pode ter removido o arquivo enquanto
+        # esperávamos: nesse caso a trava é refeita num arquivo novo
+        try:
+            if os.stat(trava).st_ino == os.fstat(uso.fileno()).st_ino:
+                break
+        except FileNotFoundError:
+            pass
+        uso.close()
+    _uso_do_banco = uso
+    atexit.register(_liberar_banco_temporario, caminho)
+
+
+def _liberar_banco_temporario(caminho: str):
+    global _uso_do_banco
+    if _uso_do_banco is None:
+        return
+    _uso_do_banco.close()  # solta a trava compartilhada
+    _uso_do_banco = None
+    with open(caminho + ".uso", "a") as uso:
+        try:
+            fcntl.flock(uso, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            return  # outro processo ainda usa a cópia
+        for sufixo in ("", "-wal", "-shm", "-journal", ".uso"):
+            try:
+                os.remove(caminho + sufixo)
+            except FileNotFoundError:
+                pass
+    logger.info(f"[Snapshot] cópia temporária {caminho} removida")
+
+
+def carregar_se_vazio(caminho: str = SNAPSHOT_PATH) -> dict | None:
+    """
+    Carrega o snapshot se a tabela `cultivares` estiver vazia (usado na
+    inicialização do app). Retorna None quando o banco já tinha dados.
+    """
+    session = SessionLocal()
+    try:
+        if session.query(Cultivar.id).first() is not None:
+            logger.info("[Snapshot] banco já populado; snapshot ignorado")
+            return None
+        return carregar_snapshot(session, caminho)
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        session.close()
@@ -0,0 +1,134 @@
+# services/versao.py
+
+import hashlib
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from typing import NamedTuple
+
+from sqlalchemy import func
+
+from models.database import SessionLocal
+from models.cultivar import Cultivar
+from models.sincronizacao import EstadoSincronizacao
+from models.versao import VersaoDataset
+
+# =============< CONFIGURAÇÕES GERAIS >===============================
+
+# Por quanto tempo (segundos) cada processo reaproveita a versão lida do
+# banco: dentro dessa janela um 304 não consulta o banco
+VERSAO_CACHE_TTL = float(os.getenv("VERSAO_CACHE_TTL", "30"))
+
+
+class Versao(NamedTuple):
+    numero: int
+    atualizado_em: datetime  # UTC, sem tzinfo (como gravado no banco)
+
+
+# =====================< VERSÃO DO DATASET >==========================
+
+def ler_versao(session) -> Versao | None:
+    """Versão gravada no banco (None se nenhuma carga a registrou)."""
+    linha = session.query(VersaoDataset).order_by(VersaoDataset.id).first()
+    return Versao(linha.numero, linha.atualizado_em) if linha else None
+
+
+def incrementar_versao(session, confirmar: bool = True) -> Versao:
+    """
+    Registra uma nova versão dos dados (chamado pelo populate_db). Com
+    `confirmar=False` a versão só vale quando quem chamou fizer o commit
+    (e chamar `esquecer_versao`).
+    """
+    agora = datetime.now(timezone.utc).replace(tzinfo=None, microsecond=0)
+    atual = ler_versao(session)
+    numero = (atual.numero if atual else 0) + 1
+    return gravar_versao(session, Versao(numero, agora), confirmar)
+
+
+def gravar_versao(session, versao: Versao, confirmar: bool = True) -> Versao:
+    """
+    Grava uma versão já conhecida (ex.: a de um snapshot, para os ETags
+    coincidirem com os da instância que o gerou).
+    """
+    linha = session.query(VersaoDataset).order_by(VersaoDataset.id).first()
+    if linha is None:
+        linha = VersaoDataset()
+        session.add(linha)
+    linha.numero, linha.atualizado_em = versao
+    if confirmar:
+        session.commit()
+        esquecer_versao()
+    else:
+        session.flush()
+    return versao
+
+
+_versao_lock = threading.Lock()
+_versao_em_cache: tuple[float, Versao | None] | None = None
+
+
+def versao_atual() -> Versao | None:
+    """
+    Versão dos dados, relida do banco no máximo a cada VERSAO_CACHE_TTL
+    segundos por processo.
+    """
+    global _versao_em_cache
+    with _versao_lock:
+        if _versao_em_cache is not None \
+                and time.monotonic() - _versao_em_cache[0] < VERSAO_CACHE_TTL:
+            return _versao_em_cache[1]
+    session = SessionLocal()
+    try:
+        versao = ler_versao(session)
+    finally:
+        session.close()
+    with _versao_lock:
+        _versao_em_cache = (time.monotonic(), versao)
+    return versao
+
+
+def esquecer_versao():
+    """Descarta a versão em cache (a próxima leitura vai ao banco)."""
+    global _versao_em_cache
+    with _versao_lock:
+        _versao_em_cache = None
+
+
+# =====================< VERSÃO POR ETAPA >===========================
+
+
+def versao_etapa(session, etapa: str) -> str:
+    """
+    Impressão digital do conteúdo de uma etapa na tabela `cultivares`.
+    Combina contagem e faixa de ids (mudam a cada inserção/remoção) com
+    os hashes de conteúdo do `estado_sincronizacao` (mudam quando uma
+    página é substituída, mesmo que os ids sejam reaproveitados).
+    """
+    total, menor, maior = session.query(
+        func.count(Cultivar.id), func.min(Cultivar.id), func.max(Cultivar.id)
+    ).filter(Cultivar.etapa == etapa).one()
+
+    digest = hashlib.sha256(f"{etapa}:{total}:{menor}:{maior}".encode())
+    estados = session.query(
+        EstadoSincronizacao.subopcao, EstadoSincronizacao.ano,
+        EstadoSincronizacao.hash_conteudo,
+    ).filter(EstadoSincronizacao.etapa == etapa).order_by(
+        EstadoSincronizacao.subopcao, EstadoSincronizacao.ano)
+    for subopcao, ano, hash_conteudo in estados:
+        digest.update(f"|{subopcao}:{ano}:{hash_conteudo}".encode())
+    return digest.hexdigest()[:16]
+
+
+def chave_de_versao(session, etapa: str) -> str:
+    """
+    Chave de cache de resultados derivados de uma etapa (arquivos
+    exportados, séries): o número da versão dos dados (`versao_atual`,
+    que não consulta o banco dentro de VERSAO_CACHE_TTL). Sem versão
+    registrada (banco populado por fora do populate_db), cai na
+    impressão digital `versao_etapa`.
+    """
+    versao = versao_atual()
+    if versao is None:
+        return versao_etapa(session, etapa)
+    return f"v{versao.numero}"
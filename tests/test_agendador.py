@@ -0,0 +1,149 @@
+# tests/test_agendador.py
+
+import threading
+import time
+from datetime import date
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+import scripts.populate_db as populate_db
+import services.agendador as agendador
+import services.cache_dados as cache_dados
+import services.versao as versao
+from models.database import Base
+from models.cultivar import Cultivar
+from services.scraper import PaginaColetada, categorias_da_etapa
+from services.versao import ler_versao
+
+ANO_ATUAL = date.today().year
+
+
+@pytest.fixture
+def fabrica(tmp_path, monkeypatch):
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'agendador.db'}",
+        connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    fabrica = sessionmaker(bind=engine)
+    monkeypatch.setattr(agendador, "SessionLocal", fabrica)
+    monkeypatch.setattr(versao, "SessionLocal", fabrica)
+    versao.esquecer_versao()
+    yield fabrica
+    versao.esquecer_versao()
+    engine.dispose()
+
+
+@pytest.fixture
+def site_falso(monkeypatch):
+    def coletar(etapa, anos, max_workers=None, fonte=None, categorias=None):
+        return [
+            PaginaColetada(etapa, categoria, subopcao, ano, [{
+                "etapa": etapa, "categoria_produto": categoria, "ano": ano,
+                "pais": "Chile", "quantidade_kg": 1, "valor_usd": 100,
+            }])
+            for categoria, subopcao in categorias_da_etapa(etapa).items()
+            for ano in anos
+        ]
+
+    def coletar_pendentes(session, **kwargs):
+        return populate_db.coletar_pendentes(
+            session, etapas=["Importação", "Exportação"],
+            ano_inicio=ANO_ATUAL - 1, **kwargs)
+
+    monkeypatch.setattr(populate_db, "coletar_paginas", coletar)
+    monkeypatch.setattr(agendador, "coletar_pendentes", coletar_pendentes)
+    return coletar
+
+
+def test_atualizacao_grava_dados_e_nova_versao(fabrica, site_falso):
+    resumo = agendador.atualizar_dados()
+    assert resumo["Importação"]["alteradas"] > 0
+
+    session = fabrica()
+    assert session.query(Cultivar).count() == sum(
+        contagem["inseridos"] for contagem in resumo.values())
+    assert ler_versao(session).numero == 1
+    assert versao.versao_atual().numero == 1
+    session.close()
+
+
+def test_raspagem_nao_segura_transacao_aberta(
+        fabrica, site_falso, monkeypatch, tmp_path):
+    # enquanto o site é raspado, outro processo consegue gravar no banco
+    outro = create_engine(f"sqlite:///{tmp_path / 'agendador.db'}",
+                          connect_args={"timeout": 0.1})
+    gravou = []
+
+    def coletar(etapa, *args, **kwargs):
+        with outro.begin() as conexao:
+            conexao.execute(text("DELETE FROM versao_dataset"))
+        gravou.append(etapa)
+        return site_falso(etapa, *args, **kwargs)
+
+    monkeypatch.setattr(populate_db, "coletar_paginas", coletar)
+    resumo = agendador.atualizar_dados()
+    outro.dispose()
+    assert gravou == ["Importação", "Exportação"]
+    assert resumo["Exportação"]["alteradas"] > 0
+
+
+def test_falha_no_meio_nao_publica_nada(fabrica, site_falso, monkeypatch):
+    def falha(*args, **kwargs):
+        raise RuntimeError("falha simulada")
+    monkeypatch.setattr(agendador, "atualizar_balanca", falha)
+
+    with pytest.raises(RuntimeError):
+        agendador.atualizar_dados()
+
+    session = fabrica()
+    assert session.query(Cultivar).count() == 0
+    assert ler_versao(session) is None
+    session.close()
+
+
+def test_pula_se_outro_processo_sincronizou_ha_pouco(fabrica, site_falso):
+    assert agendador.atualizar_dados() is not None
+    assert agendador.atualizar_dados(pular_se_recente=600) is None
+
+
+def test_agendador_registra_erro_e_segue(monkeypatch):
+    def falha(*args, **kwargs):
+        raise RuntimeError("site fora do ar")
+    monkeypatch.setattr(agendador, "atualizar_dados", falha)
+
+    tarefa = agendador.Agendador(app=None, intervalo=60)
+    tarefa.executar()
+    estatisticas = tarefa.estatisticas()
+    assert estatisticas["execucoes"] == 1
+    assert estatisticas["ultimo_erro"] == "site fora do ar"
+    assert not estatisticas["em_andamento"]
+
+
+def test_cache_vencido_e_servido_enquanto_revalida(monkeypatch):
+    cache = cache_dados.CacheTTL(ttl=0.05)
+    monkeypatch.setattr(cache_dados, "cache_dados", cache)
+    liberar = threading.Event()
+    chamadas = []
+
+    def carregar(ano_inicio, ano_fim):
+        chamadas.append(ano_inicio)
+        if len(chamadas) > 1:
+            liberar.wait(5)
+        return [{"versao": len(chamadas)}]
+
+    assert cache_dados.carregar_dados("Produção", 2020, 2020, carregar) \
+        == [{"versao": 1}]
+    time.sleep(0.06)
+
+    # vencido: devolve a cópia antiga na hora, sem esperar o site
+    assert cache_dados.carregar_dados("Produção", 2020, 2020, carregar) \
+        == [{"versao": 1}]
+    liberar.set()
+    for _ in range(100):
+        if cache.obter(("Produção", 2020, 2020, None)) is not None:
+            break
+        time.sleep(0.01)
+    assert cache_dados.carregar_dados("Produção", 2020, 2020, carregar) \
+        == [{"versao": 2}]
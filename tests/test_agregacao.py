@@ -0,0 +1,122 @@
+# tests/test_agregacao.py
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from models.database import Base
+from models.agregado import Agregado
+from models.cultivar import Cultivar
+from services.agregacao import (
+    agregar,
+    atualizar_agregados,
+    interpretar_group_by,
+    interpretar_metricas
+)
+
+
+@pytest.fixture(scope="function")
+def test_session(tmp_path):
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'agregacao.db'}",
+        connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    linhas = []
+    for ano in (2021, 2022):
+        for categoria, pais, kg, usd in (
+                ("Espumantes", "Chile", 10, 100),
+                ("Espumantes", "Itália", 20, 200),
+                ("Vinhos de mesa", "Chile", 30, 300)):
+            linhas.append(Cultivar(
+                etapa="Importação", categoria_produto=categoria, ano=ano,
+                pais=pais, quantidade_kg=kg * (ano - 2020),
+                valor_usd=usd * (ano - 2020)))
+        linhas.append(Cultivar(
+            etapa="Importação", categoria_produto="Espumantes", ano=ano,
+            pais="Total", quantidade_kg=999, valor_usd=999))
+        linhas += [
+            Cultivar(etapa="Produção", categoria_produto="VINHO FINO",
+                     tipo_produto="", quantidade_l="", ano=ano),
+            Cultivar(etapa="Produção", categoria_produto="VINHO FINO",
+                     tipo_produto="Tinto", quantidade_l="1.500", ano=ano),
+            Cultivar(etapa="Produção", categoria_produto="VINHO FINO",
+                     tipo_produto="Branco", quantidade_l="-", ano=ano),
+        ]
+    session.add_all(linhas)
+    session.commit()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+def _agregar(session, etapa, group_by, metric, **kwargs):
+    return agregar(session, etapa, interpretar_group_by(group_by),
+                   interpretar_metricas(metric), **kwargs)
+
+
+def test_agrega_em_sql_sem_a_linha_total(test_session):
+    linhas, pre_calculado = _agregar(
+        test_session, "Importação", "ano,pais", "sum(valor_usd),count(*)")
+
+    assert not pre_calculado
+    assert linhas[:2] == [
+        {"ano": 2021, "pais": "Chile", "sum_valor_usd": 400, "count": 2},
+        {"ano": 2021, "pais": "Itália", "sum_valor_usd": 200, "count": 1},
+    ]
+    assert len(linhas) == 4
+
+
+def test_quantidade_l_em_texto_e_somada(test_session):
+    linhas, _ = _agregar(test_session, "Produção", "ano", "sum(quantidade_l)")
+    assert linhas == [{"ano": 2021, "sum_quantidade_l": 1500},
+                      {"ano": 2022, "sum_quantidade_l": 1500}]
+
+
+@pytest.mark.parametrize("metric,usa_pre_calculados", [
+    ("sum(quantidade_kg),sum(valor_usd),count(*)", True),
+    # count(<campo>) conta só os não nulos: não sai dos agregados
+    ("count(valor_usd)", False),
+])
+@pytest.mark.parametrize("group_by", [
+    "ano", "categoria_produto", "categoria_produto,ano", "pais", "ano,pais"])
+def test_pre_calculados_batem_com_o_sql(test_session, group_by, metric,
+                                        usa_pre_calculados):
+    esperado, _ = _agregar(test_session, "Importação", group_by, metric,
+                           ano_inicio=2022)
+
+    assert atualizar_agregados(test_session) > 0
+    linhas, pre_calculado = _agregar(test_session, "Importação", group_by,
+                                     metric, ano_inicio=2022)
+
+    assert pre_calculado is usa_pre_calculados
+    assert linhas == esperado
+
+
+def test_filtros_e_medias_caem_no_sql(test_session):
+    atualizar_agregados(test_session)
+
+    _, pre_calculado = _agregar(test_session, "Importação", "ano",
+                                "sum(valor_usd)", filtros={"pais": "Chile"})
+    assert not pre_calculado
+    _, pre_calculado = _agregar(test_session, "Importação", "ano",
+                                "avg(valor_usd)")
+    assert not pre_calculado
+
+
+def test_atualizar_substitui_os_agregados(test_session):
+    atualizar_agregados(test_session)
+    total = test_session.query(Agregado).count()
+    atualizar_agregados(test_session)
+    assert test_session.query(Agregado).count() == total
+
+
+@pytest.mark.parametrize("group_by, metric", [
+    ("id", None), ("ano,ano", None), ("ano", "sum(*)"),
+    ("ano", "sum(etapa)"), ("ano", "median(valor_usd)"),
+    ("ano", "sum(valor_usd);drop table cultivares"),
+])
+def test_parametros_fora_da_lista_sao_recusados(group_by, metric):
+    with pytest.raises(ValueError):
+        interpretar_group_by(group_by)
+        interpretar_metricas(metric)
@@ -0,0 +1,115 @@
+# tests/test_analitico.py
+
+import math
+
+import numpy as np
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import services.analitico as analitico
+import services.versao as versao
+from models.database import Base
+from models.cultivar import Cultivar
+
+NAN = np.nan
+
+
+@pytest.fixture(scope="function")
+def test_session(tmp_path, monkeypatch):
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'analitico.db'}",
+        connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    fabrica = sessionmaker(bind=engine)
+    monkeypatch.setattr(versao, "SessionLocal", fabrica)
+    versao.esquecer_versao()
+    session = fabrica()
+    session.add_all(
+        Cultivar(etapa="Exportação", categoria_produto="Espumantes",
+                 pais=pais, ano=ano, quantidade_kg=1, valor_usd=valor)
+        for pais, valores in (("Chile", (100, 110, 121)),
+                              ("Japão", (0, 50, 25)))
+        for ano, valor in zip((2020, 2021, 2022), valores))
+    session.commit()
+    versao.incrementar_versao(session)
+    analitico.cache_series.invalidar()
+    yield session
+    session.close()
+    versao.esquecer_versao()
+    engine.dispose()
+
+
+def _iguais(a, b):
+    return np.allclose(a, b, equal_nan=True)
+
+
+def test_crescimento_anual():
+    matriz = np.array([[100.0, 110.0, 121.0], [0.0, 50.0, NAN]])
+    assert _iguais(analitico.crescimento_anual(matriz),
+                   [[NAN, 0.1, 0.1], [NAN, NAN, NAN]])
+
+
+def test_media_movel_ignora_anos_sem_valor():
+    matriz = np.array([[1.0, 2.0, 3.0, 4.0], [1.0, NAN, 3.0, NAN]])
+    assert _iguais(analitico.media_movel(matriz, 2),
+                   [[NAN, 1.5, 2.5, 3.5], [NAN, 1.0, 3.0, 3.0]])
+    assert np.isnan(analitico.media_movel(matriz, 5)).all()
+
+
+def test_cagr_entre_primeiro_e_ultimo_valor_positivo():
+    matriz = np.array([[100.0, 110.0, 121.0], [0.0, 50.0, 25.0],
+                       [NAN, 7.0, 0.0]])
+    taxas = analitico.cagr(matriz, np.array([2020, 2021, 2022]))
+    assert _iguais(taxas, [0.1, -0.5, NAN])
+
+
+def test_calcular_series(test_session):
+    series = analitico.calcular_series(
+        test_session, "Exportação", ano_inicio=2020, ano_fim=2022, janela=2)
+
+    chile = next(s for s in series if s["serie"]["pais"] == "Chile")
+    assert chile["serie"] == {"categoria_produto": "Espumantes",
+                              "pais": "Chile"}
+    assert chile["valores"] == [100, 110, 121]
+    assert chile["yoy"] == [None, 0.1, 0.1]
+    assert chile["media_movel"] == [None, 105, 115.5]
+    assert math.isclose(chile["cagr"], 0.1)
+
+
+def test_resultado_em_cache_ate_a_versao_mudar(test_session, monkeypatch):
+    cargas = []
+    original = analitico.carregar_matriz
+
+    def contar(*args, **kwargs):
+        cargas.append(args)
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(analitico, "carregar_matriz", contar)
+    for _ in range(2):
+        analitico.calcular_series(test_session, "Exportação",
+                                  ano_inicio=2020, ano_fim=2022)
+    assert len(cargas) == 1
+
+    # o cache vale pela versão dos dados, que só muda com uma nova carga
+    test_session.add(Cultivar(etapa="Exportação", categoria_produto="Espumantes",
+                              pais="Peru", ano=2022, valor_usd=1))
+    test_session.commit()
+    analitico.calcular_series(test_session, "Exportação",
+                              ano_inicio=2020, ano_fim=2022)
+    assert len(cargas) == 1
+
+    versao.incrementar_versao(test_session)
+    series = analitico.calcular_series(test_session, "Exportação",
+                                       ano_inicio=2020, ano_fim=2022)
+    assert len(cargas) == 2
+    assert len(series) == 3
+
+
+@pytest.mark.parametrize("kwargs", [
+    {"serie_por": ("ano",)}, {"serie_por": ("senha",)},
+    {"metrica": "etapa"}, {"janela": 0},
+])
+def test_parametros_invalidos(test_session, kwargs):
+    with pytest.raises(ValueError):
+        analitico.calcular_series(test_session, "Exportação", **kwargs)
@@ -0,0 +1,71 @@
+# tests/test_balanca.py
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from models.database import Base
+from models.cultivar import Cultivar
+from services.balanca import (
+    atualizar_balanca,
+    chave_pais,
+    consultar_balanca
+)
+
+
+@pytest.fixture(scope="function")
+def test_session(tmp_path):
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'balanca.db'}",
+        connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+
+    def registro(etapa, pais, kg, usd, ano=2022):
+        return Cultivar(etapa=etapa, categoria_produto="Espumantes", ano=ano,
+                        pais=pais, quantidade_kg=kg, valor_usd=usd)
+
+    session.add_all([
+        registro("Exportação", "Países Baixos", 100, 1000),
+        registro("Importação", "Paises  Baixos", 30, 400),
+        registro("Importação", "Chile", 50, 500),
+        registro("Exportação", "Total", 100, 1000),
+        registro("Importação", "Total", 80, 900),
+        registro("Exportação", "Países Baixos", 10, 100, ano=2021),
+    ])
+    session.commit()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+def test_chave_pais_ignora_acentos_caixa_e_espacos():
+    assert chave_pais("  Países Baixos ") == chave_pais("PAISES-baixos") \
+        == "paises baixos"
+
+
+def _por_pais(linhas):
+    return {linha["pais"]: linha for linha in linhas}
+
+
+@pytest.mark.parametrize("pre_calculada", [False, True])
+def test_saldo_junta_as_duas_abas(test_session, pre_calculada):
+    if pre_calculada:
+        assert atualizar_balanca(test_session) == 3
+
+    linhas = _por_pais(consultar_balanca(test_session, ano=2022))
+
+    assert set(linhas) == {"Países Baixos", "Chile"}
+    assert linhas["Países Baixos"]["saldo_kg"] == 70
+    assert linhas["Países Baixos"]["saldo_usd"] == 600
+    assert linhas["Chile"]["exportacao_usd"] == 0
+    assert linhas["Chile"]["saldo_usd"] == -500
+
+
+def test_filtro_de_pais_usa_o_nome_normalizado(test_session):
+    atualizar_balanca(test_session)
+
+    linhas = consultar_balanca(test_session, pais="paises baixos")
+
+    assert [(l["ano"], l["saldo_usd"]) for l in linhas] == [
+        (2021, 100), (2022, 600)]
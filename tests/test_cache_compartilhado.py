@@ -0,0 +1,68 @@
+# tests/test_cache_compartilhado.py
+
+import threading
+import time
+
+import pytest
+from services.cache_compartilhado import CacheCompartilhado, trava_arquivo
+
+CHAVE = ("Produção", 2020, 2021, None)
+REGISTROS = [{"etapa": "Produção", "ano": 2020, "quantidade_l": "1.000"}]
+
+
+@pytest.fixture
+def caminho(tmp_path):
+    return str(tmp_path / "compartilhado.db")
+
+
+def test_entradas_visiveis_para_outra_instancia(caminho):
+    # duas instâncias sobre o mesmo arquivo fazem o papel de dois workers
+    worker_a = CacheCompartilhado(caminho, ttl=60, max_bytes=10 ** 6)
+    worker_b = CacheCompartilhado(caminho, ttl=60, max_bytes=10 ** 6)
+    assert worker_b.obter(CHAVE) is None
+    worker_a.guardar(CHAVE, REGISTROS)
+    assert worker_b.obter(CHAVE) == REGISTROS
+    assert worker_b.estatisticas()["entradas"] == 1
+
+
+def test_entrada_vencida_continua_disponivel(caminho):
+    cache = CacheCompartilhado(caminho, ttl=0.05, max_bytes=10 ** 6)
+    cache.guardar(CHAVE, REGISTROS)
+    time.sleep(0.06)
+    assert cache.obter(CHAVE) is None
+    assert cache.obter_com_validade(CHAVE) == (REGISTROS, False)
+
+
+def test_invalidar_por_etapa_e_despejo(caminho):
+    cache = CacheCompartilhado(caminho, ttl=60, max_bytes=10 ** 6)
+    cache.guardar(CHAVE, REGISTROS)
+    cache.guardar(("Importação", 2020, 2020, ["Vinhos de mesa"]), REGISTROS)
+    assert cache.invalidar("Produção") == 1
+    assert cache.obter(CHAVE) is None
+    assert cache.invalidar() == 1
+
+    pequeno = CacheCompartilhado(caminho, ttl=60, max_bytes=200)
+    for ano in range(10):
+        pequeno.guardar(("Produção", ano, ano, None),
+                        [{"texto": f"{ano}" * 50}])
+    assert pequeno.estatisticas()["bytes"] <= 200
+    assert pequeno.obter(("Produção", 9, 9, None)) is not None
+
+
+def test_trava_arquivo_exclusiva(tmp_path):
+    ordem = []
+    segurando = threading.Event()
+
+    def primeiro():
+        with trava_arquivo(str(tmp_path), "chave"):
+            segurando.set()
+            time.sleep(0.05)
+            ordem.append("primeiro")
+
+    thread = threading.Thread(target=primeiro)
+    thread.start()
+    segurando.wait()
+    with trava_arquivo(str(tmp_path), "chave"):
+        ordem.append("segundo")
+    thread.join()
+    assert ordem == ["primeiro", "segundo"]
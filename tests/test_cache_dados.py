@@ -0,0 +1,120 @@
+# tests/test_cache_dados.py
+
+import threading
+import time
+
+import pytest
+import services.cache_dados as cache_dados
+from services.cache_dados import CacheTTL, SingleFlight, tamanho_aproximado
+
+
+def _registros(n):
+    return [{"etapa": "Produção", "ano": 2000 + i, "quantidade_l": "1.000"}
+            for i in range(n)]
+
+
+def test_acertos_e_falhas():
+    cache = CacheTTL(ttl=60)
+    assert cache.obter(("Produção", 1970, 2024)) is None
+    cache.guardar(("Produção", 1970, 2024), _registros(3))
+    assert len(cache.obter(("Produção", 1970, 2024))) == 3
+    stats = cache.estatisticas()
+    assert (stats["acertos"], stats["falhas"]) == (1, 1)
+
+
+def test_expira_apos_ttl():
+    cache = CacheTTL(ttl=0.05)
+    cache.guardar("chave", _registros(1))
+    time.sleep(0.06)
+    assert cache.obter("chave") is None
+    assert cache.estatisticas()["entradas"] == 0
+
+
+def test_despejo_lru_por_memoria():
+    tamanho = tamanho_aproximado(_registros(10))
+    cache = CacheTTL(ttl=60, max_bytes=tamanho * 2)
+    cache.guardar("a", _registros(10))
+    cache.guardar("b", _registros(10))
+    cache.obter("a")  # "a" passa a ser o mais recente
+    cache.guardar("c", _registros(10))
+    assert cache.obter("b") is None
+    assert cache.obter("a") is not None
+    assert cache.obter("c") is not None
+    assert cache.estatisticas()["bytes"] <= tamanho * 2
+
+
+def test_invalidar_por_etapa():
+    cache = CacheTTL(ttl=60)
+    cache.guardar(("Produção", 1970, 2024), _registros(1))
+    cache.guardar(("Importação", 1970, 2024), _registros(1))
+    assert cache.invalidar("Produção") == 1
+    assert cache.obter(("Produção", 1970, 2024)) is None
+    assert cache.obter(("Importação", 1970, 2024)) is not None
+    assert cache.invalidar() == 1
+
+
+def test_single_flight_agrupa_chamadas_simultaneas():
+    voo = SingleFlight()
+    liberar = threading.Event()
+    execucoes = []
+
+    def raspar():
+        execucoes.append(1)
+        liberar.wait()
+        return ["dados"]
+
+    resultados = []
+    threads = [threading.Thread(
+        target=lambda: resultados.append(voo.executar("chave", raspar)))
+        for _ in range(5)]
+    for t in threads:
+        t.start()
+
+    # espera os 4 seguidores ficarem pendurados no líder
+    prazo = time.monotonic() + 2
+    while voo.aguardando().get("chave") != 4 and time.monotonic() < prazo:
+        time.sleep(0.005)
+    assert voo.aguardando() == {"chave": 4}
+
+    liberar.set()
+    for t in threads:
+        t.join()
+    assert len(execucoes) == 1
+    assert resultados == [["dados"]] * 5
+    assert voo.aguardando() == {}
+    assert voo.compartilhadas == 4
+
+
+def test_single_flight_propaga_erro_e_libera_chave():
+    voo = SingleFlight()
+
+    def falha():
+        raise RuntimeError("site fora do ar")
+
+    with pytest.raises(RuntimeError):
+        voo.executar("chave", falha)
+    assert voo.executar("chave", lambda: 42) == 42
+
+
+def test_scraping_vazio_nao_e_cacheado(monkeypatch):
+    cache = CacheTTL(ttl=0.05)
+    monkeypatch.setattr(cache_dados, "cache_dados", cache)
+    respostas = [[], _registros(1), []]
+
+    def carregar(ano_inicio, ano_fim):
+        return respostas.pop(0)
+
+    # site fora do ar: a próxima requisição tenta de novo
+    assert cache_dados.carregar_dados("Produção", 2020, 2020, carregar) == []
+    assert cache_dados.carregar_dados("Produção", 2020, 2020, carregar) \
+        == _registros(1)
+
+    # a revalidação que volta vazia mantém a cópia anterior
+    time.sleep(0.06)
+    cache_dados.carregar_dados("Produção", 2020, 2020, carregar)
+    for _ in range(100):
+        if not respostas and not cache_dados.estatisticas()["revalidando"]:
+            break
+        time.sleep(0.01)
+    valor, _ = cache.obter_com_validade(("Produção", 2020, 2020, None))
+    assert valor == _registros(1)
@@ -0,0 +1,93 @@
+# tests/test_cache_paginas.py
+
+import os
+import time
+from datetime import date
+
+import pytest
+from services import scraper
+from services.cache_paginas import CachePaginas, chave_pagina, ttl_para_ano
+
+HTML = '<table class="tb_base tb_dados"><tr><td>Chile</td></tr></table>'
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return CachePaginas(str(tmp_path), ttl_aberto=60)
+
+
+def test_chave_pagina_le_url_params_e_data():
+    chave = chave_pagina("post", f"{scraper._BASE_URL}?opcao=opt_05",
+                         data={"subopcao": "subopt_02", "ano": "2001"})
+    assert chave == ("opt_05", "subopt_02", 2001, "POST")
+
+    chave = chave_pagina("GET", scraper._BASE_URL,
+                         params={"opcao": "opt_02", "ano": "1999"})
+    assert chave == ("opt_02", None, 1999, "GET")
+
+
+def test_ttl_por_ano():
+    hoje = date(2025, 6, 1)
+    assert ttl_para_ano(2022, 60, hoje) is None
+    assert ttl_para_ano(2024, 60, hoje) == 60
+    assert ttl_para_ano(2025, 60, hoje) == 60
+    assert ttl_para_ano(None, 60, hoje) == 60
+
+
+def test_grava_e_le_pagina_comprimida(cache, tmp_path):
+    chave = chave_pagina("GET", scraper._BASE_URL,
+                         params={"opcao": "opt_02", "ano": "1980"})
+    assert cache.ler(chave) is None
+
+    cache.gravar(chave, HTML)
+    lida = cache.ler(chave)
+    assert lida.html == HTML
+    assert lida.fresca
+    assert [n for n in os.listdir(tmp_path) if n.endswith(".html.gz")]
+
+
+def test_ano_aberto_expira(cache):
+    chave = chave_pagina("GET", scraper._BASE_URL,
+                         params={"opcao": "opt_02", "ano": str(date.today().year)})
+    cache.gravar(chave, HTML)
+    arquivo = cache._arquivo(chave)
+    velho = time.time() - 3600
+    os.utime(arquivo, (velho, velho))
+    assert not cache.ler(chave).fresca
+
+
+def test_despejo_respeita_limite(tmp_path):
+    cache = CachePaginas(str(tmp_path), max_bytes=2000)
+    for ano in range(1970, 2000):
+        chave = chave_pagina("GET", scraper._BASE_URL,
+                             params={"opcao": "opt_02", "ano": str(ano)})
+        cache.gravar(chave, HTML + os.urandom(200).hex())
+    assert cache._medir() <= 2000
+
+
+def test_buscar_html_usa_cache_e_copia_vencida(cache, monkeypatch):
+    baixadas = []
+
+    def baixar(req):
+        baixadas.append(req)
+        return HTML if len(baixadas) == 1 else None
+
+    monkeypatch.setattr(scraper, "_cache_paginas", cache)
+    monkeypatch.setattr(scraper, "_baixar_html", baixar)
+
+    fechado = scraper._Requisicao(
+        "GET", scraper._BASE_URL, params={"opcao": "opt_02", "ano": "1990"})
+    assert scraper._buscar_html(fechado) == HTML
+    assert scraper._buscar_html(fechado) == HTML
+    assert len(baixadas) == 1
+
+    # ano aberto vencido + site fora do ar: devolve a cópia vencida
+    aberto = scraper._Requisicao(
+        "GET", scraper._BASE_URL,
+        params={"opcao": "opt_02", "ano": str(date.today().year)})
+    chave = chave_pagina(aberto.metodo, aberto.url, aberto.params)
+    cache.gravar(chave, HTML)
+    velho = time.time() - 3600
+    os.utime(cache._arquivo(chave), (velho, velho))
+    assert scraper._buscar_html(aberto) == HTML
+    assert len(baixadas) == 2
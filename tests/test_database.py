@@ -0,0 +1,54 @@
+# tests/test_database.py
+
+import pytest
+from flask import Flask
+from sqlalchemy import create_engine, exc, text
+
+import models.database as database
+from models.database import PoolCronometrado
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'pool.db'}",
+        connect_args={"check_same_thread": False},
+        poolclass=PoolCronometrado, pool_size=1, max_overflow=0,
+        pool_timeout=0.05)
+    yield engine
+    engine.dispose()
+
+
+def test_pool_mede_checkouts_e_timeouts(engine):
+    conexao = engine.connect()
+    conexao.execute(text("SELECT 1"))
+    with pytest.raises(exc.TimeoutError):
+        engine.connect()
+    conexao.close()
+
+    estatisticas = engine.pool.estatisticas()
+    assert estatisticas["checkouts"] == 1
+    assert estatisticas["timeouts"] == 1
+    assert estatisticas["espera_max_ms"] >= 50
+    assert estatisticas["em_uso"] == 0
+
+
+def test_sessao_da_requisicao_e_fechada_no_teardown(monkeypatch):
+    fechadas = []
+
+    class SessaoFalsa:
+        def close(self):
+            fechadas.append(self)
+
+        def rollback(self):
+            pass
+
+    monkeypatch.setattr(database, "SessionLocal", SessaoFalsa)
+    app = Flask(__name__)
+    database.init_app(app)
+
+    with app.app_context():
+        sessao = database.sessao_da_requisicao()
+        assert database.sessao_da_requisicao() is sessao
+        assert fechadas == []
+    assert fechadas == [sessao]
@@ -0,0 +1,128 @@
+# tests/test_export.py
+
+import csv
+import gzip
+import io
+
+import pytest
+from app import app
+from models.database import SessionLocal, init_db
+from models.cultivar import Cultivar
+import services.exportador as exportador
+from services.versao import incrementar_versao
+
+PAIS_TESTE = "Terra de Exportação"
+
+
+@pytest.fixture
+def client():
+    with app.test_client() as client:
+        yield client
+
+
+@pytest.fixture
+def headers(client):
+    access = client.get("/token").get_json()["access_token"]
+    return {"Authorization": f"Bearer {access}"}
+
+
+@pytest.fixture
+def cache_export(tmp_path, monkeypatch):
+    monkeypatch.setattr(exportador, "EXPORT_CACHE_DIR", str(tmp_path))
+    return tmp_path
+
+
+@pytest.fixture
+def sessao():
+    init_db()
+    session = SessionLocal()
+    session.add_all([
+        Cultivar(etapa="Exportação", categoria_produto="Espumantes",
+                 ano=1971 + i, pais=PAIS_TESTE, quantidade_kg=i, valor_usd=10 * i)
+        for i in range(3)
+    ])
+    session.commit()
+    yield session
+    session.query(Cultivar).filter(Cultivar.pais == PAIS_TESTE).delete()
+    session.commit()
+    session.close()
+
+
+def _linhas_csv(response):
+    texto = gzip.decompress(response.get_data()).decode("utf-8")
+    return list(csv.DictReader(io.StringIO(texto)))
+
+
+def test_exporta_csv_gzip(client, headers, cache_export, sessao):
+    response = client.get("/api/export/exportacao", headers=headers)
+
+    assert response.status_code == 200
+    assert response.mimetype == "application/gzip"
+    linhas = [l for l in _linhas_csv(response) if l["pais"] == PAIS_TESTE]
+    assert [(l["ano"], l["valor_usd"]) for l in linhas] == [
+        ("1971", "0"), ("1972", "10"), ("1973", "20")]
+
+
+def test_repete_download_do_disco_ate_os_dados_mudarem(
+        client, headers, cache_export, sessao, monkeypatch):
+    incrementar_versao(sessao)
+    geracoes = []
+    original = exportador._ESCRITORES["csv"]
+
+    def contar(arquivo, lotes):
+        geracoes.append(arquivo)
+        original(arquivo, lotes)
+
+    monkeypatch.setitem(exportador._ESCRITORES, "csv", contar)
+    for _ in range(2):
+        client.get("/api/export/exportacao", headers=headers)
+    assert len(geracoes) == 1
+
+    # o arquivo vale pela versão dos dados, que só muda com uma nova carga
+    sessao.add(Cultivar(etapa="Exportação", ano=1980, pais=PAIS_TESTE))
+    sessao.commit()
+    client.get("/api/export/exportacao", headers=headers)
+    assert len(geracoes) == 1
+
+    incrementar_versao(sessao)
+    response = client.get("/api/export/exportacao", headers=headers)
+
+    assert len(geracoes) == 2
+    assert sum(l["pais"] == PAIS_TESTE for l in _linhas_csv(response)) == 4
+    assert len(list(cache_export.glob("exportacao-*.csv.gz"))) == 1
+
+
+@pytest.mark.parametrize("formato", ["parquet", "arrow"])
+def test_exporta_formatos_colunares(client, headers, cache_export, sessao,
+                                    formato):
+    pa = pytest.importorskip("pyarrow")
+    import pyarrow.compute  # noqa: F401
+    import pyarrow.ipc  # noqa: F401
+    import pyarrow.parquet  # noqa: F401
+
+    response = client.get(f"/api/export/exportacao?format={formato}",
+                          headers=headers)
+    assert response.status_code == 200
+    dados = io.BytesIO(response.get_data())
+    tabela = (pa.parquet.read_table(dados) if formato == "parquet"
+              else pa.ipc.open_file(dados).read_all())
+    assert tabela.schema.field("valor_usd").type == pa.int64()
+    assert tabela.filter(pa.compute.equal(tabela["pais"], PAIS_TESTE)
+                         ).num_rows == 3
+
+
+def test_formato_sem_pyarrow_retorna_501(client, headers, cache_export,
+                                         monkeypatch):
+    def sem_pyarrow():
+        raise exportador.FormatoIndisponivel("pyarrow não instalado")
+
+    monkeypatch.setattr(exportador, "_pyarrow", sem_pyarrow)
+    response = client.get("/api/export/producao?format=parquet",
+                          headers=headers)
+    assert response.status_code == 501
+
+
+def test_etapa_ou_formato_invalidos(client, headers):
+    assert client.get("/api/export/vinhos", headers=headers).status_code == 404
+    assert client.get("/api/export/producao?format=xlsx",
+                      headers=headers).status_code == 400
@@ -0,0 +1,126 @@
+# tests/test_inicializacao.py
+
+import contextlib
+import importlib
+import os
+import subprocess
+import sys
+import threading
+
+import pytest
+
+import models.database as database
+import scripts.populate_db as populate_db
+import services.inicializacao as inicializacao
+from app import app
+
+modulo_app = importlib.import_module("app")
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def client():
+    with app.test_client() as client:
+        yield client
+
+
+@pytest.fixture
+def estado(monkeypatch):
+    estado = inicializacao.Inicializacao()
+    monkeypatch.setattr(inicializacao, "_trava_inicializacao",
+                        contextlib.nullcontext)
+    monkeypatch.setattr(modulo_app, "inicializacao", estado)
+    monkeypatch.setattr("routes.saude.inicializacao", estado)
+    return estado
+
+
+def test_import_do_app_nao_carrega_modulos_pesados():
+    codigo = ("import sys, app; print(sorted(m for m in ('bs4', 'requests', "
+              "'numpy', 'scripts.populate_db', 'services.scraper') "
+              "if m in sys.modules))")
+    saida = subprocess.run(
+        [sys.executable, "-c", codigo], cwd=RAIZ, capture_output=True,
+        text=True, check=True)
+    assert saida.stdout.strip() == "[]"
+
+
+def test_import_do_app_nao_inicia_servicos(tmp_path):
+    banco = tmp_path / "app.db"
+    cache = tmp_path / "cache" / "compartilhado.db"
+    ambiente = {**os.environ, "DATABASE_URL": f"sqlite:///{banco}",
+                "CACHE_COMPARTILHADO_PATH": str(cache)}
+    resultado = tmp_path / "resultado.txt"
+    # o resultado vai para um arquivo: os logs da inicialização saem no
+    # stdout
+    codigo = ("import sys, threading, app\n"
+              "from services.inicializacao import inicializacao\n"
+              "if len(sys.argv) > 2: import asgi\n"
+              "open(sys.argv[1], 'w').write(f'{inicializacao.iniciado_em "
+              "is not None} {threading.active_count()}')\n")
+
+    subprocess.run([sys.executable, "-c", codigo, str(resultado)], cwd=RAIZ,
+                   capture_output=True, env=ambiente, check=True)
+    assert resultado.read_text().split() == ["False", "1"]
+    assert not banco.exists()
+    assert not cache.exists()
+
+    # o ponto de entrada ASGI inicia os serviços
+    subprocess.run([sys.executable, "-c", codigo, str(resultado), "asgi"],
+                   cwd=RAIZ, capture_output=True, env=ambiente, check=True)
+    assert resultado.read_text().split()[0] == "True"
+
+
+def test_health_responde_sem_banco_nem_token(client):
+    resposta = client.get("/health")
+    assert resposta.status_code == 200
+    assert resposta.get_json() == {"status": "ok"}
+
+
+def test_ready_informa_progresso_da_carga(client, estado, monkeypatch):
+    liberar = threading.Event()
+    no_meio = threading.Event()
+    concluidos = []
+
+    def popular_banco(progresso=None):
+        progresso("Produção", 0, 2)
+        progresso("Importação", 1, 2)
+        no_meio.set()
+        liberar.wait(5)
+        progresso(None, 2, 2)
+
+    monkeypatch.setattr(database, "init_db", lambda: None)
+    monkeypatch.setattr(populate_db, "popular_banco", popular_banco)
+    estado.iniciar(popular=True, ao_concluir=lambda: concluidos.append(1))
+    assert no_meio.wait(5)
+
+    resposta = client.get("/ready")
+    assert resposta.status_code == 503
+    corpo = resposta.get_json()
+    assert corpo["fase"] == "populando"
+    assert corpo["etapa"] == "Importação"
+    assert corpo["percentual"] == 50
+    # o esquema já existe: a API atende durante a carga
+    assert estado.aguardar_esquema(0)
+
+    liberar.set()
+    assert estado.aguardar(5)
+    resposta = client.get("/ready")
+    assert resposta.status_code == 200
+    assert resposta.get_json()["etapa"] is None
+    assert concluidos == [1]
+
+
+def test_falha_no_esquema_responde_503_na_api(client, estado, monkeypatch):
+    def falha():
+        raise RuntimeError("banco fora do ar")
+
+    monkeypatch.setattr(database, "init_db", falha)
+    estado.iniciar(popular=False)
+    estado.aguardar(5)
+
+    assert estado.estatisticas()["fase"] == "erro"
+    assert client.get("/ready").status_code == 503
+    resposta = client.get("/api/producao")
+    assert resposta.status_code == 503
+    assert resposta.get_json()["inicializacao"]["erro"] == "banco fora do ar"
+    assert client.get("/health").status_code == 200
@@ -0,0 +1,147 @@
+# tests/test_materializacao.py
+
+import gzip
+import json
+from datetime import datetime
+
+import pytest
+import routes.comum
+from app import app
+from services.cache_compartilhado import CacheCompartilhado
+from services.cache_dados import CacheTTL
+from services.materializacao import Materializador, respostas_materializadas
+from services.versao import Versao
+
+CORPO = json.dumps([{"ano": 1971}]).encode()
+
+
+@pytest.fixture
+def client():
+    with app.test_client() as client:
+        yield client
+
+
+@pytest.fixture
+def headers(client):
+    access = client.get("/token").get_json()["access_token"]
+    return {"Authorization": f"Bearer {access}"}
+
+
+@pytest.fixture
+def versao_fixa(monkeypatch):
+    atual = {"versao": Versao(3, datetime(2024, 5, 1))}
+    monkeypatch.setattr(routes.comum, "versao_atual", lambda: atual["versao"])
+    respostas_materializadas.invalidar()
+    yield atual
+    respostas_materializadas.invalidar()
+
+
+def test_guarda_so_as_assinaturas_mais_pedidas():
+    materializador = Materializador(top_n=1, cache=CacheTTL(ttl=60))
+    materializador.obter(1, "a")
+    assert materializador.guardar(1, "a", CORPO, "application/json")
+
+    materializador.obter(1, "b")
+    assert materializador.guardar(1, "b", CORPO, "application/json") is None
+
+    materializador.obter(1, "b")  # "b" passa a ser mais pedida que "a"
+    assert materializador.guardar(1, "b", CORPO, "application/json")
+    assert materializador.obter(1, "a") is None
+    assert materializador.obter(1, "b") is not None
+
+
+def test_nova_versao_descarta_as_respostas():
+    materializador = Materializador(top_n=4, cache=CacheTTL(ttl=60))
+    materializador.obter(1, "a")
+    materializador.guardar(1, "a", CORPO, "application/json")
+    assert materializador.obter(2, "a") is None
+    # guardar com a versão antiga não repovoa
+    assert materializador.guardar(1, "a", CORPO, "application/json") is None
+
+
+def test_corpos_comprimidos_equivalem_ao_original():
+    materializador = Materializador(top_n=1, cache=CacheTTL(ttl=60))
+    materializador.obter(1, "a")
+    corpos = materializador.guardar(1, "a", CORPO, "application/json").corpos
+    assert corpos["identity"] == CORPO
+    assert gzip.decompress(corpos["gzip"]) == CORPO
+
+
+def test_workers_compartilham_as_respostas(tmp_path):
+    caminho = str(tmp_path / "respostas.db")
+    worker_a, worker_b = (
+        Materializador(top_n=4, cache=CacheCompartilhado(
+            caminho, ttl=60, max_bytes=10 ** 6, binario=True))
+        for _ in range(2))
+    worker_a.obter(1, "a")
+    worker_a.guardar(1, "a", CORPO, "application/json",
+                     [("X-Next-Cursor", "abc")])
+
+    resposta = worker_b.obter(1, "a")
+    assert resposta.corpos["identity"] == CORPO
+    assert gzip.decompress(resposta.corpos["gzip"]) == CORPO
+    assert resposta.headers == (("X-Next-Cursor", "abc"),)
+
+    # a nova versão descarta as respostas antigas
+    worker_a.obter(2, "b")
+    assert worker_b.obter(1, "a") is None
+
+
+def test_rota_serve_corpo_materializado_com_content_encoding(
+        client, headers, versao_fixa, monkeypatch):
+    original = client.get("/api/importacao?ano=1971", headers=headers)
+    assert original.status_code == 200
+
+    def falha(*args, **kwargs):
+        raise AssertionError("a resposta deveria vir materializada")
+    monkeypatch.setattr(routes.comum, "sessao_da_requisicao", falha)
+
+    resposta = client.get("/api/importacao?ano=1971",
+                          headers={**headers, "Accept-Encoding": "gzip"})
+    assert resposta.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in resposta.headers["Vary"]
+    assert gzip.decompress(resposta.data) == original.data
+    assert resposta.headers["ETag"].endswith('-gzip"')
+
+    resposta = client.get("/api/importacao?ano=1971", headers=headers)
+    assert "Content-Encoding" not in resposta.headers
+    assert resposta.data == original.data
+
+
+def test_brotli_quando_disponivel(client, headers, versao_fixa):
+    brotli = pytest.importorskip("brotli")
+    original = client.get("/api/importacao?ano=1971", headers=headers)
+    resposta = client.get("/api/importacao?ano=1971",
+                          headers={**headers, "Accept-Encoding": "gzip, br"})
+    assert resposta.headers["Content-Encoding"] == "br"
+    assert brotli.decompress(resposta.data) == original.data
+
+
+def test_sincronizacao_invalida_as_respostas(client, headers, versao_fixa):
+    client.get("/api/importacao?ano=1971", headers=headers)
+    assert respostas_materializadas.estatisticas()["respostas"] == 1
+    versao_fixa["versao"] = Versao(4, datetime(2024, 6, 1))
+    client.get("/api/importacao?ano=1972", headers=headers)
+    estatisticas = respostas_materializadas.estatisticas()
+    assert estatisticas["versao"] == 4
+    assert estatisticas["respostas"] == 1
+
+
+def test_formatos_transmitidos_nao_sao_materializados(
+        client, headers, versao_fixa):
+    client.get("/api/importacao?ano=1971&format=ndjson", headers=headers)
+    assert respostas_materializadas.estatisticas()["respostas"] == 0
+
+
+def test_aquecimento_materializa_sem_autenticacao(
+        client, headers, versao_fixa, monkeypatch):
+    assert routes.comum.aquecer_consulta(
+        app, "/api/importacao", [("ano", "1971")])
+    assert not routes.comum.aquecer_consulta(app, "/api/inexistente")
+    assert respostas_materializadas.estatisticas()["respostas"] == 1
+
+    def falha(*args, **kwargs):
+        raise AssertionError("a resposta deveria vir materializada")
+    monkeypatch.setattr(routes.comum, "sessao_da_requisicao", falha)
+    resposta = client.get("/api/importacao?ano=1971", headers=headers)
+    assert resposta.status_code == 200
@@ -0,0 +1,63 @@
+# tests/test_parser.py
+
+import json
+import os
+
+import pytest
+from services import scraper
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures", "vitibrasil")
+
+# página salva -> (etapa, categoria, ano, registros esperados)
+PAGINAS = {
+    "producao_2022.html": ("Produção", None, 2022, 44),
+    "processamento_viniferas_2022.html": ("Processamento", "Viníferas", 2022, 46),
+    "comercializacao_2022.html": ("Comercialização", None, 2022, 39),
+    "importacao_espumantes_2022.html": ("Importação", "Espumantes", 2022, 46),
+    "exportacao_vinhos_2022.html": ("Exportação", "Vinhos de mesa", 2022, 46),
+}
+
+BACKENDS = ["html.parser"]
+try:
+    import lxml  # noqa: F401
+    BACKENDS.append("lxml")
+except ImportError:
+    pass
+
+
+def _ler(nome):
+    with open(os.path.join(FIXTURES, nome), encoding="utf-8") as f:
+        return f.read()
+
+
+def _referencia(nome):
+    """
+    Registros esperados de cada página, gravados com os extratores
+    originais (um laço por aba, html.parser sobre o documento inteiro).
+    """
+    caminho = os.path.join(FIXTURES, nome.replace(".html", ".json"))
+    with open(caminho, encoding="utf-8") as f:
+        return json.load(f)
+
+
+@pytest.mark.parametrize("nome", sorted(PAGINAS))
+def test_referencia_extrai_registros(nome):
+    registros = _referencia(nome)
+    assert len(registros) == PAGINAS[nome][3]
+
+
+@pytest.mark.parametrize("so_tabela", [True, False])
+@pytest.mark.parametrize("parser", BACKENDS)
+@pytest.mark.parametrize("nome", sorted(PAGINAS))
+def test_paridade_entre_backends(nome, parser, so_tabela):
+    etapa, categoria, ano, _ = PAGINAS[nome]
+    registros = scraper.extrair_pagina(
+        etapa, _ler(nome), categoria, ano, parser=parser, so_tabela=so_tabela)
+    assert registros == _referencia(nome)
+
+
+def test_so_tabela_descarta_o_resto_da_pagina():
+    soup = scraper._parse_html(
+        _ler("importacao_espumantes_2022.html"), "html.parser", so_tabela=True)
+    assert soup.find("form") is None
+    assert len(soup.find_all("table")) == 1
@@ -0,0 +1,50 @@
+# tests/test_planejador.py
+
+from services import scraper
+from services.planejador import planejar
+
+
+def test_ano_e_categoria_viram_uma_unica_pagina():
+    plano = planejar("Importação", ano=2023,
+                     filtros={"categoria_produto": "Espumantes", "pais": None})
+
+    assert (plano.ano_inicio, plano.ano_fim) == (2023, 2023)
+    assert plano.categorias == ("Espumantes",)
+    assert plano.paginas() == [("subopt_02", 2023)]
+
+
+def test_sem_filtros_busca_tudo_no_intervalo():
+    plano = planejar("Exportação", ano_inicio=2020, ano_fim=2022)
+
+    assert plano.categorias is None
+    assert len(plano.paginas()) == 3 * len(scraper.categorias_da_etapa("Exportação"))
+
+
+def test_filtros_que_nao_casam_com_o_site_nao_buscam_nada():
+    assert planejar("Importação", ano=1960).vazio
+    assert planejar("Processamento",
+                    filtros={"categoria_uva": "Inexistente"}).vazio
+
+
+def test_aba_sem_subopcoes_ignora_filtro_de_categoria():
+    plano = planejar("Produção", ano=2022,
+                     filtros={"categoria_produto": "VINHO DE MESA"})
+
+    assert plano.categorias is None
+    assert plano.paginas() == [(None, 2022)]
+
+
+def test_coletar_paginas_busca_so_as_categorias_pedidas(monkeypatch):
+    requisicoes = []
+
+    def buscar_paginas(reqs, max_workers=None):
+        requisicoes.extend(reqs)
+        return [None] * len(reqs)
+
+    monkeypatch.setattr(scraper, "_buscar_paginas", buscar_paginas)
+    paginas = scraper.coletar_paginas(
+        "Importação", [2022, 2023], fonte="html", categorias=("Espumantes",))
+
+    assert [(p.categoria, p.ano) for p in paginas] == [
+        ("Espumantes", 2022), ("Espumantes", 2023)]
+    assert {req.data["subopcao"] for req in requisicoes} == {"subopt_02"}
@@ -1,7 +1,7 @@
 # tests/test_populate_db.py
 
 import pytest
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
 
 from models.database import Base, get_engine, get_session
@@ -66,3 +66,60 @@ def test_popular_banco_nao_reinsere_dados(test_session):
     count_after_second = test_session.query(Cultivar).count()
 
     assert count_after_second == count_after_first, "Não deveria inserir duplicatas."
+
+
+def _registros_importacao(n, ano=2020):
+    return [{
+        "etapa": "Importação", "categoria_produto": "Espumantes", "ano": ano,
+        "pais": f"País {i}", "quantidade_kg": i, "valor_usd": i * 10,
+    } for i in range(n)]
+
+
+def test_salvar_em_lotes_retorna_inseridos_e_ignorados(test_session):
+    dados = _registros_importacao(25)
+
+    assert salvar(dados, test_session, batch_size=10) == (25, 0)
+    assert test_session.query(Cultivar).count() == 25
+
+    # metade repetida, metade nova
+    dados = _registros_importacao(25)[:12] + _registros_importacao(13, ano=2021)
+    assert salvar(dados, test_session, batch_size=10) == (13, 12)
+    assert test_session.query(Cultivar).count() == 38
+
+
+def test_salvar_le_as_chaves_uma_vez_por_etapa_e_ano(test_session):
+    salvar(_registros_importacao(5), test_session)
+    consultas = []
+
+    def registrar(conn, cursor, sql, params, context, executemany):
+        if sql.lstrip().upper().startswith("SELECT"):
+            consultas.append(sql)
+
+    engine = test_session.get_bind()
+    event.listen(engine, "before_cursor_execute", registrar)
+    try:
+        dados = _registros_importacao(50) + _registros_importacao(50, ano=2021)
+        assert salvar(dados, test_session, batch_size=10) == (95, 5)
+    finally:
+        event.remove(engine, "before_cursor_execute", registrar)
+    # dez lotes, mas só uma leitura para 2020 e outra para 2021
+    assert len(consultas) == 2
+
+
+def test_salvar_ignora_duplicatas_com_colunas_nulas(test_session):
+    """
+    Registros de Produção têm várias colunas NULL, que a constraint única
+    não compara; a deduplicação continua valendo, inclusive dentro do lote.
+    """
+    item = {"etapa": "Produção", "categoria_produto": "VINHO DE MESA",
+            "tipo_produto": "Tinto", "quantidade_l": "1.000", "ano": 2020}
+    assert salvar([item, dict(item)], test_session) == (1, 1)
+    assert salvar([item], test_session) == (0, 1)
+    assert test_session.query(Cultivar).count() == 1
+
+
+def test_salvar_converte_quantidade_l(test_session):
+    item = {"etapa": "Produção", "categoria_produto": "SUCO",
+            "tipo_produto": "Integral", "Quantidade/L": "2.000", "ano": 2020}
+    salvar([item], test_session)
+    assert test_session.query(Cultivar).one().quantidade_l == "2.000"
@@ -0,0 +1,275 @@
+# tests/test_rotas_banco.py
+
+import json
+
+import pytest
+from app import app
+from models.database import SessionLocal, init_db
+from models.cultivar import Cultivar
+import routes.comum
+import routes.importacao
+from services.analitico import cache_series
+from services.cache_dados import cache_dados
+from services.materializacao import respostas_materializadas
+
+PAIS_TESTE = "Terra de Teste"
+
+
+@pytest.fixture
+def client():
+    with app.test_client() as client:
+        yield client
+
+
+@pytest.fixture
+def headers(client):
+    access = client.get("/token").get_json()["access_token"]
+    return {"Authorization": f"Bearer {access}"}
+
+
+@pytest.fixture
+def registros():
+    """
+    Insere alguns registros de Importação (com um país fictício, para não
+    colidir com dados reais) no banco usado pelo app e remove ao final.
+    """
+    init_db()
+    session = SessionLocal()
+    session.add_all([
+        Cultivar(etapa="Importação", categoria_produto="Espumantes",
+                 ano=1971, pais=PAIS_TESTE, quantidade_kg=10, valor_usd=100),
+        Cultivar(etapa="Importação", categoria_produto="Espumantes",
+                 ano=1972, pais=PAIS_TESTE, quantidade_kg=20, valor_usd=200),
+        Cultivar(etapa="Importação", categoria_produto="Vinhos de mesa",
+                 ano=1972, pais=PAIS_TESTE, quantidade_kg=30, valor_usd=300),
+    ])
+    session.commit()
+    yield
+    session.query(Cultivar).filter(Cultivar.pais == PAIS_TESTE).delete()
+    session.commit()
+    session.close()
+
+
+@pytest.fixture(autouse=True)
+def cache_limpo():
+    cache_dados.invalidar()
+    respostas_materializadas.invalidar()
+    cache_series.invalidar()
+    yield
+    cache_dados.invalidar()
+    respostas_materializadas.invalidar()
+    cache_series.invalidar()
+
+
+@pytest.fixture
+def sem_scraper(monkeypatch):
+    def falha(*args, **kwargs):
+        raise AssertionError("scraper não deveria ser chamado")
+    monkeypatch.setattr(routes.importacao, "get_importacao_data", falha)
+
+
+def test_listagem_le_do_banco_com_filtros(client, headers, registros, sem_scraper):
+    response = client.get(
+        f"/api/importacao?ano=1972&pais={PAIS_TESTE}", headers=headers)
+    assert response.status_code == 200
+    dados = response.get_json()
+    assert len(dados) == 2
+    assert all(item["ano"] == 1972 for item in dados)
+    assert {item["categoria_produto"] for item in dados} == {
+        "Espumantes", "Vinhos de mesa"}
+
+
+def test_listagem_pagina_em_sql(client, headers, registros, sem_scraper):
+    url = (f"/api/importacao?categoria_produto=Espumantes&pais={PAIS_TESTE}"
+           "&limit=1&offset=1")
+    dados = client.get(url, headers=headers).get_json()
+    assert len(dados) == 1
+    assert dados[0]["ano"] == 1972
+    assert dados[0]["valor_usd"] == 200
+
+
+def test_listagem_respeita_intervalo_de_anos(client, headers, registros, sem_scraper):
+    url = f"/api/importacao?pais={PAIS_TESTE}&ano_inicio=1972&ano_fim=1972"
+    dados = client.get(url, headers=headers).get_json()
+    assert len(dados) == 2
+
+
+def test_parametro_numerico_invalido_retorna_400(client, headers):
+    response = client.get("/api/importacao?limit=abc", headers=headers)
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize("query", [
+    "limit=0", "limit=-1", "offset=-1", "cursor=&limit=0",
+])
+def test_limit_e_offset_fora_do_intervalo_retornam_400(client, headers, query):
+    response = client.get(f"/api/importacao?{query}", headers=headers)
+    assert response.status_code == 400
+    response = client.get(f"/api/balanca?{query}", headers=headers)
+    assert response.status_code == 400
+
+
+def test_fonte_scraper_usa_scraping_ao_vivo(client, headers, monkeypatch):
+    chamadas = []
+
+    def falso_scraper(ano_inicio, ano_fim):
+        chamadas.append((ano_inicio, ano_fim))
+        return [
+            {"etapa": "Importação", "categoria_produto": "Espumantes",
+             "ano": 2023, "pais": "Chile", "quantidade_kg": 1, "valor_usd": 2},
+            {"etapa": "Importação", "categoria_produto": "Espumantes",
+             "ano": 2023, "pais": "Itália", "quantidade_kg": 3, "valor_usd": 4},
+        ]
+
+    monkeypatch.setattr(routes.importacao,
+                        "get_importacao_data", falso_scraper)
+    url = "/api/importacao?fonte=scraper&ano_inicio=2023&ano_fim=2023&pais=Chile"
+    dados = client.get(url, headers=headers).get_json()
+    assert chamadas == [(2023, 2023)]
+    assert [item["pais"] for item in dados] == ["Chile"]
+
+
+def test_filtros_reduzem_o_scraping_as_paginas_necessarias(
+        client, headers, monkeypatch):
+    chamadas = []
+
+    def falso_scraper(ano_inicio, ano_fim, categorias=None):
+        chamadas.append((ano_inicio, ano_fim, categorias))
+        return [{"etapa": "Importação", "categoria_produto": "Espumantes",
+                 "ano": 2023, "pais": "Chile"}]
+
+    monkeypatch.setattr(routes.importacao,
+                        "get_importacao_data", falso_scraper)
+    url = "/api/importacao?fonte=scraper&ano=2023&categoria_produto=Espumantes"
+    dados = client.get(url, headers=headers).get_json()
+    assert chamadas == [(2023, 2023, ("Espumantes",))]
+    assert len(dados) == 1
+
+    url = "/api/importacao?fonte=scraper&categoria_produto=Inexistente"
+    assert client.get(url, headers=headers).get_json() == []
+    assert len(chamadas) == 1
+
+
+def test_paginas_seguintes_reusam_o_mesmo_scraping(client, headers, monkeypatch):
+    chamadas = []
+
+    def falso_scraper(ano_inicio, ano_fim):
+        chamadas.append((ano_inicio, ano_fim))
+        return [{"etapa": "Importação", "ano": 2023, "pais": f"P{i}"}
+                for i in range(5)]
+
+    monkeypatch.setattr(routes.importacao,
+                        "get_importacao_data", falso_scraper)
+    paises = []
+    for offset in (0, 2, 4):
+        url = f"/api/importacao?fonte=scraper&limit=2&offset={offset}"
+        paises += [d["pais"] for d in client.get(url, headers=headers).get_json()]
+    assert paises == [f"P{i}" for i in range(5)]
+    assert len(chamadas) == 1
+
+    response = client.get("/api/monitoramento/cache", headers=headers)
+    assert response.get_json()["acertos"] >= 2
+
+
+def test_cursor_percorre_todas_as_paginas_em_ordem(client, headers, registros,
+                                                    sem_scraper):
+    url = f"/api/importacao?pais={PAIS_TESTE}&limit=2&cursor="
+    vistos, paginas = [], 0
+    while True:
+        response = client.get(url, headers=headers)
+        corpo = response.get_json()
+        vistos += [(item["ano"], item["id"]) for item in corpo["dados"]]
+        paginas += 1
+        if corpo["next_cursor"] is None:
+            assert "X-Next-Cursor" not in response.headers
+            break
+        assert response.headers["X-Next-Cursor"] == corpo["next_cursor"]
+        url = f"/api/importacao?pais={PAIS_TESTE}&limit=2&cursor={corpo['next_cursor']}"
+
+    assert paginas == 2
+    assert len(vistos) == 3
+    assert vistos == sorted(vistos)
+
+
+def test_cursor_invalido_retorna_400(client, headers, sem_scraper):
+    response = client.get("/api/importacao?cursor=nao-e-cursor", headers=headers)
+    assert response.status_code == 400
+
+
+def test_cursor_no_scraping_ao_vivo(client, headers, monkeypatch):
+    def falso_scraper(ano_inicio, ano_fim):
+        return [{"etapa": "Importação", "ano": 2023, "pais": f"P{i}"}
+                for i in range(3)]
+
+    monkeypatch.setattr(routes.importacao,
+                        "get_importacao_data", falso_scraper)
+    corpo = client.get("/api/importacao?fonte=scraper&limit=2&cursor=",
+                       headers=headers).get_json()
+    assert [d["pais"] for d in corpo["dados"]] == ["P0", "P1"]
+
+    url = f"/api/importacao?fonte=scraper&limit=2&cursor={corpo['next_cursor']}"
+    corpo = client.get(url, headers=headers).get_json()
+    assert [d["pais"] for d in corpo["dados"]] == ["P2"]
+    assert corpo["next_cursor"] is None
+
+
+def test_format_ndjson_transmite_uma_linha_por_registro(client, headers,
+                                                        registros, sem_scraper):
+    response = client.get(
+        f"/api/importacao?pais={PAIS_TESTE}&format=ndjson", headers=headers)
+    assert response.is_streamed
+    assert response.mimetype == "application/x-ndjson"
+    linhas = [json.loads(linha)
+              for linha in response.get_data(as_text=True).splitlines()]
+    assert [item["valor_usd"] for item in linhas] == [100, 200, 300]
+
+
+def test_format_json_stream_equivale_ao_json(client, headers, registros,
+                                             sem_scraper, monkeypatch):
+    monkeypatch.setattr(routes.comum, "_REGISTROS_POR_BLOCO", 2)
+    url = f"/api/importacao?pais={PAIS_TESTE}"
+    transmitido = client.get(url + "&format=json-stream", headers=headers)
+    assert transmitido.is_streamed
+    assert transmitido.get_json() == client.get(url, headers=headers).get_json()
+
+
+def test_format_desconhecido_retorna_400(client, headers):
+    response = client.get("/api/importacao?format=xml", headers=headers)
+    assert response.status_code == 400
+
+
+def test_agregado_por_ano(client, headers, registros):
+    url = (f"/api/importacao/agregado?pais={PAIS_TESTE}&group_by=ano"
+           "&metric=sum(valor_usd)")
+    response = client.get(url, headers=headers)
+    assert response.status_code == 200
+    assert response.headers["X-Agregacao"] == "sql"
+    assert response.get_json() == [
+        {"ano": 1971, "sum_valor_usd": 100},
+        {"ano": 1972, "sum_valor_usd": 500},
+    ]
+
+
+def test_agregado_com_parametro_invalido_retorna_400(client, headers):
+    response = client.get("/api/importacao/agregado?group_by=senha",
+                          headers=headers)
+    assert response.status_code == 400
+
+
+def test_series_por_pais(client, headers, registros):
+    url = (f"/api/importacao/series?pais={PAIS_TESTE}&serie_por=pais"
+           "&ano_inicio=1971&ano_fim=1972")
+    response = client.get(url, headers=headers)
+    assert response.status_code == 200
+    (serie,) = response.get_json()
+    assert serie["valores"] == [100, 500]
+    assert serie["yoy"] == [None, 4.0]
+
+
+def test_balanca_filtra_por_pais(client, headers, registros):
+    url = f"/api/balanca?pais={PAIS_TESTE.upper()}&ano=1972"
+    response = client.get(url, headers=headers)
+    assert response.status_code == 200
+    assert {(d["categoria_produto"], d["saldo_usd"])
+            for d in response.get_json()} == {
+        ("Espumantes", -200), ("Vinhos de mesa", -300)}
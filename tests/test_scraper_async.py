@@ -0,0 +1,124 @@
+# tests/test_scraper_async.py
+
+import asyncio
+import random
+import threading
+import time
+
+import httpx
+import pytest
+from routes.comum import do_scraper
+from services import scraper, scraper_async
+from services.cache_paginas import CachePaginas, chave_pagina
+
+
+def _pagina_paises(pais):
+    return f"""
+    <table class="tb_base tb_dados">
+      <thead><tr><th>Países</th><th>Quantidade (Kg)</th><th>Valor (US$)</th></tr></thead>
+      <tbody><tr><td>{pais}</td><td>1.000</td><td>-</td></tr></tbody>
+    </table>
+    """
+
+
+@pytest.fixture
+def site_falso(monkeypatch):
+    """Downloads assíncronos locais, com atrasos aleatórios."""
+    estado = {"simultaneas": 0, "pico": 0}
+
+    async def baixar(cliente, req):
+        estado["simultaneas"] += 1
+        estado["pico"] = max(estado["pico"], estado["simultaneas"])
+        await asyncio.sleep(random.uniform(0, 0.01))
+        estado["simultaneas"] -= 1
+        return _pagina_paises(f"{req.data['subopcao']}-{req.data['ano']}")
+
+    monkeypatch.setattr(scraper, "_cache_paginas", None)
+    monkeypatch.setattr(scraper_async, "_baixar_html", baixar)
+    return estado
+
+
+def test_coleta_assincrona_preserva_ordem_e_limita_concorrencia(site_falso):
+    paginas = asyncio.run(scraper_async.coletar_paginas_async(
+        "Importação", range(2000, 2010), concorrencia=20))
+
+    esperado = [(categoria, ano) for categoria in scraper._IMPORT_CATEGORIES
+                for ano in range(2000, 2010)]
+    assert [(p.categoria, p.ano) for p in paginas] == esperado
+    assert paginas[0].registros[0]["pais"] == "subopt_01-2000"
+    assert 1 < site_falso["pico"] <= 20
+
+
+def test_motor_async_nas_rotas(site_falso, monkeypatch):
+    coletas = []
+    original = scraper_async.coletar_paginas_async
+
+    async def coletar(*args, **kwargs):
+        coletas.append(args[0])
+        return await original(*args, **kwargs)
+
+    monkeypatch.setattr(scraper_async, "coletar_paginas_async", coletar)
+    monkeypatch.setattr(scraper, "SCRAPER_MOTOR", "async")
+    obter_dados = do_scraper("get_importacao_data")
+    dados = obter_dados(ano_inicio=2000, ano_fim=2001)
+    assert len(dados) == 2 * len(scraper._IMPORT_CATEGORIES)
+    assert dados[0]["pais"] == "subopt_01-2000"
+
+    paginas = scraper.coletar_paginas("Exportação", [2000])
+    assert paginas[0].registros[0]["pais"] == "subopt_01-2000"
+    assert coletas == ["Importação", "Exportação"]
+
+
+def test_baixar_html_trata_erro_http(monkeypatch):
+    monkeypatch.setattr(scraper, "_limitador", scraper._LimitadorPorHost(0))
+
+    def responder(request):
+        if request.url.params.get("ano") == "2000":
+            return httpx.Response(500)
+        return httpx.Response(200, content="<p>Produção</p>".encode(),
+                              headers={"Content-Type": "text/html"})
+
+    async def buscar():
+        async with httpx.AsyncClient(
+                transport=httpx.MockTransport(responder)) as cliente:
+            return [
+                await scraper_async._baixar_html(cliente, scraper._Requisicao(
+                    "GET", scraper._BASE_URL, params={"ano": ano}))
+                for ano in ("2000", "2001")
+            ]
+
+    falha, pagina = asyncio.run(buscar())
+    assert falha is None
+    assert pagina == "<p>Produção</p>"
+
+
+def test_pagina_buscada_por_outro_worker_nao_e_baixada(tmp_path, monkeypatch):
+    cache = CachePaginas(str(tmp_path))
+    baixadas = []
+
+    async def baixar(cliente, req):
+        baixadas.append(req)
+        return _pagina_paises("baixada")
+
+    monkeypatch.setattr(scraper, "_cache_paginas", cache)
+    monkeypatch.setattr(scraper_async, "_baixar_html", baixar)
+    req = scraper._Requisicao(
+        "GET", scraper._BASE_URL, params={"opcao": "opt_02", "ano": "1990"})
+    chave = chave_pagina(req.metodo, req.url, req.params)
+    segurando = threading.Event()
+
+    def outro_worker():
+        # segura a trava da página e a grava antes de soltá-la
+        with cache.trava(chave):
+            segurando.set()
+            time.sleep(0.05)
+            cache.gravar(chave, _pagina_paises("do-outro-worker"))
+
+    thread = threading.Thread(target=outro_worker)
+    thread.start()
+    segurando.wait()
+    htmls = asyncio.run(scraper_async.buscar_paginas_async([req]))
+    thread.join()
+
+    assert htmls == [_pagina_paises("do-outro-worker")]
+    assert baixadas == []
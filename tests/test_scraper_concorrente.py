@@ -0,0 +1,83 @@
+# tests/test_scraper_concorrente.py
+
+import random
+import threading
+import time
+
+import pytest
+from services import scraper
+
+
+def _pagina_paises(pais, quantidade, valor):
+    return f"""
+    <table class="tb_base tb_dados">
+      <thead><tr><th>Países</th><th>Quantidade (Kg)</th><th>Valor (US$)</th></tr></thead>
+      <tbody><tr><td>{pais}</td><td>{quantidade}</td><td>{valor}</td></tr></tbody>
+    </table>
+    """
+
+
+@pytest.fixture
+def sem_limite(monkeypatch):
+    monkeypatch.setattr(scraper, "_limitador", scraper._LimitadorPorHost(0))
+
+
+@pytest.fixture
+def site_falso(monkeypatch):
+    """
+    Substitui a busca HTTP por páginas geradas localmente, com atrasos
+    aleatórios para que as respostas cheguem fora de ordem.
+    """
+    estado = {"simultaneas": 0, "pico": 0}
+    lock = threading.Lock()
+
+    def buscar(req):
+        with lock:
+            estado["simultaneas"] += 1
+            estado["pico"] = max(estado["pico"], estado["simultaneas"])
+        time.sleep(random.uniform(0, 0.01))
+        with lock:
+            estado["simultaneas"] -= 1
+        ano = int(req.data["ano"])
+        subopcao = req.data["subopcao"]
+        return _pagina_paises(f"{subopcao}-{ano}", "1.000", "-")
+
+    monkeypatch.setattr(scraper, "_buscar_html", buscar)
+    return estado
+
+
+def test_busca_concorrente_preserva_ordem(site_falso, sem_limite):
+    dados = scraper.get_importacao_data(2000, 2009, max_workers=8)
+
+    esperado = [
+        (categoria, ano)
+        for categoria in scraper._IMPORT_CATEGORIES
+        for ano in range(2000, 2010)
+    ]
+    assert [(d["categoria_produto"], d["ano"]) for d in dados] == esperado
+    assert dados[0]["pais"] == "subopt_01-2000"
+    assert dados[0]["quantidade_kg"] == 1000
+    assert dados[0]["valor_usd"] == 0
+    assert site_falso["pico"] > 1
+
+
+def test_max_workers_limita_paralelismo(site_falso, sem_limite):
+    scraper.get_exportacao_data(2000, 2004, max_workers=2)
+    assert site_falso["pico"] <= 2
+
+
+def test_limitador_por_host_espaca_requisicoes():
+    limitador = scraper._LimitadorPorHost(50)  # 1 requisição a cada 20ms
+    inicio = time.monotonic()
+    threads = [threading.Thread(target=limitador.aguardar, args=("host",))
+               for _ in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert time.monotonic() - inicio >= 0.09
+
+    # outro host não espera pela fila do primeiro
+    inicio = time.monotonic()
+    limitador.aguardar("outro-host")
+    assert time.monotonic() - inicio < 0.02
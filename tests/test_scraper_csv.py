@@ -0,0 +1,95 @@
+# tests/test_scraper_csv.py
+
+import json
+import os
+
+import pytest
+from services import scraper
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures", "vitibrasil")
+
+# CSV de download -> (etapa, categoria, registros de 2022 nas páginas salvas)
+ARQUIVOS = {
+    "Producao.csv": ("Produção", None, "producao_2022.json"),
+    "ProcessaViniferas.csv": (
+        "Processamento", "Viníferas", "processamento_viniferas_2022.json"),
+    "Comercio.csv": ("Comercialização", None, "comercializacao_2022.json"),
+    "ImpEspumantes.csv": (
+        "Importação", "Espumantes", "importacao_espumantes_2022.json"),
+    "ExpVinho.csv": ("Exportação", "Vinhos de mesa", "exportacao_vinhos_2022.json"),
+}
+
+
+def _linhas(arquivo):
+    with open(os.path.join(FIXTURES, arquivo), encoding="utf-8") as f:
+        yield from f.read().splitlines()
+
+
+def _referencia(nome):
+    with open(os.path.join(FIXTURES, nome), encoding="utf-8") as f:
+        return json.load(f)
+
+
+@pytest.mark.parametrize("arquivo", sorted(ARQUIVOS))
+def test_csv_gera_os_mesmos_registros_que_o_html(arquivo):
+    etapa, categoria, referencia = ARQUIVOS[arquivo]
+    por_ano = scraper.extrair_csv(etapa, _linhas(arquivo), categoria, [2022])
+    assert list(por_ano) == [2022]
+    assert por_ano[2022] == _referencia(referencia)
+
+
+def test_csv_separa_as_colunas_de_cada_ano():
+    por_ano = scraper.extrair_csv(
+        "Importação", _linhas("ImpEspumantes.csv"), "Espumantes", [2021, 2022])
+
+    chile_2021, chile_2022 = (
+        next(r for r in por_ano[ano] if r["pais"] == "Chile")
+        for ano in (2021, 2022))
+    assert chile_2021["quantidade_kg"] == chile_2022["quantidade_kg"] // 3
+    assert chile_2021["valor_usd"] == chile_2022["valor_usd"] // 3
+
+
+@pytest.fixture
+def downloads(monkeypatch):
+    """CSVs servidos das fixtures; páginas HTML sempre indisponíveis."""
+    estado = {"csv": [], "html": []}
+
+    def abrir_csv(arquivo):
+        estado["csv"].append(arquivo)
+        if not os.path.exists(os.path.join(FIXTURES, arquivo)):
+            return None
+        return _linhas(arquivo)
+
+    def buscar_paginas(requisicoes, max_workers=None):
+        estado["html"].extend(requisicoes)
+        return [None] * len(requisicoes)
+
+    monkeypatch.setattr(scraper, "_abrir_csv", abrir_csv)
+    monkeypatch.setattr(scraper, "_buscar_paginas", buscar_paginas)
+    return estado
+
+
+def test_modo_csv_nao_busca_html_quando_o_arquivo_cobre_tudo(downloads):
+    dados = scraper.get_producao_data(2021, 2022, fonte="csv")
+
+    assert downloads["csv"] == ["Producao.csv"]
+    assert downloads["html"] == []
+    assert [r["ano"] for r in dados] == [2021] * 44 + [2022] * 44
+
+
+def test_modo_csv_cai_para_o_html_no_que_falta(downloads):
+    paginas = scraper.coletar_paginas(
+        "Processamento", [2022, 2023], fonte="csv")
+
+    # só ProcessaViniferas.csv existe, e sem a coluna de 2023
+    buscadas = {(p.categoria, p.ano) for p in paginas if p.registros is None}
+    assert len(downloads["html"]) == len(buscadas) == 7
+    assert ("Viníferas", 2023) in buscadas
+    assert ("Viníferas", 2022) not in buscadas
+
+
+def test_fonte_html_ignora_os_csvs(downloads):
+    scraper.coletar_paginas("Produção", [2022], fonte="html")
+
+    assert downloads["csv"] == []
+    assert len(downloads["html"]) == 1
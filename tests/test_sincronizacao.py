@@ -0,0 +1,142 @@
+# tests/test_sincronizacao.py
+
+from datetime import date
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import scripts.populate_db as populate_db
+from models.database import Base
+from models.cultivar import Cultivar
+from models.sincronizacao import EstadoSincronizacao
+from services.scraper import PaginaColetada, categorias_da_etapa
+
+ANO_ATUAL = date.today().year
+
+
+@pytest.fixture(scope="function")
+def test_session(tmp_path):
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'sync.db'}",
+        connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+@pytest.fixture
+def site_falso(monkeypatch):
+    """
+    Simula a aba Importação: uma página por (categoria, ano), com um
+    registro cujo valor pode ser alterado pelo teste; as páginas em
+    "vazias" voltam sem tabela.
+    """
+    estado = {"valores": {}, "vazias": set(), "anos_buscados": [],
+              "paginas_buscadas": []}
+
+    def coletar(etapa, anos, max_workers=None, fonte=None, categorias=None):
+        anos = list(anos)
+        estado["anos_buscados"].append(anos)
+        paginas = []
+        for categoria, subopcao in categorias_da_etapa(etapa).items():
+            if categorias is not None and categoria not in categorias:
+                continue
+            for ano in anos:
+                estado["paginas_buscadas"].append((categoria, ano))
+                valor = estado["valores"].get((categoria, ano), 100)
+                registros = [] if (categoria, ano) in estado["vazias"] else [{
+                    "etapa": etapa, "categoria_produto": categoria, "ano": ano,
+                    "pais": "Chile", "quantidade_kg": 1, "valor_usd": valor,
+                }]
+                paginas.append(PaginaColetada(
+                    etapa, categoria, subopcao, ano, registros))
+        return paginas
+
+    monkeypatch.setattr(populate_db, "coletar_paginas", coletar)
+    return estado
+
+
+def _sincronizar(session):
+    return populate_db.sincronizar(
+        session, etapas=["Importação"], ano_inicio=ANO_ATUAL - 4)
+
+
+def test_primeira_sincronizacao_grava_dados_e_estado(test_session, site_falso):
+    resumo = _sincronizar(test_session)["Importação"]
+
+    paginas = 5 * len(categorias_da_etapa("Importação"))
+    assert resumo["inseridos"] == paginas
+    assert test_session.query(Cultivar).count() == paginas
+    assert test_session.query(EstadoSincronizacao).count() == paginas
+
+
+def test_segunda_sincronizacao_so_busca_anos_abertos(test_session, site_falso):
+    _sincronizar(test_session)
+    site_falso["anos_buscados"].clear()
+
+    resumo = _sincronizar(test_session)["Importação"]
+
+    assert site_falso["anos_buscados"] == [[ANO_ATUAL - 1, ANO_ATUAL]]
+    assert resumo["alteradas"] == 0
+    assert resumo["inalteradas"] == 2 * len(categorias_da_etapa("Importação"))
+
+
+def test_pagina_alterada_substitui_registros(test_session, site_falso):
+    _sincronizar(test_session)
+    site_falso["valores"][("Espumantes", ANO_ATUAL)] = 999
+
+    resumo = _sincronizar(test_session)["Importação"]
+
+    assert resumo["alteradas"] == 1
+    assert resumo["removidos"] == 1
+    valores = [c.valor_usd for c in test_session.query(Cultivar).filter(
+        Cultivar.categoria_produto == "Espumantes", Cultivar.ano == ANO_ATUAL)]
+    assert valores == [999]
+
+
+def test_ano_novo_entra_sem_recriar_banco(test_session, site_falso):
+    populate_db.sincronizar(
+        test_session, etapas=["Importação"],
+        ano_inicio=ANO_ATUAL - 4, ano_fim=ANO_ATUAL - 1)
+    site_falso["anos_buscados"].clear()
+
+    _sincronizar(test_session)
+
+    assert site_falso["anos_buscados"] == [[ANO_ATUAL - 1, ANO_ATUAL]]
+    assert test_session.query(Cultivar).filter(
+        Cultivar.ano == ANO_ATUAL).count() == len(categorias_da_etapa("Importação"))
+
+
+def test_pagina_sem_tabela_mantem_registros(test_session, site_falso):
+    _sincronizar(test_session)
+    estado = test_session.query(EstadoSincronizacao).filter_by(
+        categoria="Espumantes", ano=ANO_ATUAL).one()
+    hash_anterior = estado.hash_conteudo
+    site_falso["vazias"].add(("Espumantes", ANO_ATUAL))
+
+    resumo = _sincronizar(test_session)["Importação"]
+
+    assert resumo["falhas"] == 1
+    assert resumo["removidos"] == 0
+    assert test_session.query(Cultivar).filter(
+        Cultivar.categoria_produto == "Espumantes",
+        Cultivar.ano == ANO_ATUAL).count() == 1
+    test_session.refresh(estado)
+    assert estado.hash_conteudo == hash_anterior
+
+
+def test_so_busca_paginas_fechadas_que_faltam(test_session, site_falso):
+    _sincronizar(test_session)
+    test_session.query(EstadoSincronizacao).filter_by(
+        categoria="Espumantes", ano=ANO_ATUAL - 3).delete()
+    test_session.commit()
+    site_falso["paginas_buscadas"].clear()
+
+    _sincronizar(test_session)
+
+    fechadas = [(categoria, ano) for categoria, ano
+                in site_falso["paginas_buscadas"] if ano < ANO_ATUAL - 1]
+    assert fechadas == [("Espumantes", ANO_ATUAL - 3)]
@@ -0,0 +1,189 @@
+# tests/test_snapshot.py
+
+import json
+import os
+import subprocess
+import sys
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import services.snapshot as snapshot
+from config import caminho_banco_do_snapshot
+from models.agregado import Agregado
+from models.balanca import BalancaComercial
+from models.cultivar import Cultivar
+from models.database import Base
+from models.sincronizacao import EstadoSincronizacao
+from services.agregacao import atualizar_agregados
+from services.balanca import atualizar_balanca
+from services.versao import Versao, gravar_versao, ler_versao
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+REGISTROS = [
+    {"etapa": "Produção", "categoria_produto": "VINHO DE MESA",
+     "tipo_produto": "Tinto", "quantidade_l": "1.000", "ano": 2022},
+    {"etapa": "Importação", "categoria_produto": "Espumantes",
+     "pais": "França", "quantidade_kg": 10, "valor_usd": 150, "ano": 2023},
+    {"etapa": "Importação", "categoria_produto": "Espumantes",
+     "pais": "Itália", "quantidade_kg": 0, "valor_usd": None, "ano": 2023},
+    {"etapa": "Exportação", "categoria_produto": "Espumantes",
+     "pais": "França", "quantidade_kg": 4, "valor_usd": 60, "ano": 2023},
+]
+
+
+def _fabrica(caminho):
+    engine = create_engine(f"sqlite:///{caminho}",
+                           connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(bind=engine)
+
+
+@pytest.fixture
+def origem(tmp_path):
+    session = _fabrica(tmp_path / "origem.db")()
+    session.add_all(Cultivar(**registro) for registro in REGISTROS)
+    session.add(EstadoSincronizacao(
+        etapa="Importação", subopcao="subopt_02", categoria="Espumantes",
+        ano=2023, hash_conteudo="abc", registros=2,
+        sincronizado_em=datetime(2024, 5, 1, 12, 30)))
+    atualizar_agregados(session)
+    atualizar_balanca(session)
+    gravar_versao(session, Versao(7, datetime(2024, 5, 1, 12, 30)))
+    yield session
+    session.close()
+
+
+def _linhas(session, modelo):
+    return [linha.to_dict() for linha in
+            session.query(modelo).order_by(modelo.id)]
+
+
+def test_snapshot_reproduz_o_banco(origem, tmp_path):
+    arquivo = tmp_path / "dados.snap"
+    cabecalho = snapshot.gerar_snapshot(origem, str(arquivo))
+    assert cabecalho["etapas"] == {
+        "Exportação": 1, "Importação": 2, "Produção": 1}
+    assert arquivo.read_bytes().startswith(b"EMBRSNAP")
+
+    destino = _fabrica(tmp_path / "destino.db")()
+    inseridas = snapshot.carregar_snapshot(destino, str(arquivo))
+    assert inseridas["cultivares"] == 4
+    assert inseridas["estado_sincronizacao"] == 1
+
+    assert _linhas(destino, Cultivar) == _linhas(origem, Cultivar)
+    assert _linhas(destino, EstadoSincronizacao) \
+        == _linhas(origem, EstadoSincronizacao)
+    assert _linhas(destino, BalancaComercial) \
+        == _linhas(origem, BalancaComercial)
+    assert destino.query(Agregado).count() == inseridas["agregados"] > 0
+    # mesma versão: os ETags coincidem com os da origem
+    assert ler_versao(destino) == Versao(7, datetime(2024, 5, 1, 12, 30))
+    destino.close()
+
+
+def test_agregados_vazios_sao_recalculados(tmp_path):
+    origem = _fabrica(tmp_path / "origem.db")()
+    origem.add_all(Cultivar(**registro) for registro in REGISTROS)
+    origem.commit()
+    arquivo = str(tmp_path / "dados.snap")
+    snapshot.gerar_snapshot(origem, arquivo)
+
+    destino = _fabrica(tmp_path / "destino.db")()
+    snapshot.carregar_snapshot(destino, arquivo)
+    assert destino.query(Agregado).count() > 0
+    assert destino.query(BalancaComercial).count() == 2
+    # sem versão na origem, a carga registra a primeira
+    assert ler_versao(destino).numero == 1
+    origem.close()
+    destino.close()
+
+
+def test_colunas_de_texto_usam_dicionario(origem, tmp_path):
+    arquivo = str(tmp_path / "dados.snap")
+    snapshot.gerar_snapshot(origem, arquivo)
+    with snapshot.Snapshot(arquivo) as aberto:
+        colunas = {c["nome"]: c for c in
+                   aberto.tabelas["cultivares"]["colunas"]}
+        assert colunas["pais"]["tipo"] == "texto"
+        assert colunas["pais"]["largura"] == "B"
+        assert colunas["valor_usd"]["tipo"] == "inteiro"
+        assert aberto.colunas("cultivares")["pais"] \
+            == [None, "França", "Itália", "França"]
+
+
+def test_arquivo_invalido(tmp_path):
+    arquivo = tmp_path / "outro.snap"
+    arquivo.write_bytes(b"PK\x03\x04 nada a ver")
+    with pytest.raises(snapshot.SnapshotInvalido):
+        snapshot.Snapshot(str(arquivo))
+
+    arquivo.write_bytes(b"EMBRSNAP\x63\x00\x00\x00\x00\x00\x00\x00")
+    with pytest.raises(snapshot.SnapshotInvalido, match="formato 99"):
+        snapshot.Snapshot(str(arquivo))
+
+
+def test_carga_so_com_banco_vazio(origem, tmp_path, monkeypatch):
+    arquivo = str(tmp_path / "dados.snap")
+    snapshot.gerar_snapshot(origem, arquivo)
+    fabrica = _fabrica(tmp_path / "destino.db")
+    monkeypatch.setattr(snapshot, "SessionLocal", fabrica)
+
+    assert snapshot.carregar_se_vazio(arquivo)["cultivares"] == 4
+    assert snapshot.carregar_se_vazio(arquivo) is None
+    assert fabrica().query(Cultivar).count() == 4
+
+
+def test_app_sobe_do_snapshot_sem_banco(origem, tmp_path):
+    arquivo = str(tmp_path / "dados.snap")
+    snapshot.gerar_snapshot(origem, arquivo)
+    codigo = (
+        "import json, app\n"
+        "from services.inicializacao import inicializacao\n"
+        "app.iniciar_servicos()\n"
+        "assert inicializacao.aguardar(30)\n"
+        "c = app.app.test_client()\n"
+        "t = c.get('/token').get_json()['access_token']\n"
+        "r = c.get('/api/importacao', "
+        "headers={'Authorization': 'Bearer ' + t})\n"
+        "print(json.dumps([r.status_code, r.headers['ETag'], "
+        "sorted(d['pais'] for d in r.get_json())]))\n")
+    ambiente = {k: v for k, v in os.environ.items() if k != "DATABASE_URL"}
+    ambiente.update(SNAPSHOT_PATH=arquivo, CACHE_COMPARTILHADO_PATH="")
+    saida = subprocess.run([sys.executable, "-c", codigo], cwd=RAIZ,
+                           env=ambiente, capture_output=True, text=True)
+    assert saida.returncode == 0, saida.stderr
+    # as demais linhas são logs (inclusive os da saída do processo)
+    resultado = [linha for linha in saida.stdout.splitlines()
+                 if linha.startswith("[")][-1]
+    status, etag, paises = json.loads(resultado)
+    assert status == 200
+    assert etag.startswith('"7-')
+    assert paises == ["França", "Itália"]
+    # a cópia temporária sai junto com o último processo que a usava
+    assert not os.path.exists(caminho_banco_do_snapshot(arquivo))
+
+
+@pytest.mark.skipif(snapshot.fcntl is None, reason="sem fcntl")
+def test_copia_temporaria_e_removida_pelo_ultimo_processo(tmp_path,
+                                                         monkeypatch):
+    caminho = str(tmp_path / "copia.db")
+    open(caminho, "w").close()
+    monkeypatch.setattr(snapshot, "_uso_do_banco", None)
+    monkeypatch.setattr(snapshot.atexit, "register", lambda *args: None)
+
+    snapshot.reservar_banco_temporario(caminho)
+    # outro worker usando a mesma cópia
+    outro = open(caminho + ".uso", "a")
+    snapshot.fcntl.flock(outro, snapshot.fcntl.LOCK_SH)
+    snapshot._liberar_banco_temporario(caminho)
+    assert os.path.exists(caminho)
+
+    outro.close()
+    snapshot.reservar_banco_temporario(caminho)
+    snapshot._liberar_banco_temporario(caminho)
+    assert not os.path.exists(caminho)
+    assert not os.path.exists(caminho + ".uso")
@@ -1,47 +1,40 @@
 # tests/test_verificacao_dados.py
 
-import os
 import pytest
-from sqlalchemy import func
-from models.database import SessionLocal, init_db
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import scripts.populate_db as populate_db
+from models.database import Base
 from models.cultivar import Cultivar
 
 from scripts.populate_db import popular_banco
 
 
-@pytest.fixture(scope="module", autouse=True)
-def preparar_banco():
+@pytest.fixture(scope="module")
+def preparar_banco(tmp_path_factory):
     """
-    Antes de qualquer teste deste módulo:
-    - Remove o embrapa.db antigo (se existir)
-    - Cria o esquema via init_db()
-    - Popula chamando popular_banco()
-    Ao final do módulo, remove o embrapa.db novamente.
+    Antes de qualquer teste deste módulo, cria um banco SQLite temporário
+    (sem tocar no embrapa.db nem no engine do app) e o popula chamando
+    popular_banco(). Retorna a fábrica de sessões desse banco.
     """
-    # 1) Apaga banco antigo, se existir
-    try:
-        if os.path.exists("embrapa.db"):
-            os.remove("embrapa.db")
-    except Exception:
-        pass
-
-    # 2) Cria o esquema e popula
-    init_db()
-    popular_banco()
+    caminho = tmp_path_factory.mktemp("verificacao") / "embrapa.db"
+    engine = create_engine(f"sqlite:///{caminho}",
+                           connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    fabrica = sessionmaker(bind=engine)
 
-    yield
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setattr(populate_db, "SessionLocal", fabrica)
+        popular_banco()
 
-    # 3) Ao final do módulo, apagar para não "poluir" o diretório
-    try:
-        if os.path.exists("embrapa.db"):
-            os.remove("embrapa.db")
-    except Exception:
-        pass
+    yield fabrica
+    engine.dispose()
 
 
 @pytest.fixture
-def session():
-    db = SessionLocal()
+def session(preparar_banco):
+    db = preparar_banco()
     yield db
     db.close()
 
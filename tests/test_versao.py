@@ -0,0 +1,123 @@
+# tests/test_versao.py
+
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import models.database as database
+import routes.comum
+import routes.importacao
+import services.versao as versao
+from app import app
+from models.database import Base
+from services.versao import Versao, incrementar_versao, ler_versao
+
+VERSAO_TESTE = Versao(7, datetime(2024, 5, 1, 12, 0, 0))
+
+
+@pytest.fixture(scope="function")
+def fabrica(tmp_path, monkeypatch):
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'versao.db'}",
+        connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    fabrica = sessionmaker(bind=engine)
+    monkeypatch.setattr(versao, "SessionLocal", fabrica)
+    versao.esquecer_versao()
+    yield fabrica
+    versao.esquecer_versao()
+    engine.dispose()
+
+
+@pytest.fixture
+def client(fabrica, monkeypatch):
+    # as rotas leem do banco temporário, não do embrapa.db da raiz
+    monkeypatch.setattr(database, "SessionLocal", fabrica)
+    with app.test_client() as client:
+        yield client
+
+
+@pytest.fixture
+def headers(client):
+    access = client.get("/token").get_json()["access_token"]
+    return {"Authorization": f"Bearer {access}"}
+
+
+@pytest.fixture
+def versao_fixa(monkeypatch):
+    atual = {"versao": VERSAO_TESTE}
+    monkeypatch.setattr(routes.comum, "versao_atual", lambda: atual["versao"])
+    return atual
+
+
+def test_incrementar_versao_cria_e_soma(fabrica):
+    session = fabrica()
+    assert ler_versao(session) is None
+    assert incrementar_versao(session).numero == 1
+    assert incrementar_versao(session).numero == 2
+    assert ler_versao(session).numero == 2
+    session.close()
+
+
+def test_versao_atual_fica_em_cache(fabrica, monkeypatch):
+    session = fabrica()
+    incrementar_versao(session)
+    assert versao.versao_atual().numero == 1
+
+    def sem_banco():
+        raise AssertionError("o banco não deveria ser consultado")
+    monkeypatch.setattr(versao, "SessionLocal", sem_banco)
+    assert versao.versao_atual().numero == 1
+
+    # incrementar descarta o cache do processo
+    monkeypatch.setattr(versao, "SessionLocal", fabrica)
+    incrementar_versao(session)
+    assert versao.versao_atual().numero == 2
+    session.close()
+
+
+def test_resposta_leva_etag_e_last_modified(client, headers, versao_fixa):
+    resposta = client.get("/api/importacao?ano=1971", headers=headers)
+    assert resposta.status_code == 200
+    assert resposta.headers["ETag"].startswith('"7-')
+    assert resposta.headers["Last-Modified"] == "Wed, 01 May 2024 12:00:00 GMT"
+
+
+def test_if_none_match_retorna_304_sem_banco_nem_scraper(
+        client, headers, versao_fixa, monkeypatch):
+    etag = client.get("/api/importacao?ano=1971",
+                      headers=headers).headers["ETag"]
+
+    def falha(*args, **kwargs):
+        raise AssertionError("nem o banco nem o scraper deveriam ser usados")
+    monkeypatch.setattr(routes.comum, "sessao_da_requisicao", falha)
+    monkeypatch.setattr(routes.importacao, "get_importacao_data", falha)
+
+    resposta = client.get("/api/importacao?ano=1971",
+                          headers={**headers, "If-None-Match": etag})
+    assert resposta.status_code == 304
+    assert resposta.headers["ETag"] == etag
+    assert resposta.data == b""
+
+    resposta = client.get(
+        "/api/importacao?ano=1971",
+        headers={**headers, "If-Modified-Since": "Wed, 01 May 2024 12:00:00 GMT"})
+    assert resposta.status_code == 304
+
+
+def test_nova_versao_invalida_o_etag(client, headers, versao_fixa):
+    etag = client.get("/api/importacao?ano=1971",
+                      headers=headers).headers["ETag"]
+    versao_fixa["versao"] = Versao(8, datetime(2024, 6, 1))
+    resposta = client.get("/api/importacao?ano=1971",
+                          headers={**headers, "If-None-Match": etag})
+    assert resposta.status_code == 200
+    assert resposta.headers["ETag"] != etag
+
+
+def test_etag_difere_por_recurso(client, headers, versao_fixa):
+    um = client.get("/api/importacao?ano=1971", headers=headers)
+    outro = client.get("/api/importacao?ano=1972", headers=headers)
+    assert um.headers["ETag"] != outro.headers["ETag"]